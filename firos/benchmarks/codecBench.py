@@ -0,0 +1,377 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+''' Microbenchmark of the conversion between ROS-Messages and dictionaries: the generated
+    converters of the MsgCodec compared with the previous recursive conversions via reflection.
+    'fromDict' is compared with 'instantiateROSMessage' (which called the constructor of every
+    nested message), 'toDict' with a walk over the fields like 'rosMsg2Dict' and 'toNgsi' (with
+    'json.dumps') with the ObjectFiwareConverter as used by 'GET /topic' (only if it is available).
+
+    Run it from the 'firos'-folder:
+
+        python -m benchmarks.codecBench --output results.json
+
+    With ROS sourced, the messages of 'geometry_msgs' and 'nav_msgs' are used. Otherwise (or
+    with '--stand-ins') messages are generated here the way genpy generates them, so the
+    benchmark also runs without ROS.
+'''
+
+import sys
+import json
+import time
+import types
+import timeit
+import argparse
+import numbers
+import platform
+
+from include.ros.msgCodec import MsgCodec
+
+
+def createMessages(classes, pathLength):
+    ''' Returns the benchmarked messages as [(name, message), ...]
+    '''
+    pose = classes["geometry_msgs/Pose"]()
+    pose.position.x, pose.position.y = 1.5, -2.25
+    pose.orientation.z, pose.orientation.w = 0.38268343, 0.92387953
+
+    twist = classes["geometry_msgs/Twist"]()
+    twist.linear.x, twist.angular.z = 0.5, 0.1
+
+    stamped = classes["geometry_msgs/PoseWithCovarianceStamped"]()
+    stamped.header.frame_id = "map"
+    stamped.pose.pose = pose
+    stamped.pose.covariance = [0.01 * i for i in range(36)]
+
+    path = classes["nav_msgs/Path"]()
+    path.header.frame_id = "map"
+    for i in range(pathLength):
+        poseStamped = classes["geometry_msgs/PoseStamped"]()
+        poseStamped.header.seq = i
+        poseStamped.header.frame_id = "map"
+        poseStamped.pose.position.x = i * 0.1
+        poseStamped.pose.orientation.w = 1.0
+        path.poses.append(poseStamped)
+
+    return [("geometry_msgs/Pose", pose), ("geometry_msgs/Twist", twist),
+            ("geometry_msgs/PoseWithCovarianceStamped", stamped), ("nav_msgs/Path[{}]".format(pathLength), path)]
+
+
+def rosClasses():
+    ''' Returns the benchmarked ROS-Message-Classes by their type
+    '''
+    from geometry_msgs.msg import Point, Quaternion, Pose, Vector3, Twist, PoseWithCovariance, PoseWithCovarianceStamped, PoseStamped
+    from nav_msgs.msg import Path
+    from std_msgs.msg import Header
+    return dict((clazz._type, clazz) for clazz in (Point, Quaternion, Pose, Vector3, Twist, PoseWithCovariance,
+                                                   PoseWithCovarianceStamped, PoseStamped, Path, Header))
+
+
+###############################################################################
+##########################   Stand-In Message Classes   #######################
+###############################################################################
+
+class TVal(object):
+    ''' As genpy.TVal
+    '''
+    __slots__ = ["secs", "nsecs"]
+
+    def __init__(self, secs=0, nsecs=0):
+        if not isinstance(secs, numbers.Integral):
+            if nsecs != 0:
+                raise ValueError("if secs is a float, nsecs cannot be set")
+            floatSecs = secs
+            secs = int(floatSecs)
+            nsecs = int((floatSecs - secs) * 1000000000)
+        else:
+            secs = int(secs)
+            nsecs = int(nsecs)
+        self.secs = secs
+        self.nsecs = nsecs
+        self.canon()
+
+    def canon(self):
+        secs, nsecs = divmod(self.nsecs, int(1e9))
+        self.secs += secs
+        self.nsecs = nsecs
+
+    @classmethod
+    def from_sec(cls, floatSecs):
+        secs = int(floatSecs)
+        return cls(secs, int((floatSecs - secs) * 1000000000))
+
+
+class Time(TVal):
+    ''' As genpy.Time
+    '''
+    __slots__ = []
+
+    def __init__(self, secs=0, nsecs=0):
+        super(Time, self).__init__(secs, nsecs)
+        if self.secs < 0:
+            raise TypeError("time values must be positive")
+
+
+class Duration(TVal):
+    __slots__ = []
+
+
+class Message(object):
+    ''' As genpy.Message (only the keyword arguments of the constructor)
+    '''
+    __slots__ = []
+
+    def __init__(self, *args, **kwds):
+        for key, value in kwds.items():
+            setattr(self, key, value)
+        for key in self.__slots__:
+            if key not in kwds:
+                setattr(self, key, None)
+
+
+# The fields of the benchmarked messages as [(field, type), ...]
+_STAND_IN_FIELDS = [
+    ("std_msgs/Header", [("seq", "uint32"), ("stamp", "time"), ("frame_id", "string")]),
+    ("geometry_msgs/Point", [("x", "float64"), ("y", "float64"), ("z", "float64")]),
+    ("geometry_msgs/Quaternion", [("x", "float64"), ("y", "float64"), ("z", "float64"), ("w", "float64")]),
+    ("geometry_msgs/Vector3", [("x", "float64"), ("y", "float64"), ("z", "float64")]),
+    ("geometry_msgs/Pose", [("position", "geometry_msgs/Point"), ("orientation", "geometry_msgs/Quaternion")]),
+    ("geometry_msgs/Twist", [("linear", "geometry_msgs/Vector3"), ("angular", "geometry_msgs/Vector3")]),
+    ("geometry_msgs/PoseWithCovariance", [("pose", "geometry_msgs/Pose"), ("covariance", "float64[36]")]),
+    ("geometry_msgs/PoseWithCovarianceStamped", [("header", "std_msgs/Header"), ("pose", "geometry_msgs/PoseWithCovariance")]),
+    ("geometry_msgs/PoseStamped", [("header", "std_msgs/Header"), ("pose", "geometry_msgs/Pose")]),
+    ("nav_msgs/Path", [("header", "std_msgs/Header"), ("poses", "geometry_msgs/PoseStamped[]")])
+]
+
+_DEFAULTS = {"uint32": "0", "float64": "0.", "string": "''", "time": "genpy.Time()", "float64[36]": "[0.] * 36"}
+
+
+def standInClasses():
+    ''' Returns the benchmarked messages generated as genpy does: With constructors taking
+        the fields as arguments, which create every nested message (and time) via its module
+        (e.g. 'geometry_msgs.msg.Point()').
+    '''
+    classes = {}
+    genpy = types.ModuleType("genpy")
+    genpy.Time, genpy.Duration, genpy.Message = Time, Duration, Message
+    namespace = {"genpy": genpy}
+    for msgType, fields in _STAND_IN_FIELDS:
+        package, name = msgType.split("/")
+        if package not in namespace:
+            namespace[package] = types.ModuleType(package)
+            namespace[package].msg = types.ModuleType(package + ".msg")
+        defaults = []
+        for field, fieldType in fields:
+            if fieldType in _DEFAULTS:
+                default = _DEFAULTS[fieldType]
+            elif fieldType.endswith("[]"):
+                default = "[]"
+            else:
+                default = fieldType.replace("/", ".msg.") + "()"
+            defaults.append((field, default))
+        source = "\n".join([
+            "class %s(genpy.Message):" % name,
+            "  _type = %r" % msgType,
+            "  __slots__ = %r" % [field for field, _ in fields],
+            "  _slot_types = %r" % [fieldType for _, fieldType in fields],
+            "  def __init__(self, *args, **kwds):",
+            "    if args or kwds:",
+            "      super(%s, self).__init__(*args, **kwds)" % name
+        ] + ["      if self.%s is None:\n        self.%s = %s" % (field, field, default) for field, default in defaults]
+          + ["    else:"]
+          + ["      self.%s = %s" % (field, default) for field, default in defaults])
+        exec(compile(source, "<stand-in {}>".format(msgType), "exec"), namespace)
+        classes[msgType] = namespace[name]
+        setattr(namespace[package].msg, name, namespace[name])
+    return classes
+
+
+###############################################################################
+#########################   Previous Implementation   #########################
+###############################################################################
+
+class Temp(object):
+    pass
+
+
+def reflectiveToDict(msg):
+    ''' Walks recursively over '__slots__' and '_slot_types' like 'rosMsg2Dict' did, but
+        with the values. This also creates the received values (as the Context-Broker would
+        send them)
+    '''
+    obj = {}
+    for key, t in zip(msg.__slots__, msg._slot_types):
+        attr = getattr(msg, key)
+        if hasattr(attr, '_slot_types'):
+            obj[key] = reflectiveToDict(attr)
+        elif type(attr) is list:
+            obj[key] = [reflectiveToDict(item) if hasattr(item, '_slot_types') else item for item in attr]
+        elif hasattr(attr, 'secs'):
+            obj[key] = {'secs': attr.secs, 'nsecs': attr.nsecs}
+        else:
+            obj[key] = attr
+    return obj
+
+
+def typeStruct(msg):
+    ''' The struct of types 'instantiateROSMessage' needed (created by the subscriber before)
+    '''
+    value = {}
+    for key in msg.__slots__:
+        attr = getattr(msg, key)
+        if hasattr(attr, '_type'):
+            value[key] = typeStruct(attr)
+        elif type(attr) is list and len(attr) > 0 and hasattr(attr[0], '_type'):
+            value[key] = [typeStruct(item) for item in attr]
+        else:
+            value[key] = {}
+    return {'type': msg._type, 'value': value}
+
+
+def instantiateROSMessage(obj, dataStruct, classes):
+    ''' The previous 'topicHandler.instantiateROSMessage' (classes as ROS_MESSAGE_CLASSES)
+    '''
+    if 'type' in dataStruct and 'value' in dataStruct:
+        if dataStruct['type'] not in classes:
+            raise KeyError(dataStruct['type'])
+        instance = classes[dataStruct['type']]()
+        for attr in classes[dataStruct['type']].__slots__:
+            if attr in obj and attr in dataStruct['value']:
+                if type(dataStruct['value'][attr]) is list:
+                    l = []
+                    for it in range(len(dataStruct['value'][attr])):
+                        l.append(instantiateROSMessage(obj[attr][it], dataStruct['value'][attr][it], classes))
+                    setattr(instance, attr, l)
+                else:
+                    setattr(instance, attr, instantiateROSMessage(obj[attr], dataStruct['value'][attr], classes))
+        return instance
+    else:
+        if type(obj) is dict:
+            t = Temp()
+            for k in obj:
+                setattr(t, k, obj[k])
+            return t
+        else:
+            return obj
+
+
+def fiwareConverter():
+    ''' Returns the ObjectFiwareConverter, which created the NGSI-typed values of 'GET /topic'
+        before (from the submodule or the installed package) or None
+    '''
+    try:
+        from include.FiwareObjectConverter.objectFiwareConverter import ObjectFiwareConverter
+    except ImportError:
+        try:
+            from fiwareobjectconverter.object_fiware_converter import ObjectFiwareConverter
+        except ImportError:
+            return None
+    return ObjectFiwareConverter
+
+
+###############################################################################
+
+
+def measure(previous, generated, arg, iterations, repeat):
+    ''' Returns the best times of previous and generated (in microseconds) out of repeat runs.
+        The runs of both alternate, so both are equally affected by the load of the machine
+    '''
+    timers = [timeit.Timer(lambda func=func: func(arg)) for func in (previous, generated)]
+    best = [None, None]
+    for _ in range(repeat):
+        for i, timer in enumerate(timers):
+            elapsed = timer.timeit(iterations) / iterations * 1e6
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def result(name, previous, generated):
+    sys.stderr.write("  {}: {:.1f} us -> {:.1f} us ({:.1f}x)\n".format(name, previous, generated, previous / generated))
+    return {"previous_us": round(previous, 2), "codec_us": round(generated, 2), "speedup": round(previous / generated, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark of the conversion between ROS-Messages and dictionaries")
+    parser.add_argument('--iterations', type=int, default=2000, help='Iterations of the small messages (the path uses fewer)')
+    parser.add_argument('--repeat', type=int, default=15, help='The best of this many runs is reported')
+    parser.add_argument('--path-length', type=int, default=1000, help='Number of poses of the nav_msgs/Path')
+    parser.add_argument('--stand-ins', action='store_true', help='Use the generated stand-in messages, even if ROS is available')
+    parser.add_argument('--output', help='Write the results as JSON into this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    classes = None
+    if not args.stand_ins:
+        try:
+            classes = rosClasses()
+        except ImportError:
+            sys.stderr.write("ROS is not available, using the stand-in messages\n")
+    if classes is None:
+        classes = standInClasses()
+        MsgCodec.resolver = staticmethod(classes.__getitem__)
+    converter = fiwareConverter()
+    if converter is None:
+        sys.stderr.write("The ObjectFiwareConverter is not available, 'toNgsi' is not measured\n")
+
+    results = []
+    for name, msg in createMessages(classes, args.path_length):
+        codec = MsgCodec.forClass(type(msg))
+        data = reflectiveToDict(msg)
+        dataStruct = typeStruct(msg)
+        iterations = max(1, args.iterations // max(1, len(data.get("poses", [])) // 10))
+        sys.stderr.write(name + "\n")
+        entry = {"message": name}
+
+        # Received values into ROS-Messages
+        entry["fromDict"] = result("fromDict", *measure(lambda data: instantiateROSMessage(data, dataStruct, classes), codec.fromDict,
+                                                        data, iterations, args.repeat))
+        # ROS-Messages into plain dictionaries
+        entry["toDict"] = result("toDict", *measure(reflectiveToDict, codec.toDict, msg, iterations, args.repeat))
+        if converter is not None:
+            # ROS-Messages into the NGSI-typed JSON of 'GET /topic', both including the serialization
+            def previous(msg):
+                obj = {s: getattr(msg, s, None) for s in msg.__slots__}
+                obj["id"], obj["type"] = "/robot/topic", msg._type
+                return converter.obj2Fiware(obj, dataTypeDict=codec.definition, ignorePythonMetaData=True, ind=None)
+
+            def generated(msg):
+                obj = codec.toNgsi(msg)
+                obj["id"], obj["type"] = "/robot/topic", msg._type
+                return json.dumps(obj)
+            entry["toNgsi"] = result("toNgsi", *measure(previous, generated, msg, max(1, iterations // 10), args.repeat))
+        results.append(entry)
+
+    output = json.dumps({
+        "benchmark": "codec",
+        "python": platform.python_version(),
+        "messages": "stand-in" if MsgCodec.resolver == classes.__getitem__ else "ros",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results
+    }, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as outFile:
+            outFile.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == '__main__':
+    main()
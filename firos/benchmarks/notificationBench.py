@@ -0,0 +1,148 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+''' Microbenchmark of the decoding of Context-Broker notifications: the
+    CbNotificationDecoder compared with the previous path of 'CBHandler.do_POST'
+    (json.loads, digging through the dictionaries and splitting the entity id).
+
+    Run it from the 'firos'-folder:
+
+        python -m benchmarks.notificationBench --output results.json
+'''
+
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+
+from include.constants import Constants as C
+from include.pubsub.contextbroker import cbNotification
+from include.pubsub.contextbroker.cbNotification import CbNotificationDecoder
+
+
+ID_PREFIX = "urn:ngsi-ld:AMR:"
+
+
+def createNotification(entities):
+    ''' A notification as sent by Orion with 'entities' robots updating their action
+    '''
+    return json.dumps({
+        "subscriptionId": "5c6a1b2c3d4e5f6a7b8c9d0e",
+        "data": [{
+            "id": ID_PREFIX + "robot{}".format(i),
+            "type": "AMR",
+            "action": {
+                "type": "Text",
+                "value": "move",
+                "metadata": {
+                    "context": {"type": "Text", "value": "action-robotui"},
+                    "dateModified": {"type": "DateTime", "value": "2019-01-01T00:00:00.00Z"}
+                }
+            }
+        } for i in range(entities)]
+    }).encode("utf-8")
+
+
+def previousPath(body, contentLength):
+    ''' The decoding as done before by do_POST (for every entity of the notification)
+    '''
+    receivedData = json.loads(body[:int(contentLength)])
+    result = []
+    for data in receivedData['data']:
+        if 'refDestination' in data:
+            topic = '/' + data['id'].split(':')[3] + '/' + 'refDestination'
+            payload = data['refDestination']['value']
+            context = data['refDestination']['metadata']['context']['value']
+        elif 'action' in data:
+            topic = '/' + data['id'].split(':')[3] + '/' + 'action'
+            payload = data['action']['value']
+            context = data['action']['metadata']['context']['value']
+        result.append((topic, payload, context))
+    return result
+
+
+def decoderPath(decoder):
+    def decode(body, contentLength):
+        _, entities, extractor = decoder.decode(decoder.read(contentLength, io.BytesIO(body)))
+        result = []
+        for entity in entities:
+            result.extend(extractor.extract(entity))
+        return result
+    return decode
+
+
+def measure(func, body, iterations):
+    contentLength = str(len(body))
+    func(body, contentLength)
+    start = time.time()
+    for _ in range(iterations):
+        func(body, contentLength)
+    return (time.time() - start) / iterations * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark of the notification decoding")
+    parser.add_argument('--entities', type=int, nargs='+', default=[1, 10, 100], help='Number of entities per notification')
+    parser.add_argument('--iterations', type=int, default=10000)
+    parser.add_argument('--output', help='Write the results as JSON into this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    C.ID_PREFIX = ID_PREFIX
+    routes = {}
+    for i in range(max(args.entities)):
+        routes[(ID_PREFIX + "robot{}".format(i), "action")] = "/robot{}/action".format(i)
+    decoder = CbNotificationDecoder(routes)
+    decoder.registerSubscription("5c6a1b2c3d4e5f6a7b8c9d0e", ["action"])
+
+    results = []
+    for entities in args.entities:
+        body = createNotification(entities)
+        iterations = max(1, args.iterations // entities)
+        previous = measure(previousPath, body, iterations)
+        decoded = measure(decoderPath(decoder), body, iterations)
+        results.append({
+            "entities": entities,
+            "bytes": len(body),
+            "previous_us": round(previous, 2),
+            "decoder_us": round(decoded, 2),
+            "speedup": round(previous / decoded, 2)
+        })
+        sys.stderr.write("{} entities: {:.1f} us -> {:.1f} us\n".format(entities, previous, decoded))
+
+    output = json.dumps({
+        "benchmark": "notification",
+        "json_backend": cbNotification.JSON_BACKEND,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results
+    }, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as outFile:
+            outFile.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == '__main__':
+    main()
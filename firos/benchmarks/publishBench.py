@@ -0,0 +1,322 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+''' Benchmark of the publishing path of FIROS (ROS-Message -> Context-Broker).
+
+    Synthetic 'std_msgs/Int32' (battery) and 'geometry_msgs/Pose' (location) messages
+    of N simulated robots are handed to FIROS, which publishes them to a local
+    StubBroker. Each message carries a sequence number, so the time it arrived at
+    the stub can be matched with the time it was handed over.
+
+    Run it from the 'firos'-folder (ROS has to be sourced):
+
+        python -m benchmarks.publishBench --robots 1 10 100 --output results.json
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+try:
+    from time import process_time
+except ImportError:
+    # Python 2 (time.clock is the CPU time on Unix)
+    from time import clock as process_time
+
+from std_msgs.msg import Int32
+from geometry_msgs.msg import Pose, Point, Quaternion
+
+from include.constants import Constants as C
+from include.logger import initLog
+from include import confManager
+from include.geometry import quaternionFromYaw
+from include.stats import collectStats
+from include.pubsub.publishPipeline import PublishPipeline
+from include.pubsub.contextbroker.cbPublisher import CbPublisher
+from benchmarks.stubBroker import StubBroker
+
+
+ENTRIES = ("routine", "publisher")
+ATTRIBUTES = ("battery", "location")
+
+
+def percentile(values, p):
+    ''' Returns the p-th percentile (0..100) of the sorted list values (nearest rank)
+    '''
+    if not values:
+        return None
+    index = int(round(p / 100.0 * (len(values) - 1)))
+    return values[index]
+
+
+def residentMemory():
+    ''' Returns the current resident memory of this process in KiB
+    '''
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (IOError, OSError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def firosVersion():
+    try:
+        with open(os.path.join(os.path.dirname(__file__), "..", "..", "package.xml")) as packageXml:
+            content = packageXml.read()
+        return content.split("<version>")[1].split("</version>")[0]
+    except (IOError, IndexError):
+        return None
+
+
+def createMessage(attribute, robot, seq):
+    ''' Creates the synthetic message of a robot. The sequence number is sent
+        as battery value or as x-coordinate of the location.
+    '''
+    if attribute == "battery":
+        return Int32(seq)
+    q = quaternionFromYaw(seq % 628 / 100.0)
+    return Pose(Point(float(seq), float(robot), 0.0), Quaternion(q[0], q[1], q[2], q[3]))
+
+
+def sequenceOf(attribute, value):
+    ''' Returns the sequence number from the attribute value received by the stub
+    '''
+    if attribute == "battery":
+        return int(value)
+    return int(value["coordinates"][0])
+
+
+class Scenario(object):
+    ''' One run of the benchmark with a number of simulated robots.
+
+        entry:  "routine" hands the messages to topicHandler._publishToCBRoutine
+                (rate limiting and PublishPipeline included), "publisher" calls
+                CbPublisher.publish directly.
+        rate:   messages per second of each topic of each robot (0: as fast as possible)
+    '''
+
+    def __init__(self, stub, robots, entry, rate, duration, workers, batchWindow):
+        self.stub = stub
+        self.robots = robots
+        self.entry = entry
+        self.rate = rate
+        self.duration = duration
+        self.workers = workers
+        self.batchWindow = batchWindow
+        self.sent = {}      # sent[(entityId, attribute, seq)] = time the message was handed over
+
+    def setUp(self):
+        self.spoolDir = tempfile.mkdtemp(prefix="firos-bench-")
+        configData = {
+            "address": "127.0.0.1",
+            "port": self.stub.port,
+            "spool": {"path": os.path.join(self.spoolDir, "spool.sqlite")}
+        }
+        if self.batchWindow > 0:
+            configData["batch"] = {"window_ms": self.batchWindow}
+        CbPublisher.configData = configData
+        CbPublisher.posted_history.clear()
+        CbPublisher.posted_time.clear()
+        CbPublisher.plans.clear()
+        self.publisher = CbPublisher()
+
+        self.topics = []
+        for robot in range(self.robots):
+            for attribute in ATTRIBUTES:
+                topic = "/robot_{}/{}".format(robot, attribute)
+                self.publisher.registerTopic(topic, None)
+                self.topics.append((topic, attribute, robot, self.publisher.plans[topic].entityId))
+
+        if self.entry == "routine":
+            from include.ros import topicHandler
+            from include.ros.topicRegistry import TopicRecord
+            self.topicHandler = topicHandler
+            topicHandler.PUBLISH_PIPELINE = PublishPipeline(self.publisher.publish, self.workers)
+            # Unlimited topics, as registered by topicHandler.loadMsgHandlers
+            records = dict((topic, TopicRecord(topic, "subscriber")) for topic, _, _, _ in self.topics)
+            self.handOver = lambda topic, msg: topicHandler._publishToCBRoutine(msg, records[topic])
+        else:
+            self.handOver = lambda topic, msg: self.publisher.publish(topic, msg, None)
+        self.stub.reset()
+
+    def tearDown(self):
+        if self.entry == "routine":
+            self.topicHandler.PUBLISH_PIPELINE.stop()
+        if self.publisher.spool is not None:
+            self.publisher.spool.stop()
+        shutil.rmtree(self.spoolDir, ignore_errors=True)
+
+    def drive(self):
+        ''' Hands over the messages of all robots for 'duration' seconds
+        '''
+        interval = 1.0 / self.rate if self.rate > 0 else 0
+        seq = 0
+        start = time.time()
+        nextTick = start
+        while time.time() - start < self.duration:
+            seq += 1
+            for topic, attribute, robot, entityId in self.topics:
+                msg = createMessage(attribute, robot, seq)
+                self.sent[(entityId, attribute, seq)] = time.time()
+                self.handOver(topic, msg)
+            if interval > 0:
+                nextTick += interval
+                delay = nextTick - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def drain(self, timeout=30.0):
+        ''' Waits until FIROS published everything and collects the stub records
+        '''
+        if self.entry == "routine":
+            self.topicHandler.PUBLISH_PIPELINE.flush(timeout)
+        self.publisher.flush()
+
+        records = []
+        deadline = time.time() + timeout
+        quietSince = time.time()
+        while time.time() < deadline and time.time() - quietSince < 0.5:
+            received = self.stub.records()
+            if received:
+                records.extend(received)
+                quietSince = time.time()
+            else:
+                time.sleep(0.05)
+        return records
+
+    def run(self):
+        self.setUp()
+        try:
+            memoryBefore = residentMemory()
+            cpuBefore = process_time()
+            start = time.time()
+            self.drive()
+            records = self.drain()
+            cpu = process_time() - cpuBefore
+            memoryAfter = residentMemory()
+            stats = collectStats()
+        finally:
+            self.tearDown()
+
+        latencies = []
+        lastReceived = start
+        for entityId, attribute, value, receivedAt in records:
+            sentAt = self.sent.get((entityId, attribute, sequenceOf(attribute, value)))
+            if sentAt is not None:
+                latencies.append((receivedAt - sentAt) * 1000.0)
+                lastReceived = max(lastReceived, receivedAt)
+        latencies.sort()
+        elapsed = max(lastReceived - start, 1e-9)
+        offered = len(self.sent)
+
+        return {
+            "robots": self.robots,
+            "topics": len(self.topics),
+            "offered": offered,
+            "delivered": len(latencies),
+            "elapsed_s": round(elapsed, 3),
+            "offered_per_s": round(offered / float(self.duration), 1),
+            "messages_per_s": round(len(latencies) / elapsed, 1),
+            "latency_ms": {
+                "p50": _round(percentile(latencies, 50)),
+                "p95": _round(percentile(latencies, 95)),
+                "p99": _round(percentile(latencies, 99)),
+                "max": _round(latencies[-1] if latencies else None)
+            },
+            "cpu_ms_per_message": _round(cpu * 1000.0 / offered if offered else None),
+            "memory_kib": {
+                "before": memoryBefore,
+                "after": memoryAfter,
+                "growth": memoryAfter - memoryBefore
+            },
+            "stats": stats
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the FIROS publishing path")
+    parser.add_argument('--robots', type=int, nargs='+', default=[1, 10, 100], help='Number of simulated robots of each scenario')
+    parser.add_argument('--entry', choices=ENTRIES, default="routine", help='Where the messages are handed over to FIROS')
+    parser.add_argument('--rate', type=float, default=10.0, help='Messages per second of each topic of a robot (0: as fast as possible)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Duration of each scenario in seconds')
+    parser.add_argument('--workers', type=int, default=C.PUBLISH_WORKERS, help='Number of workers of the PublishPipeline')
+    parser.add_argument('--batch-ms', type=int, default=0, help='Batch window of the CbBatcher in milliseconds (0: no batching)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Response latency of the stub Context-Broker')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests the stub answers with 500')
+    parser.add_argument('--output', help='Write the results as JSON into this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    C.LOGLEVEL = "ERROR"
+    C.ROBOT_ID = "robot_0"
+    C.ID_PREFIX = "urn:ngsi-ld:AMR:"
+    C.CONTEXT_ID = ""
+    initLog()
+    # Every topic is published without change detection or rate limits
+    confManager._topicOptions = {}
+
+    stub = StubBroker(latency=args.latency_ms / 1000.0, failureRate=args.failure_rate).start()
+    try:
+        scenarios = []
+        for robots in args.robots:
+            scenario = Scenario(stub, robots, args.entry, args.rate, args.duration, args.workers, args.batch_ms)
+            scenarios.append(scenario.run())
+            sys.stderr.write("{} robots: {} msgs/s, p99 {} ms\n".format(
+                robots, scenarios[-1]["messages_per_s"], scenarios[-1]["latency_ms"]["p99"]))
+    finally:
+        stub.stop()
+
+    results = {
+        "benchmark": "publish",
+        "firos_version": firosVersion(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "settings": {
+            "entry": args.entry,
+            "rate": args.rate,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "batch_ms": args.batch_ms,
+            "stub_latency_ms": args.latency_ms,
+            "stub_failure_rate": args.failure_rate
+        },
+        "scenarios": scenarios
+    }
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as outFile:
+            outFile.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == '__main__':
+    main()
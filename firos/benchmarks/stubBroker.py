@@ -0,0 +1,223 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler
+    from http.server import HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.request import Request, urlopen
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib2 import Request, urlopen
+
+
+ATTRS_PATH = re.compile(r"^/v2/entities/([^/]+)/attrs/?$")
+ENTITY_PATH = re.compile(r"^/v2/entities/([^/]+)/?$")
+
+
+class StubBroker(object):
+    ''' A minimal NGSIv2 Context-Broker for the benchmarks. It accepts the requests
+        FIROS sends (entity attributes, batch updates, subscriptions, deletions)
+        and records when each attribute update arrived.
+
+        The stub runs in its own process, so its CPU time is not accounted to FIROS.
+        It is controlled via:
+
+            GET  /bench/records   returns and clears the records as
+                                  [[entityId, attribute, attributeValue, receivedAt], ...]
+            POST /bench/reset     clears the records
+
+        latency:     seconds each response is delayed
+        failureRate: fraction (0..1) of requests which are answered with 500
+    '''
+
+    def __init__(self, port=0, latency=0.0, failureRate=0.0):
+        self.latency = latency
+        self.failureRate = failureRate
+        self.port = port
+        self._process = None
+
+    def start(self):
+        ''' Starts the stub in a new process and waits until it accepts requests
+        '''
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(self.port, self.latency, self.failureRate, child))
+        self._process.daemon = True
+        self._process.start()
+        self.port = parent.recv()
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def url(self, path=""):
+        return "http://127.0.0.1:{}{}".format(self.port, path)
+
+    def records(self):
+        ''' Returns (and removes) the attribute updates received so far
+        '''
+        return json.loads(urlopen(self.url("/bench/records")).read().decode("utf-8"))
+
+    def reset(self):
+        urlopen(Request(self.url("/bench/reset"), data=b"")).read()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    failureRate = 0.0
+    records = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == "/bench/records":
+            with self.lock:
+                records = list(self.records)
+                del self.records[:]
+            return self._respond(200, json.dumps(records))
+        if self.path.startswith("/v2/subscriptions"):
+            return self._respond(200, "[]")
+        self._respond(404)
+
+    def do_POST(self):
+        body = self._readBody()
+        if self.path == "/bench/reset":
+            with self.lock:
+                del self.records[:]
+            return self._respond(204)
+        if self._delayOrFail():
+            return
+
+        match = ATTRS_PATH.match(self.path.split("?")[0])
+        if match is not None:
+            self._record(match.group(1), body)
+            return self._respond(204)
+        if self.path.startswith("/v2/op/update"):
+            for entity in body.get("entities", []):
+                self._record(entity.get("id"), entity)
+            return self._respond(204)
+        if self.path.startswith("/v2/subscriptions"):
+            return self._respond(201, headers={"Location": "/v2/subscriptions/{:024x}".format(random.getrandbits(96))})
+        self._respond(404)
+
+    def do_PATCH(self):
+        body = self._readBody()
+        if self._delayOrFail():
+            return
+        match = ATTRS_PATH.match(self.path.split("?")[0])
+        if match is not None:
+            self._record(match.group(1), body)
+            return self._respond(204)
+        if self.path.startswith("/v2/subscriptions"):
+            return self._respond(204)
+        self._respond(404)
+
+    def do_DELETE(self):
+        if self._delayOrFail():
+            return
+        if ENTITY_PATH.match(self.path) is not None or self.path.startswith("/v2/subscriptions"):
+            return self._respond(204)
+        self._respond(404)
+
+    def _record(self, entityId, attrs):
+        now = time.time()
+        with self.lock:
+            for name, attr in attrs.items():
+                if name in ("id", "type", "dateModified") or not isinstance(attr, dict):
+                    continue
+                self.records.append([entityId, name, attr.get("value"), now])
+
+    def _readBody(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length == 0:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            return {}
+
+    def _delayOrFail(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if self.failureRate > 0 and random.random() < self.failureRate:
+            self._respond(500, json.dumps({"error": "InternalServerError", "description": "injected failure"}))
+            return True
+        return False
+
+    def _respond(self, status, body="", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        if data:
+            self.send_header("Content-Type", "application/json")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        return
+
+
+def _serve(port, latency, failureRate, conn):
+    _StubHandler.latency = latency
+    _StubHandler.failureRate = failureRate
+    httpd = _ThreadingHTTPServer(("127.0.0.1", port), _StubHandler)
+    conn.send(httpd.socket.getsockname()[1])
+    httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub NGSIv2 Context-Broker for the FIROS benchmarks")
+    parser.add_argument('--port', type=int, default=1026)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay of each response in milliseconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    args = parser.parse_args()
+
+    broker = StubBroker(args.port, args.latency_ms / 1000.0, args.failure_rate).start()
+    sys.stdout.write("Stub Context-Broker listening on {}\n".format(broker.url()))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        broker.stop()
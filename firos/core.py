@@ -83,7 +83,7 @@ if __name__ == '__main__':
     from include.logger import Log, initLog
     from include.server.firosServer import FirosServer
     
-    from include.ros.topicHandler import RosTopicHandler, loadMsgHandlers, createConnectionListeners, initPubAndSub
+    from include.ros.topicHandler import RosTopicHandler, loadMsgHandlers, createConnectionListeners, initPubAndSub, startGraphWatcher
     from include.ros.featsHandler import FeatsHandler
 
     # Overwrite global variables with command line arguments (iff set)
@@ -133,6 +133,7 @@ if __name__ == '__main__':
         initPubAndSub()
         loadMsgHandlers(confManager.getRobots(True))
         createConnectionListeners()
+        startGraphWatcher()
         handler = FeatsHandler()
 
         #Log("INFO", "\nPress Ctrl+C to Exit\n")
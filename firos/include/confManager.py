@@ -15,6 +15,7 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import sys
+import os
 import json
 import copy
 import traceback
@@ -23,6 +24,12 @@ from include.logger import Log
 from include.ros.rosConfigurator import RosConfigurator
 from include.constants import Constants as C
 
+# Cached options of the topics in 'topics.json' via _topicOptions[topic]
+_topicOptions = None
+
+# The file of the spool in the configuration folder, if no "path" is given
+DEFAULT_SPOOL_FILE = "spool.sqlite"
+
 
 def getRobots(refresh=False):
     ''' This retrieves the current configuration from FIROS.
@@ -32,7 +39,11 @@ def getRobots(refresh=False):
         from ROS and are adding them as subscribers (by default). In a small
         ROS-World this usually is no problem. But in an environment with many 
         robots we might send a lot of data. 
+
+        refresh: Also reloads the options of the topics in the 'topics.json'
     '''
+    if refresh:
+        invalidateTopicOptions()
     try:
         # Retrieves the whitelist.json. If it does not exists, it returns all topics.
         topics_regex = copy.deepcopy(RosConfigurator.systemTopics(refresh))
@@ -45,8 +56,12 @@ def getRobots(refresh=False):
         
         # check if structure is as needed
         for key in topics_json.keys():
-            if len(topics_json[key]) != 2:
-                Log("ERROR", "The topic: '{}', does not have a list of length 2 (topics.json)! \n\nExiting".format(key))
+            if len(topics_json[key]) not in [2, 3]:
+                Log("ERROR", "The topic: '{}', does not have a list of length 2 or 3 (topics.json)! \n\nExiting".format(key))
+                sys.exit(1)
+
+            if len(topics_json[key]) == 3 and not isinstance(topics_json[key][2], dict):
+                Log("ERROR", "The topic: '{}', does not have an object with options as third entry (topics.json)! \n\nExiting".format(key))
                 sys.exit(1)
 
             if not key.startswith("/"):
@@ -58,12 +73,10 @@ def getRobots(refresh=False):
                 sys.exit(1)
 
         # replace first term of topic with robot ID from config file
-        replace_id = C.ROBOT_ID
         new_topics = {}
         
         for key in topics_json:
-            new_key = '/' + replace_id + '/' + key.split('/')[2]
-            new_topics[new_key] = topics_json[key]
+            new_topics[_replaceRobotId(key)] = topics_json[key]
 
         # Merge both dictionaties:
         # Here topics_json overrides entries in topics_regex:
@@ -78,6 +91,54 @@ def getRobots(refresh=False):
         return {}
 
 
+def getStaticTopics():
+    ''' Returns the topics of the 'topics.json' (with the robot ID from the config file).
+        Those are connected, regardless of the topics found in the ROS-World
+    '''
+    topics_json = getTopicsByJson()
+    return {_replaceRobotId(key): topics_json[key] for key in topics_json}
+
+
+def getTopicOptions(topic):
+    ''' Returns the options of a topic, which can be given as optional third
+        entry in the 'topics.json' (e.g. the change detection settings):
+
+        "/robot_id/battery": ["std_msgs/Int32", "subscriber", {"suppress_unchanged": true}]
+
+        topic: The topic (with the robot ID from the config file)
+    '''
+    global _topicOptions
+    if _topicOptions is None:
+        topics_json = getTopicsByJson()
+        _topicOptions = {_replaceRobotId(key): topics_json[key][2] for key in topics_json if len(topics_json[key]) == 3}
+    return _topicOptions.get(topic, {})
+
+
+def invalidateTopicOptions():
+    ''' Lets 'getTopicOptions' load the 'topics.json' again (e.g. on a reconnect)
+    '''
+    global _topicOptions
+    _topicOptions = None
+
+
+def getSpoolPath(spoolConf):
+    ''' Returns the path of the spool-database of the CbSpool: The "path" of the "spool"-object
+        (relative paths are relative to the configuration folder) or 'spool.sqlite' in
+        the configuration folder
+
+        spoolConf: The "spool"-object of the Context-Broker in the 'config.json'
+    '''
+    path = os.path.expanduser(spoolConf.get("path", DEFAULT_SPOOL_FILE))
+    return os.path.join(C.PATH or os.getcwd(), path)
+
+
+def _replaceRobotId(key):
+    ''' Replaces the first term of a topic in 'topics.json' with the robot ID
+        from the config file
+    '''
+    return '/' + C.ROBOT_ID + '/' + key.split('/')[2]
+
+
 def getTopicsByJson():
     ''' Load the 'topics.json'-File 
     '''
@@ -34,12 +34,25 @@ class Constants:
 
     EP_SERVER_ADRESS = None
     EP_SERVER_PORT = None
+    EP_SERVER_WORKERS = 8
+    EP_SERVER_BACKLOG = 64
+    EP_SERVER_KEEPALIVE = 30        # In Seconds
+    EP_MAX_NOTIFICATION_SIZE = 1048576  # In Bytes
+    EP_QUEUE_SIZE = 1000
+    EP_QUEUE_OVERFLOW = "drop_oldest"
+    EP_DISPATCH_WORKERS = 2
     MAP_SERVER_PORT = 10100
     ROSBRIDGE_PORT = 9090 
     PUB_FREQUENCY = 0               # In Milliseconds
+    PUBLISH_WORKERS = 2
+    SHUTDOWN_TIMEOUT = 10           # In Seconds
+    SHUTDOWN_WORKERS = 8
 
     ROS_NODE_NAME = "firos"
     ROS_SUB_QUEUE_SIZE = 10 
+    ROS_PUBLISHER_CACHE_SIZE = 100
+    ROS_PUBLISHER_IDLE_TTL = 300    # In Seconds
+    GRAPH_WATCH_INTERVAL = 5        # In Seconds
 
     @classmethod
     def setConfiguration(cls, path):
@@ -76,6 +89,15 @@ class Constants:
             if "ros_subscriber_queue" in configData:
                 cls.ROS_SUB_QUEUE_SIZE = int(configData["ros_subscriber_queue"])
 
+            if "ros_publisher_cache_size" in configData:
+                cls.ROS_PUBLISHER_CACHE_SIZE = int(configData["ros_publisher_cache_size"])
+
+            if "ros_publisher_idle_ttl" in configData:
+                cls.ROS_PUBLISHER_IDLE_TTL = float(configData["ros_publisher_idle_ttl"])
+
+            if "graph_watch_interval" in configData:
+                cls.GRAPH_WATCH_INTERVAL = float(configData["graph_watch_interval"])
+
             if os.getenv('ENDPOINT_ADDRESS'):
                 cls.EP_SERVER_ADRESS = os.getenv('ENDPOINT_ADDRESS')
             elif "endpoint" in configData and "address" in configData["endpoint"]:
@@ -91,11 +113,29 @@ class Constants:
             elif "endpoint" in configData and "port" in configData["endpoint"]:
                 cls.EP_SERVER_PORT = int(configData["endpoint"]["port"])
 
+            if "endpoint" in configData:
+                cls.EP_SERVER_WORKERS = int(configData["endpoint"].get("workers", cls.EP_SERVER_WORKERS))
+                cls.EP_SERVER_BACKLOG = int(configData["endpoint"].get("backlog", cls.EP_SERVER_BACKLOG))
+                cls.EP_SERVER_KEEPALIVE = float(configData["endpoint"].get("keepalive_timeout", cls.EP_SERVER_KEEPALIVE))
+                cls.EP_MAX_NOTIFICATION_SIZE = int(configData["endpoint"].get("max_notification_size", cls.EP_MAX_NOTIFICATION_SIZE))
+                cls.EP_QUEUE_SIZE = int(configData["endpoint"].get("queue_size", cls.EP_QUEUE_SIZE))
+                cls.EP_QUEUE_OVERFLOW = configData["endpoint"].get("queue_overflow", cls.EP_QUEUE_OVERFLOW)
+                cls.EP_DISPATCH_WORKERS = int(configData["endpoint"].get("dispatch_workers", cls.EP_DISPATCH_WORKERS))
+
             if "rosbridge_port" in configData:
                 cls.ROSBRIDGE_PORT = int(configData["rosbridge_port"])
 
             if "pub_frequency" in configData:
                 cls.PUB_FREQUENCY = int(configData["pub_frequency"])
+
+            if "publish_workers" in configData:
+                cls.PUBLISH_WORKERS = int(configData["publish_workers"])
+
+            if "shutdown_timeout" in configData:
+                cls.SHUTDOWN_TIMEOUT = float(configData["shutdown_timeout"])
+
+            if "shutdown_workers" in configData:
+                cls.SHUTDOWN_WORKERS = int(configData["shutdown_workers"])
             
             if os.getenv('ROBOT_ID'):
                 cls.ROBOT_ID = os.getenv('ROBOT_ID')
@@ -0,0 +1,105 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Small replacements for the planar parts of tf.transformations. They give the
+# same results for the 'sxyz' convention tf uses by default, without importing tf.
+# Quaternions are given in the order x, y, z, w (as in tf and geometry_msgs).
+
+# Below this, the pose is pointing straight up or down and tf reports a yaw of 0
+_EPS = 4 * 2.220446049250313e-16
+
+def yawFromQuaternion(x, y, z, w):
+    ''' Returns the rotation around the z-axis (yaw) of the quaternion, in [-pi, pi].
+        Same as tf.transformations.euler_from_quaternion([x, y, z, w])[2]
+    '''
+    norm = x * x + y * y + z * z + w * w
+    if norm == 0:
+        return 0.0
+    s = 2.0 / norm
+    m10 = s * (x * y + w * z)
+    m00 = 1.0 - s * (y * y + z * z)
+    if math.hypot(m00, m10) <= _EPS:
+        return 0.0
+    return math.atan2(m10, m00)
+
+
+def quaternionFromYaw(yaw):
+    ''' Returns the quaternion (x, y, z, w) of a rotation around the z-axis.
+        Same as tf.transformations.quaternion_from_euler(0, 0, yaw)
+    '''
+    half = yaw / 2.0
+    return (0.0, 0.0, math.sin(half), math.cos(half))
+
+
+def yawsFromQuaternions(quaternions):
+    ''' Batched variant of yawFromQuaternion.
+
+        quaternions: a sequence of (x, y, z, w) or a numpy-array of shape (N, 4)
+
+        Returns a numpy-array if numpy is available, otherwise a list.
+    '''
+    if numpy is not None:
+        q = numpy.asarray(quaternions, dtype=float).reshape(-1, 4)
+        x, y, z, w = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+        norm = numpy.einsum("ij,ij->i", q, q)
+        s = numpy.divide(2.0, norm, out=numpy.zeros_like(norm), where=norm != 0)
+        m10 = s * (x * y + w * z)
+        m00 = 1.0 - s * (y * y + z * z)
+        return numpy.where(numpy.hypot(m00, m10) > _EPS, numpy.arctan2(m10, m00), 0.0)
+    return [yawFromQuaternion(*q) for q in quaternions]
+
+
+def quaternionsFromYaws(yaws):
+    ''' Batched variant of quaternionFromYaw.
+
+        yaws: a sequence or numpy-array of angles
+
+        Returns a numpy-array of shape (N, 4) if numpy is available, otherwise a list of tuples.
+    '''
+    if numpy is not None:
+        half = numpy.asarray(yaws, dtype=float).reshape(-1) / 2.0
+        result = numpy.zeros((half.shape[0], 4))
+        result[:, 2] = numpy.sin(half)
+        result[:, 3] = numpy.cos(half)
+        return result
+    return [quaternionFromYaw(yaw) for yaw in yaws]
+
+
+def yawFromPose(pose):
+    ''' Returns the yaw of a geometry_msgs/Pose (or any object with an 'orientation')
+    '''
+    q = pose.orientation
+    return yawFromQuaternion(q.x, q.y, q.z, q.w)
+
+
+def yawsFromPoses(poses):
+    ''' Batched variant of yawFromPose
+    '''
+    return yawsFromQuaternions([(p.orientation.x, p.orientation.y, p.orientation.z, p.orientation.w) for p in poses])
@@ -0,0 +1,193 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    # Newer requests releases depend on urllib3 directly
+    from urllib3.connection import HTTPConnection
+    from urllib3.connectionpool import HTTPConnectionPool
+except ImportError:
+    # Older requests releases vendor urllib3
+    from requests.packages.urllib3.connection import HTTPConnection
+    from requests.packages.urllib3.connectionpool import HTTPConnectionPool
+
+from include.logger import Log
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_DNS_CACHE_TTL = 300     # In Seconds
+DEFAULT_TIMEOUT = 5             # In Seconds
+
+
+class DnsCache(object):
+    ''' A small DNS-Cache of the connections of one HttpClient.
+
+        urllib3 resolves the host again for every new connection it opens. Here the
+        address is resolved once and reused until 'ttl' seconds passed or a
+        connection to it failed.
+    '''
+
+    def __init__(self, ttl=DEFAULT_DNS_CACHE_TTL, resolver=None):
+        ''' ttl:      Seconds an address is reused
+            resolver: Resolves (host, port) like socket.getaddrinfo (default)
+        '''
+        self.ttl = ttl
+        self.resolver = resolver if resolver is not None else socket.getaddrinfo
+        self._lock = threading.Lock()
+        self._cache = {}    # _cache[(host, port)] = (address, resolved_at)
+
+    def resolve(self, host, port):
+        ''' Returns the cached address of host or resolves it (blocking)
+        '''
+        key = (host, port)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+
+        infos = self.resolver(host, port, 0, socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        with self._lock:
+            self._cache[key] = (address, time.time())
+        return address
+
+    def invalidate(self, host, port):
+        with self._lock:
+            self._cache.pop((host, port), None)
+
+
+class _DnsCachingHTTPConnection(HTTPConnection):
+    ''' A urllib3-connection, which connects to the address cached in 'dnsCache'.
+        The Host-header is still the original host.
+    '''
+    dnsCache = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        self._dns_host = self.dnsCache.resolve(host, self.port)
+        try:
+            return HTTPConnection._new_conn(self)
+        except Exception:
+            # The address might be outdated, resolve it again next time
+            self.dnsCache.invalidate(host, self.port)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class DnsCachingAdapter(HTTPAdapter):
+    ''' A requests-adapter, whose http-connections use a DnsCache. Only the
+        connections of this adapter are affected, not the ones of other urllib3 users.
+    '''
+
+    def __init__(self, dnsCache, **kwargs):
+        self.dnsCache = dnsCache
+        super(DnsCachingAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(DnsCachingAdapter, self).init_poolmanager(*args, **kwargs)
+        connectionClass = type("DnsCachingHTTPConnection", (_DnsCachingHTTPConnection,), {"dnsCache": self.dnsCache})
+        poolClass = type("DnsCachingHTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": connectionClass})
+        classes = dict(self.poolmanager.pool_classes_by_scheme)
+        classes["http"] = poolClass
+        self.poolmanager.pool_classes_by_scheme = classes
+
+
+class HttpClient(object):
+    ''' A thread-safe HTTP-Client which keeps its connections alive.
+
+        All requests of one client share a pool of persistent connections, so
+        that consecutive requests to the same server do not need to open a new
+        TCP-connection (and do a new DNS-lookup) each time.
+
+        Use 'forContextBroker' to retrieve the client shared by all components
+        talking to the same Context-Broker.
+    '''
+
+    # Shared clients via _clients[(address, port)]
+    _clients = {}
+    _lock = threading.Lock()
+
+    def __init__(self, poolSize=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, dnsCacheTtl=DEFAULT_DNS_CACHE_TTL):
+        ''' poolSize:    The number of connections kept alive per host
+            timeout:     The default timeout (in seconds) for each request
+            dnsCacheTtl: Seconds the address of a host is reused for new connections (0 disables it)
+        '''
+        self.poolSize = poolSize
+        self.timeout = timeout
+        self.session = requests.Session()
+        if dnsCacheTtl > 0:
+            self.dnsCache = DnsCache(dnsCacheTtl)
+            adapter = DnsCachingAdapter(self.dnsCache, pool_connections=1, pool_maxsize=poolSize)
+        else:
+            self.dnsCache = None
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolSize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def forContextBroker(cls, configData):
+        ''' Returns the shared client of the Context-Broker specified in configData.
+
+            configData: The "contextbroker"-configuration. The optional
+                        entry "http" can contain "pool_size", "dns_cache_ttl"
+                        and "timeout"
+        '''
+        key = (configData["address"], int(configData["port"]))
+        with cls._lock:
+            if key not in cls._clients:
+                httpConf = configData.get("http", {})
+                poolSize = int(httpConf.get("pool_size", DEFAULT_POOL_SIZE))
+                timeout = float(httpConf.get("timeout", DEFAULT_TIMEOUT))
+                dnsCacheTtl = int(httpConf.get("dns_cache_ttl", DEFAULT_DNS_CACHE_TTL))
+                Log("INFO", "Using {} keep-alive connections for Context-Broker at {}:{}".format(poolSize, key[0], key[1]))
+                cls._clients[key] = cls(poolSize, timeout, dnsCacheTtl)
+            return cls._clients[key]
+
+    def request(self, method, url, **kwargs):
+        ''' Sends a request via the connection pool. All arguments are the same
+            as in 'requests.request'. The default timeout is set if none is given.
+        '''
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request("POST", url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.request("PATCH", url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        ''' Closes all pooled connections
+        '''
+        self.session.close()
@@ -0,0 +1,273 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import abc
+import json
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from include.logger import Log
+from include.geometry import yawFromPose, yawsFromQuaternions
+from include.pubsub.genericPubSub import ABC
+from include.pubsub.contextbroker.cbEncoders import CbEncoders
+
+
+class CbArrayEncoder(ABC):
+    ''' Base of the encoders of ROS-Messages with large arrays (laser scans, maps, paths).
+        The arrays are converted with numpy (subscribe the topic with the option "numpy",
+        so rospy already deserializes them into numpy-arrays) and reduced as configured
+        via the option "reduce" of the topic in 'topics.json':
+
+        "decimate":  Keep only every n-th value (scans and paths)
+        "min_pool":  Keep the minimum of every n values (scans, so no obstacle gets lost)
+        "tile":      Combine n x n cells into one, keeping the most occupied one (maps)
+        "encoding":  "rle" (default) encodes the cells of a map as [value, count, ...], "raw" as list
+        "precision": Number of decimals of the values (default: 3)
+        "max_size":  Maximum size of the attribute in bytes (default: 512000). If an attribute
+                     is larger, the reduction is increased until it fits. The next message starts
+                     with half of this reduction, so it decays to the configured one again.
+
+        Subclasses implement 'encode(payload, factor)', which returns the value of the
+        attribute reduced by factor.
+    '''
+
+    DEFAULT_MAX_SIZE = 512000   # In Bytes, below the 1 MB Orion accepts per request
+    REDUCTION = "decimate"      # The option, which sets the factor of the reduction
+
+    def __init__(self, options):
+        reduce = options.get("reduce", {})
+        self.reduction = reduce
+        self.factor = max(1, int(reduce.get(self.REDUCTION, 1)))
+        self.precision = int(reduce.get("precision", 3))
+        self.maxSize = int(reduce.get("max_size", self.DEFAULT_MAX_SIZE))
+        self.lastFactor = 1
+
+    def __call__(self, attribute, payload, timestamp):
+        # The messages of a topic are similar in size: Start close to the last reduction
+        factor = max(self.factor, self.lastFactor // 2)
+        value = self.encode(payload, factor)
+        size = len(json.dumps(value))
+        while size > self.maxSize:
+            # Increase the reduction proportionally to the excess (at least double it)
+            larger = max(factor * 2, int(math.ceil(factor * size / float(self.maxSize))))
+            if larger > self.maxFactor(payload):
+                Log("WARNING", "Attribute {} exceeds {} bytes, even when reduced by {}".format(attribute, self.maxSize, factor))
+                break
+            factor = larger
+            value = self.encode(payload, factor)
+            size = len(json.dumps(value))
+        self.lastFactor = factor
+        return {
+            "type": "StructuredValue",
+            "value": value
+        }
+
+    @abc.abstractmethod
+    def encode(self, payload, factor):
+        pass
+
+    def maxFactor(self, payload):
+        return 1
+
+    def toList(self, values):
+        ''' Rounds the values to the precision. Values which are not finite (NaN, inf)
+            are not allowed in JSON and become None
+        '''
+        values = numpy.round(numpy.asarray(values, dtype=float), self.precision)
+        finite = numpy.isfinite(values)
+        if finite.all():
+            return values.tolist()
+        values = values.astype(object)
+        values[~finite] = None
+        return values.tolist()
+
+
+def decimate(values, factor):
+    ''' Every factor-th value
+    '''
+    return values[::factor]
+
+
+def minPool(values, factor):
+    ''' The minimum of every factor values (NaN is ignored, an incomplete last window is filled up)
+    '''
+    values = numpy.asarray(values, dtype=float)
+    padded = numpy.full(int(math.ceil(len(values) / float(factor))) * factor, numpy.inf)
+    padded[:len(values)] = numpy.where(numpy.isnan(values), numpy.inf, values)
+    return padded.reshape(-1, factor).min(axis=1)
+
+
+def tile(cells, width, height, factor):
+    ''' Combines factor x factor cells of a map into one. The most occupied cell wins
+        (so obstacles are kept), unknown (-1) only if all cells are unknown.
+        Returns (cells, width, height)
+    '''
+    cells = numpy.asarray(cells, dtype=numpy.int8).reshape(height, width)
+    tiledWidth = int(math.ceil(width / float(factor)))
+    tiledHeight = int(math.ceil(height / float(factor)))
+    padded = numpy.full((tiledHeight * factor, tiledWidth * factor), -1, dtype=numpy.int8)
+    padded[:height, :width] = cells
+    tiled = padded.reshape(tiledHeight, factor, tiledWidth, factor).max(axis=(1, 3))
+    return tiled.ravel(), tiledWidth, tiledHeight
+
+
+def runLengthEncode(cells):
+    ''' Returns the cells as [value, count, value, count, ...]
+    '''
+    cells = numpy.asarray(cells).ravel()
+    if len(cells) == 0:
+        return []
+    starts = numpy.concatenate(([0], numpy.flatnonzero(cells[1:] != cells[:-1]) + 1))
+    counts = numpy.diff(numpy.append(starts, len(cells)))
+    return numpy.column_stack((cells[starts], counts)).ravel().tolist()
+
+
+class LaserScanEncoder(CbArrayEncoder):
+    ''' sensor_msgs/LaserScan: The ranges are reduced via "min_pool" or "decimate".
+        The angle_increment is the one of the reduced ranges
+    '''
+
+    def __init__(self, options):
+        CbArrayEncoder.__init__(self, options)
+        self.pooling = "min_pool" in self.reduction
+        if self.pooling:
+            self.factor = max(1, int(self.reduction["min_pool"]))
+
+    def encode(self, payload, factor):
+        if self.pooling and factor > 1:
+            ranges = minPool(payload.ranges, factor)
+        else:
+            ranges = decimate(numpy.asarray(payload.ranges, dtype=float), factor)
+        return {
+            "angle_min": payload.angle_min,
+            "angle_max": payload.angle_max,
+            "angle_increment": payload.angle_increment * factor,
+            "range_min": payload.range_min,
+            "range_max": payload.range_max,
+            "ranges": self.toList(ranges)
+        }
+
+    def maxFactor(self, payload):
+        return len(payload.ranges)
+
+
+class OccupancyGridEncoder(CbArrayEncoder):
+    ''' nav_msgs/OccupancyGrid: The map is reduced via "tile" and run-length encoded
+        (unless "encoding" is "raw"). The resolution is the one of the reduced map
+    '''
+    REDUCTION = "tile"
+
+    def __init__(self, options):
+        CbArrayEncoder.__init__(self, options)
+        self.encoding = self.reduction.get("encoding", "rle")
+
+    def encode(self, payload, factor):
+        info = payload.info
+        cells, width, height = payload.data, info.width, info.height
+        if factor > 1:
+            cells, width, height = tile(cells, width, height, factor)
+        if self.encoding == "raw":
+            data = numpy.asarray(cells, dtype=numpy.int8).tolist()
+        else:
+            data = runLengthEncode(numpy.asarray(cells, dtype=numpy.int8))
+        return {
+            "resolution": info.resolution * factor,
+            "width": width,
+            "height": height,
+            "origin": {
+                "x": info.origin.position.x,
+                "y": info.origin.position.y,
+                "yaw": yawFromPose(info.origin)
+            },
+            "encoding": self.encoding,
+            "data": data
+        }
+
+    def maxFactor(self, payload):
+        return max(payload.info.width, payload.info.height)
+
+
+class PathEncoder(CbArrayEncoder):
+    ''' nav_msgs/Path: The poses as [[x, y, yaw], ...], reduced via "decimate"
+        (the last pose, the goal, is always kept)
+    '''
+
+    def encode(self, payload, factor):
+        poses = payload.poses
+        indices = list(range(0, len(poses), factor))
+        if poses and indices[-1] != len(poses) - 1:
+            indices.append(len(poses) - 1)
+        values = numpy.array([(p.pose.position.x, p.pose.position.y, p.pose.orientation.x, p.pose.orientation.y,
+                               p.pose.orientation.z, p.pose.orientation.w) for p in (poses[i] for i in indices)],
+                             dtype=float).reshape(-1, 6)
+        poses = numpy.column_stack((values[:, 0], values[:, 1], yawsFromQuaternions(values[:, 2:6])))
+        return {
+            "frame_id": payload.header.frame_id,
+            "poses": self.toList(poses)
+        }
+
+    def maxFactor(self, payload):
+        return len(payload.poses)
+
+
+class PoseWithCovarianceEncoder(CbArrayEncoder):
+    ''' geometry_msgs/PoseWithCovarianceStamped: The pose as x, y, yaw and its covariance.
+        The option "covariance" of "reduce" selects the full 6x6 matrix ("full"), its
+        diagonal ("diagonal", default) or the variances of x, y and yaw ("xy_yaw")
+    '''
+    COVARIANCES = {
+        "full": slice(None),
+        "diagonal": [0, 7, 14, 21, 28, 35],
+        "xy_yaw": [0, 7, 35]
+    }
+
+    def __init__(self, options):
+        CbArrayEncoder.__init__(self, options)
+        self.covariance = self.COVARIANCES.get(self.reduction.get("covariance", "diagonal"), self.COVARIANCES["diagonal"])
+
+    def encode(self, payload, factor):
+        pose = payload.pose.pose
+        return {
+            "x": pose.position.x,
+            "y": pose.position.y,
+            "yaw": yawFromPose(pose),
+            "covariance": self.toList(numpy.asarray(payload.pose.covariance, dtype=float)[self.covariance])
+        }
+
+
+def _register(msgType, encoderClass):
+    def create(options):
+        if numpy is None:
+            Log("WARNING", "numpy is needed to publish {}-messages. Their topics are not published!".format(msgType))
+            return None
+        return encoderClass(options)
+    CbEncoders.registerType(msgType)(create)
+
+
+_register("sensor_msgs/LaserScan", LaserScanEncoder)
+_register("nav_msgs/OccupancyGrid", OccupancyGridEncoder)
+_register("nav_msgs/Path", PathEncoder)
+_register("geometry_msgs/PoseWithCovarianceStamped", PoseWithCovarianceEncoder)
@@ -0,0 +1,179 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+import json
+import time
+import threading
+
+from include.logger import Log
+
+
+class CbBatcher(object):
+    ''' The CbBatcher collects attribute-updates of one or more Entities and sends
+        them as one request to CONTEXT_BROKER / v2 / op / update.
+
+        Updates are collected for 'window_ms' milliseconds (after the first update
+        arrived) or until 'max_updates' attributes are pending. A newer update of an
+        already pending attribute replaces the older one.
+
+        Errors reported by the Context-Broker are mapped back to the topics, which
+        contributed the failed attributes, and reported via 'onFailure'.
+    '''
+    CB_HEADER = {'Content-Type': 'application/json'}
+
+    def __init__(self, http, baseUrl, batchConf, onFailure):
+        ''' http:      The HttpClient to use
+            baseUrl:   The URL of the Context-Broker (e.g. http://orion:1026)
+            batchConf: The "batch"-configuration, with the optional entries
+                       "window_ms", "max_updates" and "entity_type"
+            onFailure: Called with (topics, entityId, attrs, retry) for each Entity which
+                       could not be updated. attrs is the dictionary of the failed attributes,
+                       retry is True if the Context-Broker was not reachable or failed (5xx)
+        '''
+        self.http = http
+        self.url = baseUrl + "/v2/op/update"
+        self.window = float(batchConf.get("window_ms", 50)) / 1000.0
+        self.maxUpdates = int(batchConf.get("max_updates", 50))
+        self.entityType = batchConf.get("entity_type", None)
+        self.onFailure = onFailure
+
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = {}  # _pending[entityId][attrName] = (attrValue, topic)
+        self._count = 0
+        self._stopped = False
+
+        t = threading.Thread(target=self._flushLoop, name="firos-cb-batcher")
+        t.daemon = True
+        t.start()
+
+    def add(self, topic, entityId, attrs):
+        ''' Adds the attributes of an Entity to the next batch
+
+            topic:    The topic the attributes are derived from
+            entityId: The full Entity-ID on the Context-Broker
+            attrs:    A dictionary of NGSIv2-attributes
+        '''
+        with self._cond:
+            entity = self._pending.setdefault(entityId, {})
+            for name in attrs:
+                if name not in entity:
+                    self._count += 1
+                entity[name] = (attrs[name], topic)
+            self._cond.notify()
+
+    def flush(self):
+        ''' Sends all pending updates immediately (blocking)
+        '''
+        with self._cond:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def stop(self):
+        ''' Sends the pending updates and stops the flush thread
+        '''
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.flush()
+
+    def _take(self):
+        batch = self._pending
+        self._pending = {}
+        self._count = 0
+        return batch
+
+    def _flushLoop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Collect further updates until the window closed or the batch is full
+                deadline = time.time() + self.window
+                while self._count < self.maxUpdates and not self._stopped:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take()
+            self._send(batch)
+
+    def _send(self, batch):
+        ''' Sends the batch via a single request and reports the failed entities
+        '''
+        entities = []
+        for entityId in batch:
+            entity = {name: batch[entityId][name][0] for name in batch[entityId]}
+            entity["id"] = entityId
+            if self.entityType is not None:
+                entity["type"] = self.entityType
+            entities.append(entity)
+        jsonStr = json.dumps(dict(actionType="append", entities=entities))
+
+        try:
+            response = self.http.post(self.url, data=jsonStr, headers=self.CB_HEADER)
+        except Exception as e:
+            Log("WARNING", "Could not send batch of {} entities to Contextbroker: {}".format(len(batch), e))
+            failed = {entityId: list(batch[entityId].keys()) for entityId in batch}
+            retry = True
+        else:
+            if response.ok:
+                return
+            failed = self._failedAttributes(response, batch)
+            # Errors of the Context-Broker itself are retried, rejected attributes not
+            retry = response.status_code >= 500
+            Log("ERROR", "Cannot update attributes in Contextbroker via batch :")
+            Log("ERROR", response.content)
+
+        for entityId in failed:
+            attrs = {name: batch[entityId][name][0] for name in failed[entityId]}
+            topics = sorted(set(batch[entityId][name][1] for name in failed[entityId]))
+            self.onFailure(topics, entityId, attrs, retry)
+
+    def _failedAttributes(self, response, batch):
+        ''' Maps the error description of the Context-Broker back onto the entities
+            and attributes of the batch. Orion describes partial failures like:
+            "do not exist: ENTITY_ID - [ ATTR, ATTR ], ENTITY_ID - [ ATTR ]".
+            If nothing can be mapped, the whole batch is considered as failed.
+
+            Returns a dictionary failed[entityId] = [attrName, ...]
+        '''
+        try:
+            description = str(response.json().get("description", ""))
+        except ValueError:
+            description = ""
+
+        failed = {}
+        for entityId in batch:
+            # Anchored, so "robot:1" does not match "robot:10" or "myrobot:1"
+            match = re.search(r"(?:^|[\s,:])" + re.escape(entityId) + r"\s*-\s*\[([^\]]*)\]", description)
+            if match is None:
+                continue
+            names = [name.strip() for name in match.group(1).split(",")]
+            failed[entityId] = [name for name in batch[entityId] if name in names] or list(batch[entityId].keys())
+
+        if not failed:
+            failed = {entityId: list(batch[entityId].keys()) for entityId in batch}
+        return failed
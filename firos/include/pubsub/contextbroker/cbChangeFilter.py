@@ -0,0 +1,125 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import numbers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from include.geometry import yawFromPose
+from include.ros.lazyMsg import LazyMsg, resolveMsg, hasHeader
+
+
+class CbChangeFilter(object):
+    ''' The CbChangeFilter decides, whether a message of a topic differs enough
+        from the last posted message, so that it is worth an update on the ContextBroker.
+
+        It is configured via the options of the topic in 'topics.json':
+
+        "suppress_unchanged": Do not post messages which did not change (default: false)
+        "refresh_interval":   Post the message anyway, if the last post is older than
+                              this number of seconds (default: 0, never)
+        "deadband":           Changes up to these thresholds are ignored:
+                              "position" and "angle" (radians) for Poses,
+                              "value" for messages with a numeric 'data'-field
+
+        Messages which are still serialized (LazyMsg) are first compared by their raw
+        content, so unchanged ones are suppressed without deserializing them. In both cases
+        the seq and stamp of the header are ignored, its frame_id is compared.
+    '''
+
+    def __init__(self, options):
+        self.suppressUnchanged = bool(options.get("suppress_unchanged", False))
+        self.refreshInterval = float(options.get("refresh_interval", 0))
+        deadband = options.get("deadband", {})
+        self.positionEpsilon = float(deadband.get("position", 0))
+        self.angleEpsilon = float(deadband.get("angle", 0))
+        self.valueEpsilon = float(deadband.get("value", 0))
+
+    def shouldPublish(self, previous, postedAt, current, now):
+        ''' previous: The last posted message or None
+            postedAt: The time (in seconds) previous was posted
+            current:  The new message
+            now:      The current time (in seconds)
+        '''
+        if not self.suppressUnchanged or previous is None:
+            return True
+        if self.refreshInterval > 0 and now - postedAt >= self.refreshInterval:
+            return True
+        if type(current) is LazyMsg and type(previous) is LazyMsg and current.sameContent(previous):
+            return False
+        return self.isChanged(resolveMsg(previous), resolveMsg(current))
+
+    def isChanged(self, previous, current):
+        ''' Compares the messages, respecting the deadbands
+        '''
+        if hasHeader(type(current)) and current.header.frame_id != previous.header.frame_id:
+            return True
+
+        if hasattr(current, "position") and hasattr(current, "orientation"):
+            dx = current.position.x - previous.position.x
+            dy = current.position.y - previous.position.y
+            dz = current.position.z - previous.position.z
+            if math.sqrt(dx * dx + dy * dy + dz * dz) > self.positionEpsilon:
+                return True
+            return abs(_angleDiff(yawFromPose(current), yawFromPose(previous))) > self.angleEpsilon
+
+        if hasattr(current, "data") and isinstance(current.data, numbers.Number) and not isinstance(current.data, bool):
+            if current.data == previous.data:
+                return False
+            return abs(current.data - previous.data) > self.valueEpsilon
+
+        return not _sameContent(previous, current)
+
+
+def _sameContent(previous, current):
+    ''' Compares the messages as LazyMsg.sameContent does: Without the header
+        (its frame_id is already compared)
+    '''
+    if type(previous) is not type(current) or not hasattr(current, "_slot_types"):
+        return _equal(previous, current)
+    fields = current.__slots__[1:] if hasHeader(type(current)) else current.__slots__
+    return all(_equal(getattr(previous, field), getattr(current, field)) for field in fields)
+
+
+def _equal(a, b):
+    ''' Compares two values of messages field by field. Arrays of topics with the
+        option "numpy" are numpy-arrays, which cannot be compared with ==
+    '''
+    if numpy is not None and (isinstance(a, numpy.ndarray) or isinstance(b, numpy.ndarray)):
+        return numpy.array_equal(a, b)
+    if type(a) is not type(b):
+        return a == b
+    if hasattr(a, "_slot_types"):
+        return all(_equal(getattr(a, field), getattr(b, field)) for field in a.__slots__)
+    if type(a) in (list, tuple):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _angleDiff(a, b):
+    ''' Difference of two angles, normalized into [-pi, pi)
+    '''
+    return (a - b + math.pi) % (2 * math.pi) - math.pi
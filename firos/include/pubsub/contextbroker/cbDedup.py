@@ -0,0 +1,112 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import threading
+from collections import OrderedDict
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+
+class CbDedup(object):
+    ''' The CbDedup recognizes notifications, which the ContextBroker delivers twice
+        (on retries or while two subscriptions overlap during their renewal).
+
+        Each notified attribute is keyed on its topic (the entity id and attribute),
+        its "dateModified"-metadata and a hash of its value. An attribute is a duplicate,
+        if its key was seen within the last 'window' seconds. At most 'maxSize' keys are
+        kept (the least recently seen ones are dropped first).
+
+        Attributes without "dateModified" are never duplicates: The same value might
+        be sent again on purpose (e.g. the same command twice).
+
+        A 'window' of 0 disables the deduplication.
+    '''
+
+    def __init__(self, maxSize=1024, window=60):
+        self.maxSize = maxSize
+        self.window = window
+        self.hits = 0
+        self.misses = 0
+        # The time each key was seen first via _entries[KEY], least recently seen first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def isDuplicate(self, topic, value, modified=None, now=None):
+        ''' Returns True, if this attribute was already notified within the window.
+            Otherwise it is remembered and False is returned. Attributes without
+            modified are not remembered.
+
+            topic:    The topic of the notified attribute
+            value:    The value of the attribute
+            modified: The "dateModified"-metadata of the attribute (or None)
+        '''
+        if self.window <= 0 or modified is None:
+            return False
+        key = self._key(topic, value, modified)
+        if now is None:
+            now = monotonic()
+
+        with self._lock:
+            seenAt = self._entries.pop(key, None)
+            if seenAt is not None and now - seenAt <= self.window:
+                self._entries[key] = seenAt
+                self.hits += 1
+                return True
+            self._entries[key] = now
+            self.misses += 1
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+            return False
+
+    def forget(self, topic, value, modified=None):
+        ''' Removes an attribute remembered by 'isDuplicate' (e.g. if it could not be
+            processed), so it is not treated as duplicate when it is delivered again
+        '''
+        if modified is None:
+            return
+        with self._lock:
+            self._entries.pop(self._key(topic, value, modified), None)
+
+    def _key(self, topic, value, modified):
+        # dateModified has only a resolution of seconds (or less): Other values are other updates
+        return (topic, modified, self._valueHash(value))
+
+    @staticmethod
+    def _valueHash(value):
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return hash(value)
+        return hash(json.dumps(value, sort_keys=True))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses, size=len(self._entries), window=self.window)
+
+    def __len__(self):
+        return len(self._entries)
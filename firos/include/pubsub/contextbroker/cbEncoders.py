@@ -0,0 +1,170 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from include.constants import Constants as C
+from include.geometry import yawFromPose
+from include.ros.msgCodec import MsgCodec
+
+
+class CbEncoders:
+    ''' Registry of the encoders, which convert a ROS-Message into the NGSIv2-Attribute
+        of the ContextBroker. The encoder is chosen by the attribute name, which is the
+        last part of the topic (e.g. '/ROBOT_ID/location' -> 'location').
+
+        An encoder is a function (attribute, payload, timestamp) returning the attribute
+        as dictionary. timestamp is the current time in ISO 8601. New attribute types
+        can be added via:
+
+            @CbEncoders.register("myAttribute")
+            def encodeMyAttribute(attribute, payload, timestamp):
+                return {"type": "Number", "value": payload.data}
+
+        Attributes without an encoder of their own can be encoded by the type of the
+        ROS-Message. These encoders are created for each topic with its options:
+
+            @CbEncoders.registerType("sensor_msgs/LaserScan")
+            def createScanEncoder(options):
+                return encoder
+
+        All other topics can be published with the option "structured" as the whole
+        message (via the generated toDict of the MsgCodec).
+    '''
+    _encoders = {}
+    _typeEncoders = {}
+
+    @classmethod
+    def register(cls, attribute):
+        def decorator(encoder):
+            cls._encoders[attribute] = encoder
+            return encoder
+        return decorator
+
+    @classmethod
+    def registerType(cls, msgType):
+        def decorator(factory):
+            cls._typeEncoders[msgType] = factory
+            return factory
+        return decorator
+
+    @classmethod
+    def get(cls, attribute):
+        ''' Returns the encoder of attribute or None
+        '''
+        return cls._encoders.get(attribute)
+
+    @classmethod
+    def forTopic(cls, attribute, msgType, options):
+        ''' Returns the encoder of attribute or, if there is none, a new encoder for
+            the message type (created with the options of the topic), the structured
+            encoder (if the option "structured" is set) or None
+        '''
+        encoder = cls._encoders.get(attribute)
+        if encoder is None and msgType in cls._typeEncoders:
+            encoder = cls._typeEncoders[msgType](options)
+        if encoder is None and options.get("structured", False):
+            encoder = encodeStructured
+        return encoder
+
+
+# The last formatted timestamp via [second, timestamp]
+_timestampCache = [None, None]
+
+def isoTimestamp():
+    ''' Returns the current time in ISO 8601. The string is only formatted once per second
+    '''
+    now = int(time.time())
+    cache = _timestampCache
+    if cache[0] != now:
+        cache[1] = time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(now))
+        cache[0] = now
+    return cache[1]
+
+
+def encodeStructured(attribute, payload, timestamp):
+    ''' Encodes the whole message as StructuredValue
+    '''
+    return {
+        'type': 'StructuredValue',
+        'value': MsgCodec.forClass(type(payload)).toDict(payload)
+    }
+
+
+###############################################################################
+###########################   FEATS Specific Encoders   #######################
+###############################################################################
+
+@CbEncoders.register('status')
+def encodeStatus(attribute, payload, timestamp):
+    return {
+        'type': 'Text',
+        'value': payload.data,
+        'metadata': {
+            'context': {
+                'type': 'Text',
+                'value': C.CONTEXT_ID
+            },
+            'dateModified': {
+                "type": "DateTime",
+                "value": timestamp
+            }
+        }
+    }
+
+
+@CbEncoders.register('battery')
+def encodeBattery(attribute, payload, timestamp):
+    return {
+        'type': 'Number',
+        'value': payload.data
+    }
+
+
+@CbEncoders.register('location')
+def encodeLocation(attribute, payload, timestamp):
+    angle = yawFromPose(payload)
+    return {
+        'type': 'geo:json',
+        'value': {
+            'type': 'Point',
+            'coordinates': [
+                payload.position.x,
+                payload.position.y
+            ]
+        },
+        "metadata": {
+            "angle": {
+                "type": "Double",
+                "value": angle
+            }
+        }
+    }
+
+
+@CbEncoders.register('heartbeat')
+def encodeHeartbeat(attribute, payload, timestamp):
+    return {
+        "type": "DateTime",
+        "value": timestamp,
+        "metadata": {}
+    }
@@ -0,0 +1,176 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+from collections import deque
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+from include.logger import Log
+
+
+class CbIngressQueue(object):
+    ''' The CbIngressQueue decouples the acknowledgement of a notification from
+        publishing it into ROS. The notification server only validates and enqueues
+        the attributes and responds right away, while 'workers' threads call
+        'dispatch(topic, value, context)' for each of them.
+
+        The entries of a topic are kept in their own FIFO and dispatched in order
+        (a topic is only handled by one worker at a time). At most 'maxSize' entries
+        are queued. If the queue is full, 'overflow' decides what happens:
+
+        "drop_oldest": The oldest queued entry of the same topic is dropped (or of the
+                       topic with the most entries, if the topic has none queued)
+        "reject":      The entries are not enqueued and 'put' returns False
+                       (the notification is answered with 503)
+    '''
+
+    OVERFLOW_MODES = ("drop_oldest", "reject")
+
+    def __init__(self, dispatch, maxSize=1000, workers=2, overflow="drop_oldest"):
+        if overflow not in self.OVERFLOW_MODES:
+            Log("WARNING", "Unknown overflow behaviour '{}' of the ingress queue, using 'drop_oldest'".format(overflow))
+            overflow = "drop_oldest"
+        self.dispatch = dispatch
+        self.maxSize = max(1, int(maxSize))
+        self.overflow = overflow
+
+        # The queued entries (enqueuedAt, value, context) of each topic via _queues[TOPIC],
+        # the topics, which have entries and are not dispatched at the moment, and the
+        # topics which are dispatched at the moment
+        self._queues = {}
+        self._ready = deque()
+        self._busy = set()
+        self._size = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+
+        # Counters
+        self.enqueued = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.maxDepth = 0
+        self.waitTotal = 0.0
+        self.waitMax = 0.0
+
+        self._workers = []
+        for i in range(max(1, int(workers))):
+            t = threading.Thread(target=self._work, name="firos-ingress-{}".format(i))
+            t.daemon = True
+            t.start()
+            self._workers.append(t)
+
+    def put(self, entries):
+        ''' Enqueues the entries [(topic, value, context), ...] of one notification.
+            Returns False, if they were rejected, since the queue is full.
+        '''
+        now = monotonic()
+        with self._cond:
+            if self._stopped:
+                return False
+            if self.overflow == "reject" and self._size + len(entries) > self.maxSize:
+                self.rejected += len(entries)
+                return False
+            for topic, value, context in entries:
+                if self._size >= self.maxSize:
+                    self._dropOldest(topic)
+                queue = self._queues.get(topic)
+                if queue is None:
+                    queue = self._queues[topic] = deque()
+                if not queue and topic not in self._busy:
+                    self._ready.append(topic)
+                queue.append((now, value, context))
+                self._size += 1
+            self.enqueued += len(entries)
+            self.maxDepth = max(self.maxDepth, self._size)
+            self._cond.notify(len(entries))
+        return True
+
+    def _dropOldest(self, topic):
+        queue = self._queues.get(topic)
+        if not queue:
+            topic = max(self._queues, key=lambda t: len(self._queues[t]))
+            queue = self._queues[topic]
+        queue.popleft()
+        self._size -= 1
+        self.dropped += 1
+        if not queue and topic not in self._busy:
+            self._ready.remove(topic)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                topic = self._ready.popleft()
+                enqueuedAt, value, context = self._queues[topic].popleft()
+                self._size -= 1
+                self._busy.add(topic)
+                wait = monotonic() - enqueuedAt
+                self.waitTotal += wait
+                self.waitMax = max(self.waitMax, wait)
+
+            failed = False
+            try:
+                self.dispatch(topic, value, context)
+            except Exception as e:
+                failed = True
+                Log("WARNING", "Could not publish the notified value of topic {}: {!r}".format(topic, e))
+
+            with self._cond:
+                self._busy.discard(topic)
+                self.dispatched += 1
+                if failed:
+                    self.failed += 1
+                queue = self._queues.get(topic)
+                if queue:
+                    self._ready.append(topic)
+                    self._cond.notify()
+                elif queue is not None:
+                    del self._queues[topic]
+
+    def stop(self):
+        ''' Stops the workers. Entries, which are still queued, are discarded
+        '''
+        with self._cond:
+            self._stopped = True
+            self._queues.clear()
+            self._ready.clear()
+            self._size = 0
+            self._cond.notify_all()
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        with self._cond:
+            return dict(depth=self._size, maxDepth=self.maxDepth, enqueued=self.enqueued,
+                        dispatched=self.dispatched, failed=self.failed, dropped=self.dropped,
+                        rejected=self.rejected, waitMax=self.waitMax,
+                        waitAvg=self.waitTotal / self.dispatched if self.dispatched else 0.0)
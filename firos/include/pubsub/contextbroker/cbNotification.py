@@ -0,0 +1,159 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# The fastest available JSON-backend. The stdlib is the fallback
+try:
+    import orjson as _jsonBackend
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import ujson as _jsonBackend
+        JSON_BACKEND = "ujson"
+    except ImportError:
+        import json as _jsonBackend
+        JSON_BACKEND = "json"
+
+loads = _jsonBackend.loads
+
+DEFAULT_MAX_SIZE = 1024 * 1024  # In Bytes
+
+
+class NotificationError(ValueError):
+    ''' A notification which is rejected as a whole. status is the HTTP-Status
+        of the response (400 if malformed, 413 if too large, 503 if it cannot be queued)
+    '''
+    def __init__(self, message, status=400):
+        ValueError.__init__(self, message)
+        self.status = status
+
+
+class CbExtractor(object):
+    ''' Pulls the routed attributes out of the entities of a notification. Each
+        subscription has its own extractor, which only looks up the attributes
+        the subscription notifies.
+    '''
+    __slots__ = ("attrs", "routes")
+
+    def __init__(self, attrs, routes):
+        ''' attrs:  The attributes notified by the subscription
+            routes: The topics via routes[(ENTITY_ID, ATTRIBUTE)]
+        '''
+        self.attrs = tuple(attrs)
+        self.routes = routes
+
+    def extract(self, entity):
+        ''' Returns [(topic, value, context, modified), ...] of all routed attributes of entity.
+            context and modified are the values of the metadata "context" and
+            "dateModified" (or None).
+            Raises an Exception, if the entity is malformed
+        '''
+        entityId = entity["id"]
+        routes = self.routes
+        result = []
+        for attr in self.attrs:
+            attribute = entity.get(attr)
+            if attribute is None:
+                continue
+            topic = routes.get((entityId, attr))
+            if topic is None:
+                continue
+            metadata = attribute.get("metadata")
+            if metadata:
+                context = metadata.get("context")
+                modified = metadata.get("dateModified")
+                result.append((topic, attribute["value"], context.get("value") if context else None,
+                               modified.get("value") if modified else None))
+            else:
+                result.append((topic, attribute["value"], None, None))
+        return result
+
+
+class CbNotificationDecoder(object):
+    ''' Decodes the notifications (NGSIv2) of the Context-Broker.
+
+        The size is checked before the body is read, the body is parsed with the fastest
+        available JSON-backend and the entities are handed to the extractor of their
+        subscription. Malformed notifications raise a NotificationError, so they can be
+        rejected with a 400-Response.
+    '''
+
+    def __init__(self, routes, maxSize=DEFAULT_MAX_SIZE):
+        ''' routes:  The topics via routes[(ENTITY_ID, ATTRIBUTE)]
+            maxSize: The maximum size of a notification in bytes
+        '''
+        self.routes = routes
+        self.maxSize = maxSize
+        self._extractors = {}   # _extractors[SUBSCRIPTION_ID] = CbExtractor
+        self._fallback = None   # Used for unknown subscriptions, with all routed attributes
+        self._fallbackRoutes = 0
+
+    def registerSubscription(self, subscriptionId, attrs):
+        ''' Precompiles the extractor of a subscription
+
+            subscriptionId: The ID (or its location '/v2/subscriptions/ID')
+            attrs:          The notified attributes
+        '''
+        self._extractors[subscriptionId.split("/")[-1]] = CbExtractor(sorted(attrs), self.routes)
+
+    def unregisterSubscription(self, subscriptionId):
+        self._extractors.pop(subscriptionId.split("/")[-1], None)
+
+    def read(self, contentLength, rfile):
+        ''' Reads the body of a request after checking its size. Returns the body
+        '''
+        try:
+            length = int(contentLength)
+        except (TypeError, ValueError):
+            raise NotificationError("Missing or invalid Content-Length")
+        if length < 0:
+            raise NotificationError("Invalid Content-Length")
+        if length > self.maxSize:
+            raise NotificationError("Notification of {} bytes exceeds {} bytes".format(length, self.maxSize), 413)
+        return rfile.read(length)
+
+    def decode(self, body):
+        ''' Parses the body of a notification.
+            Returns (subscriptionId, entities, extractor)
+        '''
+        try:
+            notification = loads(body)
+        except Exception:
+            raise NotificationError("Notification is no valid JSON")
+        if not isinstance(notification, dict):
+            raise NotificationError("Notification is no JSON-Object")
+        entities = notification.get("data")
+        if not isinstance(entities, list):
+            raise NotificationError("Notification contains no 'data'-Array")
+
+        subscriptionId = notification.get("subscriptionId")
+        extractor = self._extractors.get(subscriptionId)
+        if extractor is None:
+            extractor = self._fallbackExtractor()
+        return subscriptionId, entities, extractor
+
+    def _fallbackExtractor(self):
+        ''' The extractor for notifications of unknown subscriptions (e.g. of a previous run)
+        '''
+        if self._fallback is None or self._fallbackRoutes != len(self.routes):
+            self._fallbackRoutes = len(self.routes)
+            self._fallback = CbExtractor(sorted(set(attr for _, attr in list(self.routes.keys()))), self.routes)
+        return self._fallback
@@ -0,0 +1,66 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from include.constants import Constants as C
+from include.pubsub.contextbroker.cbEncoders import CbEncoders, isoTimestamp
+# Registers the encoders of large array messages (scans, maps, paths)
+from include.pubsub.contextbroker import cbArrayEncoders
+
+
+class CbPublishPlan(object):
+    ''' A CbPublishPlan contains everything the CbPublisher needs to publish a message
+        of a topic, precomputed once when the topic is registered:
+        the Entity-ID, the URL of its attributes, the attribute name, the encoder
+        and the CbChangeFilter of the topic.
+
+        If no encoder is registered for the attribute or the message type, 'encoder'
+        is None and the messages of this topic are not published.
+    '''
+    __slots__ = ("topic", "entityId", "attribute", "url", "encoder", "changeFilter")
+
+    def __init__(self, topic, baseUrl, changeFilter, msgType=None, options=None):
+        ''' topic:        The topic like '/ROBOT_ID/ATTRIBUTE'
+            baseUrl:      The URL to the entities (CONTEXT_BROKER/v2/entities/)
+            changeFilter: The CbChangeFilter of this topic
+            msgType:      The type of the ROS-Message (e.g. 'sensor_msgs/LaserScan'), if known
+            options:      The options of the topic (as in the 'topics.json')
+        '''
+        parts = topic.split("/")
+        self.topic = topic
+        self.entityId = C.ID_PREFIX + parts[1].replace('_', ':')
+        self.attribute = parts[2] if len(parts) > 2 else None
+        self.url = baseUrl + self.entityId + "/attrs"
+        self.encoder = CbEncoders.forTopic(self.attribute, msgType, options or {})
+        self.changeFilter = changeFilter
+
+    def encode(self, payload):
+        ''' Returns the attribute-update of payload (with the current timestamp)
+        '''
+        timestamp = isoTimestamp()
+        return {
+            self.attribute: self.encoder(self.attribute, payload, timestamp),
+            'dateModified': {
+                "type": "DateTime",
+                "value": timestamp,
+                "metadata": {}
+            }
+        }
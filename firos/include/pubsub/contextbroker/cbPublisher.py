@@ -21,22 +21,21 @@ __version__ = "0.0.1a"
 __status__ = "Developement"
 
 import json
-import requests
 import os
-import tf
 import time
+import threading
 from include.logger import Log
 from include.constants import Constants as C
-from include.FiwareObjectConverter.objectFiwareConverter import ObjectFiwareConverter
+from include import confManager
+from include.httpClient import HttpClient
 from include.pubsub.genericPubSub import Publisher
-from geometry_msgs.msg import Quaternion
-import datetime
-try:
-    # Python 3
-    from queue import Queue
-except ImportError:
-    # Python 2
-    from Queue import Queue
+from include.pubsub.contextbroker.cbBatcher import CbBatcher
+from include.pubsub.contextbroker.cbSpool import CbSpool
+from include.pubsub.contextbroker.cbChangeFilter import CbChangeFilter
+from include.pubsub.contextbroker.cbEncoders import CbEncoders, isoTimestamp
+from include.pubsub.contextbroker.cbPublishPlan import CbPublishPlan
+from include.stats import registerStats
+from include.ros.lazyMsg import resolveMsg
 #from include.pubsub.contextbroker.cbSubscriber import context_id as CONTEXT_ID
 
 class CbPublisher(Publisher):
@@ -46,17 +45,29 @@ class CbPublisher(Publisher):
 
         Also the rawMsg is converted here via the Object Converter
 
-        THIS IS THE ONLY FILE WHICH OPERATES ON /v2/entities
+        THIS IS THE ONLY FILE WHICH OPERATES ON /v2/entities (and /v2/op/update via the CbBatcher)
+
+        If "batch" is set in the configuration, the attribute updates are not sent
+        one by one, but collected and sent via the CbBatcher.
+
+        Updates which could not be sent, since the ContextBroker was not reachable,
+        are saved in the CbSpool and replayed as soon as it is reachable again.
+        The CbSpool is only created with the first spooled update (or on start, if
+        its database already exists, so updates of the last run are replayed).
 
         Also this Method is called, after FIROS received a Message 
     '''
 
     # Keeps track of the posted Content on the ContextBroker
-    # via posted_history[ROBOT_ID + "/" + TOPIC] 
+    # via posted_history[ROBOT_ID + "/" + TOPIC] and when it was posted via posted_time[...]
     posted_history = {}
+    posted_time = {}
+    # The precomputed CbPublishPlan of each topic via plans[topic]
+    plans = {}
     CB_HEADER = {'Content-Type': 'application/json'}
     CB_BASE_URL = None
-    q = Queue()
+    # Client errors, which are worth to retry (Request Timeout, Too Many Requests)
+    RETRY_STATUS = (408, 429)
 
     def __init__(self):
         ''' Lazy Initialization of CB_BASE_URL
@@ -78,15 +89,52 @@ class CbPublisher(Publisher):
             raise Exception("No Context-Broker specified!")
 
         self.data = data
+        self.http = HttpClient.forContextBroker(data)
         self.CB_BASE_URL = "http://{}:{}/v2/entities/".format(data["address"], data["port"])
 
+        self.suppressed = 0
+        registerStats("changeFilter", lambda: dict(suppressed=self.suppressed))
+
+        spoolConf = data.get("spool", {})
+        self.spoolPath = confManager.getSpoolPath(spoolConf)
+        self.spoolRate = spoolConf.get("drain_rate", 5)
+        self.spool = None
+        self._spoolLock = threading.Lock()
+        if os.path.exists(self.spoolPath):
+            self._getSpool()
+        registerStats("spool", lambda: self.spool.stats() if self.spool is not None else dict(size=0, spooled=0, replayed=0))
+
+        self.batcher = None
+        if "batch" in data:
+            self.batcher = CbBatcher(self.http, "http://{}:{}".format(data["address"], data["port"]), data["batch"], self._batchFailed)
+
+
+    def registerTopic(self, topic, msgType):
+        ''' Precomputes the CbPublishPlan of topic, so that 'publish' only needs
+            to look it up.
+
+            topic:   a string, corresponding to the topic in ros
+            msgType: the type of the ROS-Message (e.g. 'geometry_msgs/Pose')
+        '''
+        if self.noConf:
+            return
+        self._createPlan(topic, msgType)
+
+    def _createPlan(self, topic, msgType=None):
+        options = confManager.getTopicOptions(topic)
+        plan = CbPublishPlan(topic, self.CB_BASE_URL, CbChangeFilter(options), msgType, options)
+        if plan.encoder is None:
+            Log("WARNING", "No encoder for attribute '{}' of topic {}. It will not be published!".format(plan.attribute, topic))
+        self.plans[topic] = plan
+        return plan
 
     def publish(self, topic, rawMsg, msgDefintionDict):
         ''' This is the actual publish-Routine which updates and creates Entities on the
             ContextBroker. It also keeps track via posted_history on already posted entities and topics
 
             topic:   a string, corresponding to the topic in ros
-            rawMsg:  the raw data directly obtained from rospy
+            rawMsg:  the raw data directly obtained from rospy (or a LazyMsg, which is
+                     only deserialized if it is published)
             msgDefintionDict: The Definition as obtained directly from ROS-Messages
 
             We do not need to invoke something special here. This method gets called automatically,
@@ -98,59 +146,133 @@ class CbPublisher(Publisher):
         if self.noConf:
             return
 
-        # Create Update-JSON
-        obj = {s: getattr(rawMsg, s, None) for s in rawMsg.__slots__}
-        obj["id"] = topic.split("/")[1].replace('_', ':')
-        try:
-            attr = topic.split("/")[2]
-        except:
-            return
-        
-        data = self.set_data(attr, rawMsg)        
-        
-        if data is not False:
-            jsonStr = json.dumps(data)
-        else:
+        plan = self.plans.get(topic)
+        if plan is None:
+            plan = self._createPlan(topic, getattr(rawMsg, "_type", None))
+        if plan.encoder is None:
             return
 
-        # if struct not initilized, intitilize it even on ContextBroker!
-        if topic not in self.posted_history:
-            self.posted_history[topic] = rawMsg
-            response = requests.post(self.CB_BASE_URL + C.ID_PREFIX + obj["id"] + "/attrs", data=jsonStr, headers=self.CB_HEADER, timeout=5)
-            self._responseCheck(response, attrAction=0, topEnt=topic)
+        # Skip messages which did not change (enough) since the last post
+        now = time.time()
+        if not plan.changeFilter.shouldPublish(self.posted_history.get(topic), self.posted_time.get(topic), rawMsg, now):
+            self.suppressed += 1
             return
 
-        # Replace previous rawMsg with current one
+        # Create Update-JSON
+        data = plan.encode(resolveMsg(rawMsg))
+        entityId = plan.entityId
+        action = 1 if topic in self.posted_history else 0
         self.posted_history[topic] = rawMsg
+        self.posted_time[topic] = now
 
-        # Update attribute on ContextBroker
+        # While older updates are spooled, spool this one, too. So the spool
+        # can never overwrite a newer value on the ContextBroker
+        if self._spooling():
+            self._spoolUpdate(entityId, data)
+            return
+
+        # Let the batcher send the update (attributes are appended, so no initialization is needed)
+        if self.batcher is not None:
+            self.batcher.add(topic, entityId, data)
+            return
+
+        # if struct not initilized, intitilize it even on ContextBroker! Otherwise update the attributes
         try:
-            response = requests.patch(self.CB_BASE_URL + C.ID_PREFIX + obj["id"] + "/attrs", data=jsonStr, headers=self.CB_HEADER, timeout=5)
-            self._responseCheck(response, attrAction=1, topEnt=topic)
-            # send requests which are enqueued
-            while not self.q.empty():
-                response = requests.patch(self.CB_BASE_URL + C.ID_PREFIX + obj["id"] + "/attrs", data=self.q.get(), headers=self.CB_HEADER, timeout=5)
-                self._responseCheck(response, attrAction=1, topEnt=topic)
-                time.sleep(1)
-        except:
-            print("Connection issue, saving request to queue")
-            # if the PATCH fails, save to queue and re-send when connection returns
-            if not self.q.full():
-                self.q.put(jsonStr)
+            if action == 0:
+                response = self.http.post(plan.url, data=json.dumps(data), headers=self.CB_HEADER)
+            else:
+                response = self.http.patch(plan.url, data=json.dumps(data), headers=self.CB_HEADER)
+            self._responseCheck(response, attrAction=action, topEnt=topic)
+        except Exception:
+            Log("WARNING", "Connection issue, spooling update of topic: {}".format(topic))
+            # save to the spool, which resends it when the connection returns
+            self._spoolUpdate(entityId, data)
+
+    def _spooling(self):
+        ''' Whether updates are spooled, which are not replayed yet
+        '''
+        return self.spool is not None and len(self.spool) > 0
+
+    def _getSpool(self):
+        ''' Returns the CbSpool, which is created on first use (or None, if it cannot be created)
+        '''
+        if self.spool is None:
+            with self._spoolLock:
+                if self.spool is None:
+                    try:
+                        self.spool = CbSpool(self.spoolPath, self._sendSpooled, self.spoolRate)
+                    except Exception as e:
+                        Log("ERROR", "Cannot create the spool {}: {}".format(self.spoolPath, e))
+        return self.spool
+
+    def _spoolUpdate(self, entityId, attrs):
+        spool = self._getSpool()
+        if spool is None:
+            Log("ERROR", "Update of {} is lost, since it cannot be spooled".format(entityId))
             return
+        spool.put(entityId, attrs)
+
 
+    def flush(self):
+        '''
+            Sends the updates which are still collected in the batcher
+        '''
+        if self.noConf:
+            return
+        if self.batcher is not None:
+            self.batcher.stop()
 
     def unpublish(self):
         ''' 
             Removes all previously tracked topics on ContextBroker
             This method also gets automaticall called, someone sent Firos the Shutdown Signal
         '''
-        for idd in self.posted_history.keys():
-            response = requests.delete(self.CB_BASE_URL + idd.replace("/", ".")) # OCB Specific!!
-            self._responseCheck(response, attrAction=2, topEnt=idd)
-        
-        
+        self.flush()
+        for _, task in self.unpublishTasks():
+            task()
 
+    def unpublishTasks(self):
+        '''
+            Returns the steps of 'unpublish': Stopping the spool (its content stays on disk)
+            and one deletion for each tracked topic.
+        '''
+        if self.noConf:
+            return []
+        tasks = [("CbSpool.stop", self.spool.stop)] if self.spool is not None else []
+        for idd in list(self.posted_history.keys()):
+            tasks.append(("DELETE " + idd, lambda idd=idd: self._delete(idd)))
+        return tasks
+
+    def _delete(self, idd):
+        response = self.http.delete(self.CB_BASE_URL + idd.replace("/", ".")) # OCB Specific!!
+        self._responseCheck(response, attrAction=2, topEnt=idd)
+
+
+
+
+    def _batchFailed(self, topics, entityId, attrs, retry):
+        ''' Called by the CbBatcher for each Entity it could not update.
+            If the Context-Broker was not reachable, the update is spooled.
+        '''
+        for topic in topics:
+            Log("ERROR", "Cannot update attributes {} in Contextbroker for topic: {}".format(sorted(attrs.keys()), topic))
+        if retry:
+            self._spoolUpdate(entityId, attrs)
+
+    def _sendSpooled(self, entityId, attrs):
+        ''' Called by the CbSpool to replay a spooled update. Returns False,
+            if the ContextBroker is still not reachable or failed (5xx, 408, 429),
+            so the update is kept. Updates the ContextBroker rejected (4xx) are dropped
+        '''
+        try:
+            response = self.http.post(self.CB_BASE_URL + entityId + "/attrs", data=json.dumps(attrs), headers=self.CB_HEADER)
+        except Exception:
+            return False
+        if response.status_code >= 500 or response.status_code in self.RETRY_STATUS:
+            Log("WARNING", "Contextbroker failed to replay spooled update of {}: {}".format(entityId, response.status_code))
+            return False
+        self._responseCheck(response, attrAction=1, topEnt=entityId)
+        return True
 
     def _responseCheck(self, response, attrAction=0, topEnt=None):
         ''' Check if Response is ok (2XX and some 3XX). If not print an individual Error.
@@ -159,7 +281,11 @@ class CbPublisher(Publisher):
             attrAction: One of [0, 1, 2]  which maps to -> [Creation, Update, Deletion]
             topEnt: the String of an Entity or a topic, which was used
         '''
-        if not response.ok:
+        if response.ok:
+            # The ContextBroker is reachable (again)
+            if self._spooling():
+                self.spool.resume()
+        else:
             if attrAction == 0:
                 Log("WARNING", "Could not create Entitiy {} in Contextbroker :".format(topEnt))
                 Log("WARNING", response.content)
@@ -172,74 +298,18 @@ class CbPublisher(Publisher):
 
     def set_data(self, attribute, payload):
         ''' Return data for Fiware publication, according to attribute type (FEATS specific)
-        
+            The encoders of the attributes are registered in CbEncoders.
         '''
-        if attribute == 'status':
-            data = {
-                attribute:
-                {
-                    'type': 'Text',
-                    'value': payload.data,
-                    'metadata': {
-                        'context': {
-                            'type': 'Text',
-                            'value': C.CONTEXT_ID
-                        },
-                        'dateModified': {
-                            "type": "DateTime",
-                            "value": time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(time.time())) # ISO 8601
-                        }
-                    }
-                }
-            }
-        elif attribute == 'battery':
-            data = {
-                attribute:
-                {
-                    'type': 'Number',
-                    'value': payload.data
-                }
-            }
-        elif attribute == 'location':
-            angle = tf.transformations.euler_from_quaternion([
-                            payload.orientation.x,
-                            payload.orientation.y,
-                            payload.orientation.z,
-                            payload.orientation.w])[2]
-            data = {
-                attribute:
-                {
-                    'type': 'geo:json',
-                    'value': {
-                        'type': 'Point',
-                        'coordinates': [
-                            payload.position.x,
-                            payload.position.y
-                        ]
-                    },
-                    "metadata": {
-                        "angle": {
-                            "type": "Double",
-                            "value": angle
-                        }
-                    }
-                }
-            }
-        elif attribute == 'heartbeat':
-            data = {
-                attribute: {
-                    "type": "DateTime",
-                    "value": time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(time.time())), # ISO 8601
-                    "metadata" : {}
-                }
-            }
-        else:
+        encoder = CbEncoders.get(attribute)
+        if encoder is None:
             Log("WARNING", "You are trying to change the wrong attribute!")
             return
+        timestamp = isoTimestamp()
+        data = {attribute: encoder(attribute, payload, timestamp)}
         # add current timestamp to data
         data['dateModified'] = {
             "type": "DateTime",
-            "value": time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(time.time())),
+            "value": timestamp,
             "metadata": {}
         }
-        return data
\ No newline at end of file
+        return data
@@ -0,0 +1,198 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import json
+import sqlite3
+import threading
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+from include.logger import Log
+
+
+class CbSpool(object):
+    ''' The CbSpool is a persistent store-and-forward queue for attribute updates,
+        which could not be sent to the Context-Broker (e.g. while the robot is offline).
+
+        The updates are saved in a sqlite-database (WAL-mode), so they survive a restart
+        of FIROS. Only the latest value of each (entity, attribute) is kept: a newer
+        update replaces the spooled one instead of being appended.
+
+        A background drainer replays the spooled updates (oldest first) with at most
+        'rate' requests per second. If the Context-Broker is still not reachable,
+        the drainer backs off exponentially. New updates shorten the backoff to
+        RETRY_ON_PUT, so live data does not lag behind once the Context-Broker
+        is back. 'resume' ends the backoff right away.
+    '''
+
+    MAX_BACKOFF = 30.0  # In Seconds
+    RETRY_ON_PUT = 1.0  # In Seconds
+
+    def __init__(self, path, sendFunc, rate=5.0):
+        ''' path:     The path of the sqlite-database. It is created if not existent
+            sendFunc: Called with (entityId, attrs) to replay an update. It returns
+                      False if the Context-Broker was not reachable, otherwise True
+            rate:     The maximum number of replayed requests per second
+        '''
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        self.path = path
+        self.sendFunc = sendFunc
+        self.interval = 1.0 / float(rate) if float(rate) > 0 else 0.0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS spool (entity TEXT, attr TEXT, payload TEXT, seq INTEGER, PRIMARY KEY (entity, attr))")
+        self._db.commit()
+        self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM spool").fetchone()[0]
+        self._size = self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+        # Counters
+        self.spooled = 0
+        self.replayed = 0
+
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._resumed = threading.Event()
+        if self._size > 0:
+            Log("INFO", "Found {} spooled updates in {}".format(self._size, path))
+            self._wakeup.set()
+
+        t = threading.Thread(target=self._drainLoop, name="firos-cb-spool")
+        t.daemon = True
+        t.start()
+
+    def __len__(self):
+        return self._size
+
+    def put(self, entityId, attrs):
+        ''' Spools the attributes of an Entity. Already spooled values of the
+            same attributes are replaced.
+
+            entityId: The full Entity-ID on the Context-Broker
+            attrs:    A dictionary of NGSIv2-attributes
+        '''
+        with self._lock:
+            for name in attrs:
+                self._seq += 1
+                self._db.execute("INSERT OR REPLACE INTO spool (entity, attr, payload, seq) VALUES (?, ?, ?, ?)",
+                                 (entityId, name, json.dumps(attrs[name]), self._seq))
+            self._db.commit()
+            self._size = self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+            self.spooled += len(attrs)
+        self._wakeup.set()
+
+    def resume(self):
+        ''' Lets the drainer replay the spooled updates right away, e.g. since the
+            Context-Broker answered another request
+        '''
+        self._resumed.set()
+        self._wakeup.set()
+
+    def stop(self):
+        ''' Stops the drainer. Spooled updates stay in the database
+        '''
+        self._stopped.set()
+        self._resumed.set()
+        self._wakeup.set()
+
+    def stats(self):
+        return dict(size=self._size, spooled=self.spooled, replayed=self.replayed)
+
+    def _next(self):
+        ''' Returns the Entity with the oldest spooled update and all of its
+            spooled attributes as (entityId, attrs, seqs) or None
+        '''
+        with self._lock:
+            row = self._db.execute("SELECT entity FROM spool ORDER BY seq LIMIT 1").fetchone()
+            if row is None:
+                return None
+            rows = self._db.execute("SELECT attr, payload, seq FROM spool WHERE entity = ?", (row[0],)).fetchall()
+        attrs = {attr: json.loads(payload) for attr, payload, _ in rows}
+        seqs = [(attr, seq) for attr, _, seq in rows]
+        return row[0], attrs, seqs
+
+    def _remove(self, entityId, seqs):
+        ''' Removes the replayed attributes, unless they were replaced meanwhile
+        '''
+        with self._lock:
+            for attr, seq in seqs:
+                self._db.execute("DELETE FROM spool WHERE entity = ? AND attr = ? AND seq = ?", (entityId, attr, seq))
+            self._db.commit()
+            self._size = self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def _drainLoop(self):
+        backoff = max(self.interval, 1.0)
+        while not self._stopped.is_set():
+            item = self._next()
+            if item is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            entityId, attrs, seqs = item
+            try:
+                sent = self.sendFunc(entityId, attrs)
+            except Exception as e:
+                Log("WARNING", "Could not replay spooled update of {}: {}".format(entityId, e))
+                sent = False
+
+            if sent:
+                self._remove(entityId, seqs)
+                self.replayed += len(seqs)
+                backoff = max(self.interval, 1.0)
+                self._resumed.clear()
+                self._stopped.wait(self.interval)
+            elif self._backoff(backoff):
+                backoff = max(self.interval, 1.0)
+            else:
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    def _backoff(self, backoff):
+        ''' Waits after a failed replay, since the Context-Broker is still not reachable.
+            New updates shorten the wait to RETRY_ON_PUT. Returns True, if 'resume'
+            ended the wait
+        '''
+        now = monotonic()
+        deadline = now + backoff
+        earliest = now + min(backoff, self.RETRY_ON_PUT)
+        pending = False
+        self._wakeup.clear()
+        while not self._stopped.is_set():
+            if self._resumed.is_set():
+                self._resumed.clear()
+                return True
+            now = monotonic()
+            if now >= deadline or (pending and now >= earliest):
+                return False
+            if self._wakeup.wait((earliest if pending else deadline) - now):
+                self._wakeup.clear()
+                pending = True
+        return False
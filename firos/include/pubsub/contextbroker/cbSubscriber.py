@@ -20,30 +20,34 @@ __maintainer__ = "Dominik Lux"
 __version__ = "0.0.1a"
 __status__ = "Developement"
 
+import re
 import time
-import requests
+import calendar
 import json
+import random
 import threading
 from threading import Thread
 try:
     # Python 3
     import _thread as thread
     from http.server import BaseHTTPRequestHandler
-    from http.server import HTTPServer
 except ImportError:
     # Pyrhon 2
     import thread
     from BaseHTTPServer import BaseHTTPRequestHandler
-    from BaseHTTPServer import HTTPServer
 
 from include.constants import Constants as C
 from include.logger import Log
+from include.httpClient import HttpClient
+from include.stats import registerStats
+from include.scheduler import getScheduler
+from include.server.pooledHTTPServer import PooledHTTPServer
 from include.pubsub.genericPubSub import Subscriber
-from include.ros.topicHandler import RosTopicHandler
-from include.FiwareObjectConverter.objectFiwareConverter import ObjectFiwareConverter
-
-import rospy
-from std_msgs.msg import String
+from include.pubsub.contextbroker.cbNotification import CbNotificationDecoder, NotificationError
+from include.pubsub.contextbroker.cbDedup import CbDedup
+from include.pubsub.contextbroker.cbIngress import CbIngressQueue
+from include.ros.topicHandler import RosTopicHandler, PUBLISHER_REGISTRY, getTopicClass
+from include.ros.msgCodec import MsgCodec
 
 class CbSubscriber(Subscriber):
     ''' The CbSubscriber handles the subscriptions on the ContextBroker.
@@ -54,14 +58,30 @@ class CbSubscriber(Subscriber):
         this Objects also converts the received data from ContextBroker
         back into a Python-Object. 
 
-        Here each topic of an robot is subscribed seperately.
+        By default each topic of an robot is subscribed seperately. Via the
+        "consolidate"-option of the subscription configuration, the topics are combined into
+        one subscription per entity ("entity") or one subscription for all entities with
+        an idPattern ("fleet"). The notifications are routed back to the topics
+        by entity id and attribute.
+
+        The subscriptions are reconciled against the Context-Broker periodically: All
+        subscriptions notifying FIROS are listed and only the missing, changed, expiring
+        and unknown ones are created, updated, renewed or deleted.
 
         THIS IS THE ONLY FILE WHICH OPERATES ON /v2/subscriptions
     '''
 
+    CONSOLIDATION_MODES = ("none", "entity", "fleet")
+    RETRY_DELAY = 10    # Seconds until a failed subscription is tried again
+    START_JITTER = 5    # Seconds the first subscriptions are delayed at most (with a "renewal_jitter")
+    LIST_LIMIT = 1000   # Subscriptions listed per request (maximum of Orion)
+
     # Saves the subscriptions IDs returned from ContextBroker.
-    # Follwoing Structure: subscriptionIds[ROBOT_ID][TOPIC] returns a sub-Id in String
+    # Follwoing Structure: subscriptionIds[GROUP] returns a sub-Id in String
+    # (GROUP is the topic, the entity id or "fleet", depending on the consolidation)
     subscriptionIds = {}
+    # The topics of each subscription via groups[GROUP]
+    groups = {}
     CB_BASE_URL = None
     FIROS_NOTIFY_URL = None
 
@@ -102,9 +122,28 @@ class CbSubscriber(Subscriber):
         else:
             data["subscription"]["subscription_refresh_delay"] = float(data["subscription"]["subscription_refresh_delay"])
 
+        data["subscription"]["renewal_jitter"] = float(data["subscription"].get("renewal_jitter", 0.1))
+
+        if data["subscription"].get("consolidate", "none") not in self.CONSOLIDATION_MODES:
+            Log("WARNING", "Unknown consolidation '{}', subscribing each topic separately".format(data["subscription"]["consolidate"]))
+            data["subscription"]["consolidate"] = "none"
+        else:
+            data["subscription"]["consolidate"] = data["subscription"].get("consolidate", "none")
+
+        dedup = data["subscription"].get("dedup", {})
+        CBServer.CBHandler.dedup = CbDedup(int(dedup.get("size", 1024)), float(dedup.get("window", 60)))
+        registerStats("dedup", CBServer.CBHandler.dedup.stats)
+
+        # The scheduled reconciliation and the groups, whose topics changed since
+        # their subscription was updated. 'groups' and '_changed' are modified by
+        # 'subscribe' and read by the reconciliation (in the Scheduler-Thread) via _lock
+        self._reconciliation = None
+        self._changed = set()
+        self._lock = threading.Lock()
 
         self.data = data
         self.serverIsRunning = False
+        self.http = HttpClient.forContextBroker(data)
         self.CB_BASE_URL = "http://{}:{}".format(data["address"], data["port"])
 
 
@@ -122,7 +161,7 @@ class CbSubscriber(Subscriber):
             so that the Context-Broker can notify us after it received a Message. 
 
             In addition to that, the Context-Broker needs to know how to notify us. This is solved by adding subscriptions into 
-            the Context-Broker, which we need to manually maintain. Again we start a Thread for each Topic which handles the Subscriptions
+            the Context-Broker, which we need to manually maintain. The subscriptions are reconciled by the (shared) Scheduler
 
 
 
@@ -147,14 +186,52 @@ class CbSubscriber(Subscriber):
             self.serverIsRunning = True
             server_ready.wait()
 
-        # If not already subscribed, start a new thread which handles the subscription for each topic for an robot.
+        # Route the notifications back to the topics
+        for topic in topicList:
+            CBServer.CBHandler.routes[(self._entityId(topic), self._attribute(topic))] = topic
+
+        # If not already subscribed, subscribe each group of topics (in the Scheduler-Thread).
         # And only If the topic list is not empty!
+        changed = False
+        with self._lock:
+            first = len(self.groups) == 0
+            for group, topics in self._groupTopics(topicList).items():
+                if group not in self.groups:
+                    Log("INFO", "Subscribing on Context-Broker to topics: " + str(sorted(topics)))
+                    self.groups[group] = topics
+                    changed = True
+                elif not topics.issubset(self.groups[group]):
+                    # Update the subscription of the group with the additional topics now
+                    self.groups[group] = self.groups[group] | topics
+                    self._changed.add(group)
+                    changed = True
+        if changed:
+            # The first subscriptions of robots started together are spread over time
+            jitter = self.START_JITTER if first and self.data["subscription"]["renewal_jitter"] > 0 else 0
+            self._scheduleReconciliation(jitter * random.random())
+
+    def _groupTopics(self, topicList):
+        ''' Returns groups[GROUP] = set of topics, one group for each subscription
+        '''
+        mode = self.data["subscription"]["consolidate"]
+        groups = {}
         for topic in topicList:
-            if topic not in self.subscriptionIds:
-                Log("INFO", "Subscribing on Context-Broker to topics: " + str(list(topicList)))
-                t = Thread(target=self.subscribeThread, args=(topic, topicTypes, msgDefintions))
-                t.daemon = True
-                t.start()
+            if mode == "fleet":
+                group = "fleet"
+            elif mode == "entity":
+                group = self._entityId(topic)
+            else:
+                group = topic
+            groups.setdefault(group, set()).add(topic)
+        return groups
+
+    @staticmethod
+    def _entityId(topic):
+        return C.ID_PREFIX + str(topic.split("/")[1]).replace("_", ":")
+
+    @staticmethod
+    def _attribute(topic):
+        return str(topic.split("/")[2])
 
 
     def unsubscribe(self):
@@ -162,17 +239,35 @@ class CbSubscriber(Subscriber):
             Simply unsubscribed from all tracked subscriptions
             and also stop the HTTP-Server
         '''
+        for _, task in self.unsubscribeTasks():
+            task()
+
+    def unsubscribeTasks(self):
+        '''
+            Returns the steps of 'unsubscribe': Stopping the HTTP-Server and one
+            deletion for each tracked subscription
+        '''
         # Do nothing if no Configuratuion
         if self.noConf:
-            return
+            return []
+
+        # Stop reconciling the subscriptions
+        if self._reconciliation is not None:
+            self._reconciliation.cancel()
 
         # close HTTP-Server
-        self.server.close()
+        tasks = []
+        if self.serverIsRunning:
+            tasks.append(("CBServer.close", self.server.close))
 
         # Unsubscribe to all Topics
-        for topic in self.subscriptionIds:
-            response = requests.delete(self.CB_BASE_URL + self.subscriptionIds[topic])
-            self._checkResponse(response, subID=self.subscriptionIds[topic])
+        for group in list(self.subscriptionIds.keys()):
+            tasks.append(("DELETE " + self.subscriptionIds[group], lambda subID=self.subscriptionIds[group]: self._deleteSubscription(subID)))
+        return tasks
+
+    def _deleteSubscription(self, subID):
+        response = self.http.delete(self.CB_BASE_URL + subID)
+        self._checkResponse(response, subID=subID)
 
 
 
@@ -180,79 +275,211 @@ class CbSubscriber(Subscriber):
     ########## Helpful Classes and Methods #############
     ####################################################
 
-    def subscribeThread(self, topic, topicTypes, msgDefintions):
+    def _scheduleReconciliation(self, delay):
+        if self._reconciliation is not None:
+            self._reconciliation.cancel()
+        self._reconciliation = getScheduler().schedule(delay, self._reconcile)
+
+    def _reconcile(self):
         ''' 
-            A Subscription-Thread. Its Life-Cycle is as follows:
-            -> Subscribe -> Delete old Subs-ID -> Save new Subs-ID -> Wait ->
+            Compares the subscriptions on the Context-Broker with the groups (see 'groups'):
+
+            - Subscriptions of a group, which are missing (e.g. after a restart of the
+              Context-Broker or removed by someone else), are created again
+            - Subscriptions, whose topics changed or differ, are updated
+            - Subscriptions, which expire before the next reconciliation, are renewed
+              (by extending their expiration via PATCH)
+            - Subscriptions notifying FIROS, which do not belong to a group (e.g. left over
+              from an earlier run), are deleted
+
+            So a reconciliation without differences costs only the listing of the subscriptions.
 
-            topic: The Topic (string) to subscribe to.
+            The next reconciliation is scheduled after "subscription_length" * "subscription_refresh_delay"
+            seconds, shortened by a random fraction of up to "renewal_jitter". So the reconciliations of
+            robots started together are spread over time.
         '''
+        conf = self.data["subscription"]
+        interval = conf["subscription_length"] * conf["subscription_refresh_delay"] # Length * Refresh-Rate (where 0 < Refresh-Rate < 1)
+        try:
+            listed = self._listSubscriptions()
+        except Exception:
+            Log("WARNING", "Could not connect to Context-Broker to list the subscriptions")
+            self._scheduleReconciliation(self.RETRY_DELAY)
+            return
+
+        groupOf = dict((subID, group) for group, subID in list(self.subscriptionIds.items()))
+        for subID in listed:
+            if subID not in groupOf:
+                Log("INFO", "Deleting unknown subscription: " + subID)
+                self._tryRequest(subID, lambda subID=subID: self._deleteSubscription(subID))
+
+        # Renew the subscriptions, which would expire before the next reconciliation
+        renewBefore = time.time() + interval + self.RETRY_DELAY
+        with self._lock:
+            groups = list(self.groups.items())
+            changed = set(self._changed)
+        for group, topics in groups:
+            subID = self.subscriptionIds.get(group)
+            if subID is not None and subID not in listed:
+                # The subscription expired or was removed. Create it again
+                Log("INFO", "Subscription for topic {} vanished from the Context-Broker".format(group))
+                CBServer.CBHandler.decoder.unregisterSubscription(self.subscriptionIds.pop(group))
+                subID = None
+
+            if subID is None:
+                request = lambda group=group: self._createSubscription(group)
+            elif group in changed or self._differs(listed[subID], topics):
+                request = lambda group=group: self._updateSubscription(group)
+            elif self._expiresAt(listed[subID]) < renewBefore:
+                request = lambda group=group: self._renewSubscription(group)
+            else:
+                continue
+            if not self._tryRequest(group, request):
+                interval = min(interval, self.RETRY_DELAY)
+
+        with self._lock:
+            if self._changed:
+                # The topics changed again meanwhile
+                interval = 0
+        self._scheduleReconciliation(interval * (1.0 - conf["renewal_jitter"] * random.random()))
+
+    def _tryRequest(self, group, request):
+        try:
+            return request()
+        except Exception:
+            Log("WARNING", "Could not connect to Context-Broker to subscribe to topic: {}".format(group))
+            return False
+
+    def _listSubscriptions(self):
+        ''' Returns the subscriptions notifying FIROS via listed[SUBSCRIPTION_ID] (the ids
+            as in 'subscriptionIds'). The NGSIv2-API cannot filter by the notification url,
+            so all subscriptions are listed page by page and filtered here.
+        '''
+        url = self._notifyUrl()
+        listed = {}
+        offset = 0
         while True:
-            # Subscribe
-            jsonData = self.subscribeJSONGenerator(topic, topicTypes, msgDefintions)
-            try:
-                response = requests.post(self.CB_BASE_URL + "/v2/subscriptions?options=skipInitialNotification", data=jsonData, headers={'Content-Type': 'application/json'}, timeout=5)
-                self._checkResponse(response, created=True, robTop=topic)
-
-                if 'Location' in response.headers:
-                    newSubID = response.headers['Location'] # <- get subscription-ID
-                else:
-                    Log("WARNING",  "Firos was not able to subscribe to topic: {}".format(topic))
-
-                # Unsubscribe
-                if topic in self.subscriptionIds:
-                    response = requests.delete(self.CB_BASE_URL + self.subscriptionIds[topic])
-                    self._checkResponse(response, subID=self.subscriptionIds[topic])
-                    
-                # Save new ID
-                self.subscriptionIds[topic] = newSubID
-            except:
-                print('Could not connect to server!')
-
-            # Wait
-            time.sleep(int(self.data["subscription"]["subscription_length"] * self.data["subscription"]["subscription_refresh_delay"])) # sleep Length * Refresh-Rate (where 0 < Refresh-Rate < 1)
-            Log("INFO", "Refreshing Subscription for topic: " + str(topic))
-
-
-    def subscribeJSONGenerator(self, topic, topicTypes, msgDefintions):
+            response = self.http.get(self.CB_BASE_URL + "/v2/subscriptions?options=count&limit={}&offset={}".format(self.LIST_LIMIT, offset))
+            if not response.ok:
+                raise Exception("Listing the subscriptions failed with status {}".format(response.status_code))
+            page = response.json()
+            for subscription in page:
+                if subscription.get("notification", {}).get("http", {}).get("url") == url:
+                    listed["/v2/subscriptions/" + subscription["id"]] = subscription
+            offset += len(page)
+            total = int(response.headers.get("Fiware-Total-Count", offset))
+            if len(page) == 0 or offset >= total:
+                return listed
+
+    def _differs(self, subscription, topics):
+        ''' Returns True, if the subscription on the Context-Broker does not match its topics
+        '''
+        expected = self._subscriptionStruct(topics)
+        subject = subscription.get("subject", {})
+        entities = [dict((k, v) for k, v in entity.items() if k in ("id", "idPattern", "type")) for entity in subject.get("entities", [])]
+        return (sorted(subject.get("condition", {}).get("attrs", [])) != expected["subject"]["condition"]["attrs"]
+                or sorted(subscription.get("notification", {}).get("attrs", [])) != expected["notification"]["attrs"]
+                or sorted(entities, key=lambda e: sorted(e.items())) != sorted(expected["subject"]["entities"], key=lambda e: sorted(e.items())))
+
+    @staticmethod
+    def _expiresAt(subscription):
+        ''' Returns the expiration (in seconds since the epoch) of a listed subscription
+        '''
+        if "expires" not in subscription:
+            return float("inf")
+        return calendar.timegm(time.strptime(subscription["expires"][:19], "%Y-%m-%dT%H:%M:%S"))
+
+    def _takeTopics(self, group):
+        ''' Returns the current topics of group, whose subscription is updated now
+        '''
+        with self._lock:
+            self._changed.discard(group)
+            return set(self.groups[group])
+
+    def _createSubscription(self, group):
+        topics = self._takeTopics(group)
+        jsonData = self.subscribeJSONGenerator(topics)
+        response = self.http.post(self.CB_BASE_URL + "/v2/subscriptions?options=skipInitialNotification", data=jsonData, headers={'Content-Type': 'application/json'})
+        self._checkResponse(response, created=True, robTop=group)
+
+        if 'Location' not in response.headers:
+            Log("WARNING",  "Firos was not able to subscribe to topic: {}".format(group))
+            return False
+        self.subscriptionIds[group] = response.headers['Location'] # <- get subscription-ID
+        self._registerExtractor(group, topics)
+        return True
+
+    def _updateSubscription(self, group):
+        Log("INFO", "Updating Subscription for topic: " + str(group))
+        topics = self._takeTopics(group)
+        self._registerExtractor(group, topics)
+        return self._patchSubscription(group, self.subscribeJSONGenerator(topics))
+
+    def _renewSubscription(self, group):
+        Log("INFO", "Refreshing Subscription for topic: " + str(group))
+        return self._patchSubscription(group, json.dumps({"expires": self._expires()}))
+
+    def _patchSubscription(self, group, jsonData):
+        response = self.http.patch(self.CB_BASE_URL + self.subscriptionIds[group], data=jsonData, headers={'Content-Type': 'application/json'})
+        if response.status_code == 404:
+            # Removed since the listing. Create it again
+            CBServer.CBHandler.decoder.unregisterSubscription(self.subscriptionIds.pop(group))
+            return self._createSubscription(group)
+        self._checkResponse(response, updated=True, robTop=group)
+        return response.ok
+
+    def _registerExtractor(self, group, topics):
+        CBServer.CBHandler.decoder.registerSubscription(self.subscriptionIds[group], set(self._attribute(topic) for topic in topics))
+
+    def _expires(self):
+        return time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(time.time() + self.data["subscription"]["subscription_length"])) # ISO 8601
+
+
+    def _notifyUrl(self):
+        return "http://{}:{}".format(C.EP_SERVER_ADRESS, self.server.port)
+
+    def subscribeJSONGenerator(self, topics):
         ''' 
             This method returns the correct JSON-format to subscribe to the ContextBroker. 
             The Expiration-Date/Throttle and Type of topics is retreived here via the configuration we got
 
-            topic: The actual topic to subscribe to.
+            topics: The topics to subscribe to (all of one entity, except for the "fleet"-consolidation)
         '''
+        return json.dumps(self._subscriptionStruct(topics))
+
+    def _subscriptionStruct(self, topics):
+        entityIds = sorted(set(self._entityId(topic) for topic in topics))
+        attrs = sorted(set(self._attribute(topic) for topic in topics))
+        if self.data["subscription"]["consolidate"] == "fleet":
+            entities = [{"idPattern": "^" + re.escape(C.ID_PREFIX) + ".*", "type": "AMR"}]
+        else:
+            entities = [{"id": entityId, "type": "AMR"} for entityId in entityIds]
+
         # This struct correspondes to following JSON-format:
         # https://fiware-orion.readthedocs.io/en/master/user/walkthrough_apiv2/index.html#subscriptions
         struct =  {
             "subject": {
-                "entities": [
-                    {
-                    "id": C.ID_PREFIX + str(topic.split("/")[1]).replace("_", ":"),
-                    "type": "AMR"
-                    }
-                ],
+                "entities": entities,
                 "condition": {
-                    "attrs": [str(topic.split("/")[2])]
+                    "attrs": attrs
                 }
             },
             "notification": {
             "http": {
                 #"url": C.EP_SERVER_ADRESS
-                "url": "http://{}:{}".format(C.EP_SERVER_ADRESS, self.server.port)
+                "url": self._notifyUrl()
             },
-            "attrs": [str(topic.split("/")[2])]
+            "attrs": attrs,
+            # dateModified is needed to recognize notifications delivered twice (see CbDedup)
+            "metadata": ["dateModified", "*"]
             },
-            "expires": time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(time.time() + self.data["subscription"]["subscription_length"])), # ISO 8601
+            "expires": self._expires(),
             "throttling": self.data["subscription"]["throttling"]  
             }
-        # Create ROS publisher
-        #global pub
-        #pub = rospy.Publisher(topic, String, queue_size=3, latch=False)
-        #print(topic)
-        return json.dumps(struct)
+        return struct
 
 
-    def _checkResponse(self, response, robTop=None, subID=None, created=False):
+    def _checkResponse(self, response, robTop=None, subID=None, created=False, updated=False):
         ''' 
             If a not good response from ContextBroker is received, the error will be printed.
     
@@ -260,11 +487,15 @@ class CbSubscriber(Subscriber):
             robTop:   A string (topic), for the curretn robot/topic
             subID:    The Subscription ID string, which should get deleted
             created:  Creation or Deletion of a subscription (bool)
+            updated:  Update (or renewal) of a subscription (bool)
         '''
         if not response.ok:
             if created:
                 Log("ERROR", "Could not create subscription for topic {} in Context-Broker :".format(robTop))
                 Log("ERROR", response.content)
+            elif updated:
+                Log("ERROR", "Could not update subscription for topic {} in Context-Broker :".format(robTop))
+                Log("ERROR", response.content)
             else:
                 Log("WARNING", "Could not delete subscription {} from Context-Broker :".format(subID))
                 Log("WARNING", response.content)
@@ -278,6 +509,13 @@ class CBServer:
         This is the HTTPServer, which start listening on an adress and a free port
         Here we provide 3 methods: Initialize, start and stop. Start and stop either 
         start or stop this Server.
+
+        The notifications are handled concurrently by a PooledHTTPServer, which keeps
+        the connections of the Context-Broker alive (HTTP/1.1). Its number of workers,
+        backlog and keep-alive-timeout are set via the "endpoint"-configuration.
+
+        The notifications are acknowledged as soon as they are validated. The notified
+        values are published into ROS by the workers of a CbIngressQueue.
     '''
     def __init__(self, thread_event):
         '''
@@ -287,7 +525,7 @@ class CBServer:
         self.stopped = False
         self.thread_event = thread_event
 
-        Protocol = "HTTP/1.0"
+        Protocol = "HTTP/1.1"
 
         if C.EP_SERVER_PORT is not None and isinstance(C.EP_SERVER_PORT, int) :
             server_address = ("0.0.0.0", C.EP_SERVER_PORT)
@@ -295,7 +533,12 @@ class CBServer:
             server_address = ("0.0.0.0", 0)
 
         self.CBHandler.protocol_version = Protocol
-        self.httpd = HTTPServer(server_address, self.CBHandler)
+        self.httpd = PooledHTTPServer(server_address, self.CBHandler, C.EP_SERVER_WORKERS, C.EP_SERVER_BACKLOG, C.EP_SERVER_KEEPALIVE)
+        registerStats("endpoint", self.httpd.stats)
+        registerStats("notifications", self.CBHandler.stats)
+        self.CBHandler.decoder.maxSize = C.EP_MAX_NOTIFICATION_SIZE
+        self.CBHandler.ingress = CbIngressQueue(self.CBHandler.publish, C.EP_QUEUE_SIZE, C.EP_DISPATCH_WORKERS, C.EP_QUEUE_OVERFLOW)
+        registerStats("ingress", self.CBHandler.ingress.stats)
 
     def start(self):
         '''
@@ -308,14 +551,16 @@ class CBServer:
 
         # Notify and start handling Requests
         self.thread_event.set()
-        while not self.stopped:
-            self.httpd.handle_request()
+        self.httpd.serve_forever()
 
     def close(self):
         '''
             Stops the HTTPServer
         '''
         self.stopped = True
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.CBHandler.ingress.stop()
 
     class CBHandler(BaseHTTPRequestHandler):
         ''' This is the FIROS-HTTP-Request-Handler. It is needed,
@@ -331,105 +576,118 @@ class CBServer:
         def do_GET(self):
             '''
                 We do not respond to GETs. We do Nothing!!
+                (Except closing the request, so the kept alive connection can be reused)
             '''
-            pass
+            self.send_response(405)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
 
 
         def do_POST(self):
             ''' The ContextBroker is informing us via one of our subscriptions.
-                We convert the received content back and publish 
-                it in ROS.
+                The routed attributes are queued and the notification is acknowledged
+                right away. The workers of the ingress queue convert the received
+                content back and publish it in ROS (see 'publish').
 
                 self: The "request" from the Context-Broker
-
-                we invoke """RosTopicHandler.publish""" here!
             '''
-            # retreive Data and get the updated information
-            #print(str(self.headers))
-            recData = self.rfile.read(int(self.headers['Content-Length']))
-            receivedData = json.loads(recData)
-            #print(receivedData)
-            #global context_id
-            #context_id = receivedData['data'][0]['refDestination']['metadata']['context']['value']
-            #print(receivedData)
-            #topic = receivedData['']
-            #C.CONTEXT_ID = receivedData['data'][0]['refDestination']['metadata']['context']['value']
-            data = receivedData['data'][0] # Specific to NGSIv2 
-            #jsonData = json.dumps(data)            
-            #pub_data = data['refDestination']['value']
-            #global pub
-            #pub.publish(pub_data)
-
-            if 'refDestination' in data:
-                topic = '/' + data['id'].split(':')[3] + '/' + 'refDestination'
-                payload = data['refDestination']['value']
-                C.CONTEXT_ID = data['refDestination']['metadata']['context']['value']
-            elif 'action' in data:
-                topic = '/' + data['id'].split(':')[3] + '/' + 'action'
-                payload = data['action']['value']
-                C.CONTEXT_ID = data['action']['metadata']['context']['value']
-
-            pub = rospy.Publisher(topic, String, queue_size=3, latch=False)
-            pub.publish(payload)
-            pub.unregister()
+            # retreive Data and get the updated information (malformed notifications are rejected)
+            try:
+                body = self.decoder.read(self.headers.get('Content-Length'), self.rfile)
+                subscriptionId, entries, extractor = self.decoder.decode(body)
+            except NotificationError as e:
+                self._reject(e)
+                return
+
+            # Orion may notify several entities at once (e.g. after throttling), so
+            # every entry is extracted on its own. A failing entry does not affect the others
+            failed = 0
+            unrouted = 0
+            queued = []
+            remembered = []
+            for index, data in enumerate(entries):
+                try:
+                    extracted = extractor.extract(data)
+                except Exception as e:
+                    failed += 1
+                    Log("WARNING", "Could not process entry {} ({}) of notification {}: {!r}".format(
+                        index, data.get('id') if isinstance(data, dict) else None, subscriptionId, e))
+                    continue
+                if not extracted:
+                    # e.g. other robots notified via the "fleet"-subscription
+                    unrouted += 1
+                # Attributes, which were already notified, are skipped (see CbDedup)
+                for topic, payload, context, modified in extracted:
+                    if not self.dedup.isDuplicate(topic, payload, modified):
+                        queued.append((topic, payload, context))
+                        remembered.append((topic, payload, modified))
+
+            if queued and not self.ingress.put(queued):
+                # The Context-Broker delivers the notification again, which must not be taken as duplicate
+                for topic, payload, modified in remembered:
+                    self.dedup.forget(topic, payload, modified)
+                self._reject(NotificationError("The ingress queue is full", 503))
+                return
+            self._count(len(entries), failed, unrouted)
 
             # # Send OK!
             self.send_response(204)
             self.end_headers() # Python 3 needs an extra end_headers after send_response
 
-            # obj = self.TypeValue()
-            # ObjectFiwareConverter.fiware2Obj(jsonData, obj, setAttr=True, useMetaData=False, encoded=True)
-            # obj.id = obj.id.replace(".", "/")
-            # obj.type = obj.type.replace("%2F", "/")
-            
-            # objType = obj.type
-            # topic = obj.id
 
-            # print(obj.id)
-            # print(data)
+        # The topic of each notified entity and attribute via routes[(ENTITY_ID, ATTRIBUTE)]
+        routes = {}
+        # Decodes the notifications and extracts the routed attributes
+        decoder = CbNotificationDecoder(routes)
 
-            # del data["id"]
-            # del data["type"]
-            # tempDict = dict(type=objType, value=data)
+        # Skips attributes delivered twice (configured by the CbSubscriber)
+        dedup = CbDedup()
+        # Publishes the notified values into ROS (created by the CBServer)
+        ingress = None
 
-            # dataStruct = self._buildTypeStruct(tempDict)
+        # Counters of all notifications via counters[name]
+        counters = dict(notifications=0, entries=0, failed=0, unrouted=0, rejected=0)
+        countersLock = threading.Lock()
 
-            # RosTopicHandler.publish(topic, obj.__dict__, dataStruct)
-            # # # Send OK!
-            # self.send_response(204)
-            # self.end_headers() # Python 3 needs an extra end_headers after send_response
-
-
-        ### Back Conversion From Entity-JSON into Python-Object
-        def _buildTypeStruct(self, obj):
-            ''' This generates a struct containing a type (the actual ROS-Message-Type) and 
-                its value (either empty or more ROS-Message-Types).
-
-                This struct is used later to recursivley load needed Messages and fill them with 
-                content before they are posted back to ROS.
-
-                obj:    The received update from Context-Broker
+        @staticmethod
+        def publish(topic, payload, context):
+            ''' Publishes a notified value into ROS (called by the workers of the ingress queue).
+                The value is converted by the MsgCodec of the message type of the topic.
+            '''
+            # Convert the value into the ROS-Message of the topic (as configured in the topics.json)
+            msgClass = getTopicClass(topic)
+            if msgClass is None:
+                from std_msgs.msg import String
+                msgClass = String
+            msg = MsgCodec.forClass(msgClass).fromDict(payload)
+            if context is not None:
+                C.CONTEXT_ID = context
+
+            # The publisher is kept alive in the registry (and shared with the configured ones)
+            PUBLISHER_REGISTRY.get(topic, msgClass).publish(msg)
+
+        def _reject(self, error):
+            ''' Responds to a malformed notification without processing it
             '''
-            s = {}
-
-            # Searching for a point to get ROS-Message-Types from the obj
-            if 'value' in obj and 'type' in obj and "/" in obj['type'] : 
-                s['type'] = obj['type']
-                objval = obj['value'] 
-                s['value'] = {}
-
-                # For each value in Object repeat!
-                for k in objval:
-                    if 'type' in objval[k] and 'value' in objval[k] and objval[k]['type'] == 'array': # Check if we got an Array-Type value
-                        l = []
-                        for klist in objval[k]['value']:
-                            l.append(self._buildTypeStruct(klist))
-                        s['value'][k] = l
-                    else:
-                        s['value'][k] = self._buildTypeStruct(objval[k])
-
-            return s
-
-        class TypeValue(object):
-            ''' A Stub-Object to parse the received data
-            '''
\ No newline at end of file
+            Log("WARNING", "Rejected notification from {}: {}".format(self.client_address[0], error))
+            with self.countersLock:
+                self.counters['rejected'] += 1
+            if error.status == 413:
+                # The body was not read, so the connection cannot be reused
+                self.close_connection = True
+            self.send_response(error.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        @classmethod
+        def _count(cls, entries, failed, unrouted):
+            with cls.countersLock:
+                cls.counters['notifications'] += 1
+                cls.counters['entries'] += entries
+                cls.counters['failed'] += failed
+                cls.counters['unrouted'] += unrouted
+
+        @classmethod
+        def stats(cls):
+            with cls.countersLock:
+                return dict(cls.counters)
@@ -46,14 +46,39 @@ class Publisher(ABC):
     # This will be initialized before__init__() is even called!
     configData = dict()
 
+    def registerTopic(self, topic, msgType):
+        '''
+            Optional. Called once for each topic which will be published, before
+            its first message arrives. Can be used to precompute things per topic.
+        '''
+        pass
+
     @abc.abstractmethod
     def publish(self, topic, rawMsg, msgDefinitions):
+        '''
+            rawMsg is the ROS-Message or, for topics with the option "lazy", a still
+            serialized LazyMsg. Use 'include.ros.lazyMsg.resolveMsg' to get the ROS-Message.
+        '''
         pass
     
     @abc.abstractmethod
     def unpublish(self):
         pass
 
+    def flush(self):
+        '''
+            Optional. Called on shutdown, before 'unpublish'. Send out everything
+            which is still pending here.
+        '''
+        pass
+
+    def unpublishTasks(self):
+        '''
+            Optional. Returns the steps of 'unpublish' as a list of (name, function).
+            On shutdown those are executed concurrently and within a deadline.
+        '''
+        return [(type(self).__name__ + ".unpublish", self.unpublish)]
+
 
 class Subscriber(ABC):
     '''
@@ -73,6 +98,13 @@ class Subscriber(ABC):
     def unsubscribe(self):
         pass
 
+    def unsubscribeTasks(self):
+        '''
+            Optional. Returns the steps of 'unsubscribe' as a list of (name, function).
+            On shutdown those are executed concurrently and within a deadline.
+        '''
+        return [(type(self).__name__ + ".unsubscribe", self.unsubscribe)]
+
 
 class PubSub(object):
     '''
@@ -159,6 +191,13 @@ class PubSub(object):
             pub.publish(topic, rawMsg, msgDefinitions)
 
     
+    def registerTopic(self, topic, msgType):
+        '''
+            Call registerTopic on each Publisher
+        '''
+        for pub in self.publishers:
+            pub.registerTopic(topic, msgType)
+
     def unpublish(self):
         '''
             Call unpublish on each Publisher
@@ -180,3 +219,22 @@ class PubSub(object):
         for sub in self.subscribers:
             sub.unsubscribe()
 
+    def flush(self):
+        '''
+            Call flush on each Publisher
+        '''
+        for pub in self.publishers:
+            pub.flush()
+
+    def shutdownTasks(self):
+        '''
+            Collects the unsubscribe-tasks of each Subscriber and the
+            unpublish-tasks of each Publisher
+        '''
+        tasks = []
+        for sub in self.subscribers:
+            tasks.extend(sub.unsubscribeTasks())
+        for pub in self.publishers:
+            tasks.extend(pub.unpublishTasks())
+        return tasks
+
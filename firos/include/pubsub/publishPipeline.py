@@ -0,0 +1,148 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import threading
+from collections import deque
+
+from include.logger import Log
+
+
+class PublishPipeline(object):
+    ''' The PublishPipeline decouples the ROS-Callbacks from the (slow) Publishers.
+
+        Each topic has a mailbox which only holds the latest received message.
+        'put' only replaces the content of this mailbox and returns immediately.
+        A pool of worker threads drains the mailboxes and hands the messages over
+        to the Publishers (e.g. the Context-Broker).
+
+        A topic is only handled by one worker at a time, so the messages of a topic
+        are published in the order they were received. If a newer message arrives
+        before the older one was published, the older one is coalesced (skipped).
+    '''
+
+    def __init__(self, publishFunc, workers=2):
+        ''' publishFunc: The function which actually publishes. It is called with
+                         (topic, rawMsg, msgDefinitions)
+            workers:     The number of worker threads
+        '''
+        self._publish = publishFunc
+        self._cond = threading.Condition(threading.Lock())
+        self._mailboxes = {}    # _mailboxes[topic] = (rawMsg, msgDefinitions)
+        self._ready = deque()   # Topics with a filled mailbox, which are not handled currently
+        self._busy = set()      # Topics currently handled by a worker
+        self._stopped = False
+
+        # Counters
+        self.received = 0
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+        self._workers = []
+        for i in range(max(1, int(workers))):
+            t = threading.Thread(target=self._work, name="firos-publish-{}".format(i))
+            t.daemon = True
+            t.start()
+            self._workers.append(t)
+
+    def put(self, topic, rawMsg, msgDefinitions):
+        ''' Puts the message into the mailbox of topic. This never blocks on
+            the Publishers.
+        '''
+        with self._cond:
+            if self._stopped:
+                self.dropped += 1
+                return
+            self.received += 1
+            if topic in self._mailboxes:
+                self.coalesced += 1
+            elif topic not in self._busy:
+                self._ready.append(topic)
+                self._cond.notify()
+            self._mailboxes[topic] = (rawMsg, msgDefinitions)
+
+    def flush(self, timeout=None):
+        ''' Waits until every mailbox is drained or timeout (in seconds) passed.
+            Returns True if everything was published
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._mailboxes or self._busy:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self):
+        ''' Stops all workers. Messages which are not yet published are dropped.
+        '''
+        with self._cond:
+            self._stopped = True
+            self.dropped += len(self._mailboxes)
+            self._mailboxes.clear()
+            self._ready.clear()
+            self._cond.notify_all()
+
+    def pending(self):
+        ''' Returns the number of messages waiting in mailboxes
+        '''
+        with self._cond:
+            return len(self._mailboxes)
+
+    def stats(self):
+        with self._cond:
+            return dict(received=self.received, published=self.published, coalesced=self.coalesced,
+                        dropped=self.dropped, pending=len(self._mailboxes), workers=len(self._workers))
+
+    def _work(self):
+        ''' The loop of each worker: Take the next ready topic, publish its
+            message and requeue the topic, if a new message arrived meanwhile.
+        '''
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                topic = self._ready.popleft()
+                rawMsg, msgDefinitions = self._mailboxes.pop(topic)
+                self._busy.add(topic)
+
+            published = False
+            try:
+                self._publish(topic, rawMsg, msgDefinitions)
+                published = True
+            except Exception as e:
+                Log("ERROR", "Could not publish message of topic {}: {}".format(topic, e))
+            finally:
+                with self._cond:
+                    if published:
+                        self.published += 1
+                    else:
+                        self.dropped += 1
+                    self._busy.discard(topic)
+                    if topic in self._mailboxes:
+                        self._ready.append(topic)
+                    # Wake up other workers and 'flush'
+                    self._cond.notify_all()
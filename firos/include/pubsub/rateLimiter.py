@@ -0,0 +1,162 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+from collections import deque
+try:
+    # Python 3
+    from time import monotonic
+except ImportError:
+    # Python 2: The wall clock may jump, see TokenBucket._refill
+    from time import time as monotonic
+
+from include.scheduler import getScheduler
+
+
+class TokenBucket(object):
+    ''' A token bucket on the monotonic clock. It is refilled with 'rate' tokens
+        per second up to 'burst' tokens.
+    '''
+    __slots__ = ("rate", "burst", "tokens", "last")
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.last = monotonic()
+
+    def _refill(self, now):
+        # On Python 2 'monotonic' is the wall clock. If it is set back, no tokens are
+        # taken away (and the bucket is refilled from the new time on)
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.last) * self.rate)
+        self.last = now
+
+    def consume(self):
+        ''' Takes a token if available. Returns True on success
+        '''
+        self._refill(monotonic())
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def waitTime(self):
+        ''' Returns the number of seconds until the next token is available
+        '''
+        self._refill(monotonic())
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class TopicRateLimiter(object):
+    ''' Limits the messages of one topic via a TokenBucket. Messages exceeding the
+        rate are handled depending on the policy:
+
+        "drop":            The message is discarded
+        "coalesce-latest": Only the latest exceeding message is kept and released as soon
+                           as the next token is available. So the latest value is never lost
+        "delay":           The messages are queued (up to 'max_delayed') and released in
+                           order, one per token
+    '''
+    POLICIES = ["drop", "coalesce-latest", "delay"]
+
+    def __init__(self, rate, burst=1, policy="drop", release=None, maxDelayed=100):
+        ''' rate:       The allowed messages per second
+            burst:      The number of messages which may be sent at once
+            policy:     One of POLICIES
+            release:    Called with the message, if a held back message is released later
+            maxDelayed: The maximum number of held back messages with the policy "delay"
+        '''
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown rate limiting policy: {}".format(policy))
+        self.bucket = TokenBucket(rate, burst)
+        self.policy = policy
+        self.release = release
+        self._lock = threading.Lock()
+        self._held = deque(maxlen=1 if policy == "coalesce-latest" else int(maxDelayed))
+        self._task = None
+
+        # Counters
+        self.dropped = 0
+        self.coalesced = 0
+        self.delayed = 0
+
+    def offer(self, msg):
+        ''' Returns True, if msg may be published now. Otherwise it is
+            dropped or held back (and released later via 'release')
+        '''
+        with self._lock:
+            if not self._held and self.bucket.consume():
+                return True
+
+            if self.policy == "drop":
+                self.dropped += 1
+            elif self.policy == "coalesce-latest":
+                if self._held:
+                    self.coalesced += 1
+                self._held.append(msg)
+                self._schedule()
+            else:
+                if len(self._held) == self._held.maxlen:
+                    self.dropped += 1
+                self.delayed += 1
+                self._held.append(msg)
+                self._schedule()
+            return False
+
+    def cancel(self):
+        ''' Discards all held back messages
+        '''
+        self.drain()
+
+    def drain(self):
+        ''' Removes all held back messages without releasing them. Returns them in order
+        '''
+        with self._lock:
+            held = list(self._held)
+            self._held.clear()
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+        return held
+
+    def stats(self):
+        return dict(dropped=self.dropped, coalesced=self.coalesced, delayed=self.delayed, held=len(self._held))
+
+    def _schedule(self):
+        if self._task is None:
+            self._task = getScheduler().schedule(self.bucket.waitTime(), self._onTimer)
+
+    def _onTimer(self):
+        ''' Releases the next held back message, if a token is available. This runs
+            in the thread of the shared Scheduler, so 'release' must not block
+        '''
+        msg = None
+        with self._lock:
+            self._task = None
+            if self._held and self.bucket.consume():
+                msg = self._held.popleft()
+            if self._held:
+                self._schedule()
+        if msg is not None and self.release is not None:
+            self.release(msg)
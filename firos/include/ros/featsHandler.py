@@ -6,19 +6,19 @@ import time
 import copy
 import json
 import requests
-import tf
-import tf2_ros
 import time
 import threading
 
 from include.logger import Log
 from include.constants import Constants as C 
+from include.httpClient import HttpClient
+from include.scheduler import getScheduler
+from include.geometry import quaternionFromYaw, yawFromQuaternion
 #from include.libLoader import LibLoader
 from include.ros.rosConfigurator import RosConfigurator
 from include import confManager
 from std_msgs.msg import String, Float32, Bool, Int32
 from geometry_msgs.msg import Vector3, Pose, Point, Quaternion, PoseWithCovarianceStamped
-from threading import Timer
 from include.ros.topicHandler import SHUTDOWN_SIGNAL
 #from include.ros.topicHandler import loadMsgHandlers
 
@@ -45,6 +45,7 @@ class FeatsHandler:
         self.context_id = ""
         self.workorder_id = ""
         self.heartbeat_timer = None
+        self.heartbeat_lock = threading.Lock() # held while a heartbeat is sent
 
         # Init ROS publishers
         self.routePlannerXYTPub = rospy.Publisher('/route_planner/goalXYT', Vector3, queue_size=3)
@@ -72,6 +73,7 @@ class FeatsHandler:
             raise Exception("No Context-Broker specified!")
 
         self.data = data
+        self.http = HttpClient.forContextBroker(data)
         self.CB_BASE_URL = "http://{}:{}/v2/entities/".format(data["address"], data["port"])
 
         # Get topics (already with robot_id from config)
@@ -89,8 +91,9 @@ class FeatsHandler:
 
         Log("INFO", ('\nFEATS handler initialized!'))
 
-        # Send first heartbeat
+        # Send first heartbeat and then every HEARTBEAT seconds
         self.send_heartbeat()
+        self.heartbeat_timer = getScheduler().scheduleRepeating(C.HEARTBEAT, self.send_heartbeat)
 
         self.statusPub.publish(self.status)
         
@@ -109,13 +112,23 @@ class FeatsHandler:
 
     def send_heartbeat(self):
         '''Sends a heartbeat to ORION, i.e., an update
-        of the "heartbeat" attribute
+        of the "heartbeat" attribute. The connectivity check
+        may block for seconds, so it runs in its own thread
+        and not in the thread of the shared Scheduler
         '''
-        if self.checkConnectivity():
-            self.heartbeatPub.publish('')
-        self.heartbeat_timer = Timer(C.HEARTBEAT, self.send_heartbeat)
-        self.heartbeat_timer.daemon = True
-        self.heartbeat_timer.start()
+        if not self.heartbeat_lock.acquire(False):
+            # The previous heartbeat is still being sent
+            return
+        t = threading.Thread(target=self._heartbeat, name="firos-heartbeat")
+        t.daemon = True
+        t.start()
+
+    def _heartbeat(self):
+        try:
+            if self.checkConnectivity():
+                self.heartbeatPub.publish('')
+        finally:
+            self.heartbeat_lock.release()
 
     def checkConnectivity(self):
         try:
@@ -148,7 +161,7 @@ class FeatsHandler:
         # GET request to obtain received entity location
         lock_refDestination.acquire()
         try:
-            response = requests.get(self.CB_BASE_URL + data.data + "/attrs/location", timeout=5)
+            response = self.http.get(self.CB_BASE_URL + data.data + "/attrs/location")
         except:
             print("Failed request!")
             Log("INFO", ("Request failed: received status code " + str(response.status_code)))
@@ -282,7 +295,7 @@ def xytheta_to_pose_stamped(x,y,theta):
     """Turns x,y coordinates to a Pose object"""
     pose = Pose()
     pose.position = Point(x,y,0)
-    q = tf.transformations.quaternion_from_euler(0,0,theta)
+    q = quaternionFromYaw(theta)
     pose.orientation = Quaternion(q[0], q[1], q[2], q[3])
     return pose
 
@@ -290,6 +303,8 @@ def get_robot_position():
     """Gets current robot coordinates using TF and returns a Pose object"""
     # temp: tests
     #return xytheta_to_pose_stamped(1.0, -2.0, 1.2)
+    # tf2 is only loaded, if the position is actually looked up
+    import tf2_ros
     while True:
         try:
             tfBuffer = tf2_ros.Buffer()
@@ -298,9 +313,9 @@ def get_robot_position():
             y = trans.transform.translation.y
             qx = trans.transform.rotation.x
             qy = trans.transform.rotation.y
-            qw = trans.transform.rotation.z
-            qz = trans.transform.rotation.w
-            th = tf.transformations.euler_from_quaternion([qx,qy,qz,qw])[2]
+            qz = trans.transform.rotation.z
+            qw = trans.transform.rotation.w
+            th = yawFromQuaternion(qx, qy, qz, qw)
             return xytheta_to_pose_stamped(x, y, th)
-        except (tf.LookupException, tf.ConnectivityException, tf.ExtrapolationException):
+        except (tf2_ros.LookupException, tf2_ros.ConnectivityException, tf2_ros.ExtrapolationException):
             continue
\ No newline at end of file
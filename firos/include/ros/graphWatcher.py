@@ -0,0 +1,197 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+import traceback
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+from include.logger import Log
+
+
+class GraphWatcher(object):
+    ''' Watches the ROS-Graph for topics which appear or vanish, so FIROS connects
+        only those, instead of reloading all topics.
+
+        Every 'interval' seconds (or on 'resync') the published topics are fetched
+        from the ROS-Master and compared to the previous snapshot. Only the topics
+        which appeared are matched (e.g. against the whitelist), only the topics
+        which vanished (or changed their type) are disconnected. An unchanged
+        ROS-Graph costs a single request to the ROS-Master.
+    '''
+
+    def __init__(self, interval, fetch, match, apply, static=None):
+        ''' interval: Seconds between two polls (0: only poll on 'resync')
+            fetch:    Returns the published topics as [[topic, type], ...]
+                      (like rospy.get_published_topics)
+            match:    Returns the topics FIROS should connect as {topic: [type, pubsub]}
+                      of the given entries [(topic, type), ...]
+            apply:    Called with the topics to connect {topic: [type, pubsub]} and
+                      the list of topics to disconnect
+            static:   Topics which are always connected (e.g. the ones of the
+                      'topics.json'). They are ignored by the watcher
+        '''
+        self.interval = interval
+        self._fetch = fetch
+        self._match = match
+        self._apply = apply
+        self.static = set(static or [])
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._resync = False
+        self._full = False
+        self._stopped = False
+        self._thread = None
+        # The (topic, type)-entries of the last poll and the topics connected by the watcher
+        self._snapshot = None
+        self._connected = {}
+        # Topics which were disconnected elsewhere (see 'forget')
+        self._forgotten = set()
+        self._disconnected = set()
+
+        # Counters
+        self.polls = 0
+        self.changes = 0
+        self.added = 0
+        self.removed = 0
+        self.failed = 0
+        self.lastPollMs = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="firos-graph-watcher")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def resync(self, full=False):
+        ''' Lets the watcher poll now, without waiting for it. Topics which were
+            disconnected elsewhere are connected again.
+
+            full: Matches all topics again, not only the new ones (e.g. after the
+                  whitelist changed)
+        '''
+        self._full = self._full or full
+        self._resync = True
+        self._wakeup.set()
+
+    def forget(self, topic):
+        ''' Lets the watcher know, that topic was disconnected elsewhere. It stays
+            disconnected until the next 'resync' (or until it appears again)
+        '''
+        self._forgotten.add(topic)
+
+    def topics(self):
+        ''' Returns the topics connected by the watcher as {topic: [type, pubsub]}
+        '''
+        return dict(self._connected)
+
+    def stats(self):
+        return dict(topics=len(self._connected), polls=self.polls, changes=self.changes, added=self.added,
+                    removed=self.removed, failed=self.failed, lastPollMs=round(self.lastPollMs, 3))
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.clear()
+            resync, self._resync = self._resync, False
+            full, self._full = self._full, False
+            self.poll(full, resync)
+            if self.interval > 0:
+                self._wakeup.wait(self.interval)
+            else:
+                self._wakeup.wait()
+
+    def poll(self, full=False, reconnect=False):
+        ''' Compares the ROS-Graph to the last snapshot and applies the changes.
+            Returns True, if something changed
+
+            full:      Matches all topics again, not only the new ones
+            reconnect: Connects the topics again, which were disconnected elsewhere
+        '''
+        with self._lock:
+            start = monotonic()
+            try:
+                graph = self._fetch()
+            except Exception as e:
+                self.failed += 1
+                Log("WARNING", "Cannot get the published topics from the ROS-Master: {}".format(e))
+                return False
+
+            snapshot = frozenset((topic, topicType) for topic, topicType in graph
+                                 if topic.startswith("/") and topic not in self.static)
+            full = full or self._snapshot is None
+            self.polls += 1
+
+            connected = dict(self._connected)
+            for topic in list(self._forgotten):
+                self._forgotten.discard(topic)
+                connected.pop(topic, None)
+                self._disconnected.add(topic)
+            reconnect = (reconnect or full) and len(self._disconnected) > 0
+            if snapshot == self._snapshot and not full and not reconnect:
+                self._connected = connected
+                self.lastPollMs = (monotonic() - start) * 1000.0
+                return False
+
+            types = dict(snapshot)
+            if full:
+                matched = self._match(list(snapshot))
+                removed = [topic for topic in connected if topic not in matched]
+            else:
+                entries = snapshot - self._snapshot
+                if reconnect:
+                    entries = entries | frozenset(entry for entry in snapshot if entry[0] in self._disconnected)
+                matched = self._match(list(entries))
+                removed = [topic for topic, config in connected.items() if types.get(topic) != config[0]]
+            if reconnect:
+                self._disconnected.clear()
+            added = dict((topic, config) for topic, config in matched.items() if connected.get(topic) != config)
+            # Topics which changed their type are replaced when they are connected again
+            removed = [topic for topic in removed if topic not in added]
+            for topic in removed:
+                del connected[topic]
+            connected.update(added)
+
+            if added or removed:
+                try:
+                    self._apply(added, removed)
+                except Exception:
+                    self.failed += 1
+                    Log("ERROR", "Cannot apply the changes of the ROS-Graph:\n" + traceback.format_exc())
+                    # Compare everything again on the next poll
+                    self._snapshot = None
+                    return False
+                self.changes += 1
+                self.added += len(added)
+                self.removed += len(removed)
+                Log("INFO", "ROS-Graph changed: connected {}, disconnected {}".format(sorted(added.keys()), sorted(removed)))
+
+            self._snapshot = snapshot
+            self._connected = connected
+            self.lastPollMs = (monotonic() - start) * 1000.0
+            return bool(added or removed)
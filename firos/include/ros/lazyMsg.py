@@ -0,0 +1,110 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import struct
+import threading
+
+_HEADER_TYPES = ("std_msgs/Header", "Header")
+# uint32 seq and time stamp (2 x uint32)
+_SEQ_AND_STAMP = 12
+
+
+class LazyMsg(object):
+    ''' A ROS-Message which is kept serialized (as received via a 'rospy.AnyMsg'-Subscriber)
+        until it is really needed. Topics with the option "lazy" are subscribed this way,
+        so messages, which are dropped by the rate limiting or the change detection,
+        are never deserialized.
+
+        The content of the message can be compared without deserializing it ('sameContent').
+        The seq and stamp of the header of stamped messages are not part of the content,
+        since they change with every message. The frame_id is.
+
+        Use 'resolveMsg' to get the actual ROS-Message.
+    '''
+    __slots__ = ("msgClass", "buff", "_msg", "_content", "_digest")
+
+    # Counters of all LazyMsgs (guarded by _lock)
+    created = 0
+    deserialized = 0
+    _lock = threading.Lock()
+
+    def __init__(self, msgClass, buff):
+        ''' msgClass: The class of the ROS-Message
+            buff:     The serialized message
+        '''
+        self.msgClass = msgClass
+        self.buff = buff
+        self._msg = None
+        self._content = None
+        self._digest = None
+        with LazyMsg._lock:
+            LazyMsg.created += 1
+
+    @property
+    def _type(self):
+        return self.msgClass._type
+
+    def deserialize(self):
+        ''' Returns the ROS-Message (deserialized only once)
+        '''
+        if self._msg is None:
+            self._msg = self.msgClass().deserialize(self.buff)
+            with LazyMsg._lock:
+                LazyMsg.deserialized += 1
+        return self._msg
+
+    def content(self):
+        ''' Returns the serialized message without the seq and stamp of its header
+        '''
+        if self._content is None:
+            self._content = self.buff[_SEQ_AND_STAMP:] if hasHeader(self.msgClass) else self.buff
+        return self._content
+
+    def digest(self):
+        ''' A cheap hash of the content
+        '''
+        if self._digest is None:
+            self._digest = hash(self.content())
+        return self._digest
+
+    def sameContent(self, other):
+        return self.digest() == other.digest() and self.content() == other.content()
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return dict(received=cls.created, deserialized=cls.deserialized)
+
+
+def hasHeader(msgClass):
+    ''' Whether the first field of the ROS-Message-Class is a std_msgs/Header
+    '''
+    slotTypes = getattr(msgClass, "_slot_types", None)
+    return bool(slotTypes) and slotTypes[0] in _HEADER_TYPES
+
+
+def resolveMsg(msg):
+    ''' Returns the ROS-Message of msg, which might be a LazyMsg
+    '''
+    if type(msg) is LazyMsg:
+        return msg.deserialize()
+    return msg
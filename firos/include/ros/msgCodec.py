@@ -0,0 +1,559 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+import numbers
+import threading
+
+try:
+    # Python 2
+    _STRING_TYPES = (str, unicode)
+    _IMMUTABLE_TYPES = (int, long, float, bool, str, unicode, tuple, type(None))
+except NameError:
+    # Python 3
+    _STRING_TYPES = (str,)
+    _IMMUTABLE_TYPES = (int, float, bool, str, bytes, tuple, type(None))
+
+
+# "geometry_msgs/Pose[]" -> ("geometry_msgs/Pose", "[]", ""), "float64[9]" -> ("float64", "[9]", "9")
+_FIELD_TYPE = re.compile(r"^([^\[]+)(\[(\d*)\])?$")
+
+_NUMBER_TYPES = ("float32", "float64")
+_INTEGER_TYPES = ("int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64", "byte", "char")
+
+
+class ConversionError(ValueError):
+    ''' The received data does not match the shape of the ROS-Message
+    '''
+    pass
+
+
+def _unwrap(value):
+    ''' NGSI-typed values like {"type": "number", "value": 1} (as created by the
+        ObjectFiwareConverter) are reduced to their value
+    '''
+    if "value" in value and "type" in value:
+        return value["value"]
+    raise ConversionError("Expected a value, got {!r}".format(value))
+
+
+def _toFloat(value):
+    if type(value) is dict:
+        value = _unwrap(value)
+    if type(value) is bool or not isinstance(value, numbers.Real):
+        raise ConversionError("Expected a number, got {!r}".format(value))
+    return float(value)
+
+
+def _toInt(value):
+    if type(value) is dict:
+        value = _unwrap(value)
+    if type(value) is bool or not isinstance(value, numbers.Real):
+        raise ConversionError("Expected an integer, got {!r}".format(value))
+    return int(value)
+
+
+def _toBool(value):
+    if type(value) is dict:
+        value = _unwrap(value)
+    if not isinstance(value, (bool, int)):
+        raise ConversionError("Expected a boolean, got {!r}".format(value))
+    return bool(value)
+
+
+def _toString(value):
+    if type(value) is dict:
+        value = _unwrap(value)
+    if not isinstance(value, _STRING_TYPES):
+        raise ConversionError("Expected a string, got {!r}".format(value))
+    return value
+
+
+def _toBytes(value):
+    ''' uint8[] and char[] are bytes in rospy. They can be given as string or list of integers
+    '''
+    if type(value) is dict:
+        value = _unwrap(value)
+    if isinstance(value, list):
+        try:
+            return bytes(bytearray(value))
+        except TypeError:
+            # NGSI-typed items
+            return bytes(bytearray(_toInt(item) for item in value))
+    if isinstance(value, _STRING_TYPES):
+        return value.encode("latin-1") if not isinstance(value, bytes) else value
+    raise ConversionError("Expected a list of bytes, got {!r}".format(value))
+
+
+# genpy.Time and genpy.Duration (imported on first use) via _TIME_CLASSES[duration]
+_TIME_CLASSES = {}
+
+
+def _toTime(value, duration=False):
+    ''' time and duration can be given as {"secs": .., "nsecs": ..} or as seconds
+    '''
+    clazz = _TIME_CLASSES.get(duration)
+    if clazz is None:
+        import genpy
+        clazz = _TIME_CLASSES[duration] = genpy.Duration if duration else genpy.Time
+    if type(value) is dict:
+        secs = value.get("secs", 0)
+        nsecs = value.get("nsecs", 0)
+        return clazz(secs if type(secs) is int else _toInt(secs), nsecs if type(nsecs) is int else _toInt(nsecs))
+    return clazz.from_sec(_toFloat(value))
+
+
+def _toDuration(value):
+    return _toTime(value, True)
+
+
+def _timeConverter(clazz):
+    ''' Returns the converter of a time or duration field into clazz (the class of its
+        default value, genpy.Time or genpy.Duration). Values like {"secs": .., "nsecs": ..}
+        in the canonical range are set directly, without the constructor of clazz
+    '''
+    new = object.__new__
+
+    def convert(value):
+        if type(value) is dict:
+            secs = value.get("secs", 0)
+            nsecs = value.get("nsecs", 0)
+            if type(secs) is int and type(nsecs) is int and secs >= 0 and 0 <= nsecs < 1000000000:
+                stamp = new(clazz)
+                stamp.secs = secs
+                stamp.nsecs = nsecs
+                return stamp
+            return clazz(_toInt(secs), _toInt(nsecs))
+        return clazz.from_sec(_toFloat(value))
+    return convert
+
+
+_PRIMITIVES = {
+    "bool": _toBool,
+    "string": _toString,
+    "time": _toTime,
+    "duration": _toDuration
+}
+for _name in _NUMBER_TYPES:
+    _PRIMITIVES[_name] = _toFloat
+for _name in _INTEGER_TYPES:
+    _PRIMITIVES[_name] = _toInt
+
+# Values of these types are taken by the converters without any conversion
+_EXACT_TYPES = {"bool": bool, "string": str}
+for _name in _NUMBER_TYPES:
+    _EXACT_TYPES[_name] = float
+for _name in _INTEGER_TYPES:
+    _EXACT_TYPES[_name] = int
+
+
+def _prepare(msgClass, fields):
+    ''' Returns the function, which turns a value that is not a plain object of the fields
+        of msgClass into one: NGSI-typed values are unwrapped and the value of a message
+        with only one field may be given as plain value
+    '''
+    ngsi = not ("type" in fields and "value" in fields)
+
+    def prepare(value):
+        if ngsi and type(value) is dict and "type" in value and "value" in value:
+            value = value["value"]
+        if type(value) is not dict:
+            if len(fields) != 1:
+                raise ConversionError("Expected an object for {}, got {!r}".format(msgClass._type, value))
+            value = {fields[0]: value}
+        return value
+    return prepare
+
+
+def _fill(value, fields, defaults, msgType):
+    ''' Returns value with its missing fields taken from defaults.
+        Raises a ConversionError on unknown fields
+    '''
+    if not fields.issuperset(value):
+        raise ConversionError("Unknown fields {!r} of {}".format(sorted(set(value) - fields), msgType))
+    filled = dict(defaults)
+    filled.update(value)
+    return filled
+
+
+def _plainList(value):
+    ''' The items of an array field as list. Fixed-size arrays are deserialized as tuples,
+        arrays of topics with the option "numpy" as numpy-arrays (of numpy-scalars)
+    '''
+    if type(value) is list:
+        return list(value)
+    tolist = getattr(value, "tolist", None)
+    return tolist() if tolist is not None else list(value)
+
+
+# The NGSI-types of the primitive types ('toNgsi'), other types are named after the message type
+_NGSI_TYPES = {"bool": "boolean", "string": "string", "time": "Time", "duration": "Duration"}
+for _name in _NUMBER_TYPES + _INTEGER_TYPES:
+    _NGSI_TYPES[_name] = "number"
+
+
+def _typed(ngsiType, expression):
+    ''' The source of the NGSI-typed value of expression
+    '''
+    return "{'type': %r, 'value': %s}" % (ngsiType, expression)
+
+
+def _resolveMessageClass(msgType):
+    ''' Default resolver of the ROS-Message-Classes by their type (e.g. "geometry_msgs/Twist")
+    '''
+    from include.libLoader import LibLoader
+    return LibLoader.loadFromSystem(msgType, None)
+
+
+class MsgCodec(object):
+    ''' Converts received data (e.g. the value of an attribute notified by the Context-Broker)
+        into instances of a ROS-Message ('fromDict') and instances of a ROS-Message into
+        plain dictionaries ('toDict') or NGSI-typed ones ('toNgsi').
+
+        The converters are generated once for each ROS-Message-Type from its fields
+        and cached by '_type'. So a conversion only walks along the fields of the message,
+        without any reflection. The shape of the data is checked: unknown fields, values of
+        the wrong type or fixed-size arrays of the wrong length raise a ConversionError.
+
+        The data is the message as JSON-Object like {"linear": {"x": 1.0, ...}, ...}.
+        Fields which are missing keep their default value. A message with only one field
+        (e.g. std_msgs/String) may also be given as the plain value of this field.
+        Values may also be NGSI-typed like {"type": "number", "value": 1.0}.
+
+        'toDict' creates the same JSON-Object (uint8[] and char[] as lists of integers,
+        time and duration as {"secs": .., "nsecs": ..}). 'toNgsi' types every value like
+        {"linear": {"type": "geometry_msgs.Vector3", "value": {"x": {"type": "number", "value": 1.0}, ...}}, ...}
+        (as the ObjectFiwareConverter did). 'definition' is the structure of the message
+        with the types of its fields, like {"linear": {"x": "float64", ...}, ...}.
+    '''
+
+    _codecs = {}        # _codecs[MESSAGE_TYPE] = MsgCodec
+    _lock = threading.RLock()
+    # Returns the class of a ROS-Message-Type (can be replaced, e.g. in tests)
+    resolver = staticmethod(_resolveMessageClass)
+
+    @classmethod
+    def forClass(cls, msgClass):
+        ''' Returns the (cached) MsgCodec of the ROS-Message-Class
+        '''
+        codec = cls._codecs.get(msgClass._type)
+        if codec is None:
+            with cls._lock:
+                codec = cls._codecs.get(msgClass._type)
+                if codec is None:
+                    codec = cls(msgClass)
+                    cls._codecs[msgClass._type] = codec
+        return codec
+
+    @classmethod
+    def forType(cls, msgType):
+        return cls.forClass(cls.resolver(msgType))
+
+    def __init__(self, msgClass):
+        self.msgClass = msgClass
+        self.fromDict = self._generateFromDict(msgClass)
+        self.definition = self._definition(msgClass)
+        self.toDict = self._generateToDict(msgClass, False)
+        # NGSI-typed without metadata, for the items of arrays
+        self._toTyped = self._generateToDict(msgClass, True)
+        self.toNgsi = self._generateToDict(msgClass, True, self.definition)
+
+    @staticmethod
+    def _parseType(fieldType):
+        ''' Returns (baseType, isArray, length) of a field type
+        '''
+        match = _FIELD_TYPE.match(fieldType)
+        if match is None:
+            raise ConversionError("Unknown field type {}".format(fieldType))
+        baseType, isArray, length = match.groups()
+        if baseType not in _PRIMITIVES and "/" not in baseType:
+            # Only Header is given without package
+            baseType = "std_msgs/" + baseType
+        return baseType, isArray is not None, length
+
+    @classmethod
+    def _fieldConverter(cls, fieldType):
+        ''' Returns the function converting a value of the field type
+        '''
+        baseType, isArray, length = cls._parseType(fieldType)
+
+        if isArray and baseType in ("uint8", "char"):
+            return _toBytes
+        if baseType in _PRIMITIVES:
+            convert = _PRIMITIVES[baseType]
+        else:
+            convert = cls.forType(baseType).fromDict
+        if not isArray:
+            return convert
+
+        size = int(length) if length else None
+        exact = _EXACT_TYPES.get(baseType)
+
+        def convertArray(value):
+            if type(value) is dict:
+                value = _unwrap(value)
+            if not isinstance(value, list):
+                raise ConversionError("Expected a list, got {!r}".format(value))
+            if size is not None and len(value) != size:
+                raise ConversionError("Expected {} items, got {}".format(size, len(value)))
+            if exact is not None:
+                return [item if type(item) is exact else convert(item) for item in value]
+            return [convert(item) for item in value]
+        return convertArray
+
+    @classmethod
+    def _generateFromDict(cls, msgClass):
+        ''' Generates the source of the converter and compiles it. Nested messages are
+            inlined, e.g. for geometry_msgs/Twist:
+
+            def convert(v0):
+                if type(v0) is not dict or "value" in v0: v0 = P0(v0)
+                if len(v0) != 2: v0 = fill(v0, F0, K0, "geometry_msgs/Twist")
+                m0 = new(M0)
+                f = v0["linear"]
+                if f is MISSING: m0.linear = d0_0()
+                else:
+                    v1 = f
+                    ... (the same for geometry_msgs/Vector3 into m1)
+                    f = v1["x"]
+                    m1.x = f if type(f) is t1_0 else c1_0(f)
+                    ...
+                    m0.linear = m1
+                ...
+                return m0
+
+            The messages are created without their constructors, every field is set here: Missing
+            fields get the default value of the field (as set by the constructor of the message).
+            If fields are missing, the value is filled up with the (immutable) defaults K<n> first,
+            other fields (nested messages, lists, time) are MISSING in K<n> and created here.
+            A value with as many fields as the message, but an unknown one, misses a field: the
+            KeyError is raised as ConversionError. Values, which are not plain objects (NGSI-typed
+            or the value of the only field) are prepared by P<n>. Values and arrays, which already
+            have the right type, are taken without calling the converter.
+
+            'fromDict' is the same without the preparation and the missing fields: It converts
+            complete plain objects only and hands everything else (a value of the wrong length,
+            a KeyError or TypeError on the way) over to 'convert'.
+        '''
+        namespace = {
+            "new": object.__new__,
+            "fill": _fill,
+            "MISSING": object(),
+            "ConversionError": ConversionError
+        }
+        lines = ["def convert(v0):", "  try:"]
+        cls._fromDictLines(msgClass, 0, "    ", lines, namespace, False)
+        lines += [
+            "    return m0",
+            # As many fields as the message has, but not all of them
+            "  except KeyError as e:",
+            "    raise ConversionError('Unknown fields in the value of %s (missing %%s)' %% (e,))" % msgClass._type,
+            "def fromDict(v0):",
+            "  try:"
+        ]
+        cls._fromDictLines(msgClass, 0, "    ", lines, namespace, True)
+        lines += [
+            "    return m0",
+            "  except (KeyError, TypeError):",
+            "    return convert(v0)"
+        ]
+        exec(compile("\n".join(lines), "<MsgCodec {}>".format(msgClass._type), "exec"), namespace)
+        return namespace["fromDict"]
+
+    @classmethod
+    def _fromDictLines(cls, msgClass, n, indent, lines, namespace, fast):
+        ''' Appends the lines converting the value 'v<n>' into the message 'm<n>'.
+            Returns the next free n. If fast, only complete plain objects are converted,
+            anything else is converted by 'convert' (the lines without fast)
+        '''
+        fields = list(msgClass.__slots__)
+        template = msgClass()
+        defaults = {}
+        namespace["M%d" % n] = msgClass
+        namespace["F%d" % n] = frozenset(fields)
+        namespace["K%d" % n] = defaults
+        value, msg = "v%d" % n, "m%d" % n
+        namespace["P%d" % n] = _prepare(msgClass, fields)
+        if fast:
+            # Values which are not dictionaries raise a TypeError, missing fields a KeyError
+            lines.append(indent + "if len(%s) != %d: return convert(v0)" % (value, len(fields)))
+        else:
+            lines += [
+                indent + "if type(%s) is not dict or 'value' in %s: %s = P%d(%s)" % (value, value, value, n, value),
+                indent + "if len(%s) != %d: %s = fill(%s, F%d, K%d, %r)" % (value, len(fields), value, value, n, n, msgClass._type)
+            ]
+        lines.append(indent + "%s = new(M%d)" % (msg, n))
+
+        following = n + 1
+        for i, (field, fieldType) in enumerate(zip(fields, msgClass._slot_types)):
+            name = "%d_%d" % (n, i)
+            default = getattr(template, field)
+            exact = _EXACT_TYPES.get(fieldType)
+            lines.append(indent + "f = %s[%r]" % (value, field))
+            if exact is not None and type(default) is exact:
+                # The default is taken as it is
+                defaults[field] = default
+                namespace["t" + name] = exact
+                namespace["c" + name] = cls._fieldConverter(fieldType)
+                lines.append(indent + "%s.%s = f if type(f) is t%s else c%s(f)" % (msg, field, name, name))
+                continue
+
+            defaults[field] = namespace["MISSING"]
+            namespace["k" + name] = default
+            if isinstance(default, _IMMUTABLE_TYPES):
+                missing = "k" + name
+            elif isinstance(default, list):
+                missing = "list(k%s)" % name
+            else:
+                # Nested messages, time and duration
+                namespace["d" + name] = type(default)
+                missing = "d%s()" % name
+
+            baseType, isArray, length = cls._parseType(fieldType)
+            if not isArray and baseType not in _PRIMITIVES:
+                # Inline the nested message
+                nested = following
+                if fast:
+                    lines[-1] = indent + "v%d = %s[%r]" % (nested, value, field)
+                    following = cls._fromDictLines(cls.forType(baseType).msgClass, nested, indent, lines, namespace, fast)
+                    lines.append(indent + "%s.%s = m%d" % (msg, field, nested))
+                    continue
+                lines += [indent + "if f is MISSING: %s.%s = %s" % (msg, field, missing),
+                          indent + "else:", indent + "    v%d = f" % nested]
+                following = cls._fromDictLines(cls.forType(baseType).msgClass, nested, indent + "    ", lines, namespace, fast)
+                lines.append(indent + "    %s.%s = m%d" % (msg, field, nested))
+                continue
+
+            if not isArray and baseType in ("time", "duration"):
+                namespace["c" + name] = _timeConverter(type(default))
+            else:
+                namespace["c" + name] = cls._fieldConverter(fieldType)
+            # Missing fields only in the filled up value (not if fast)
+            branches = [] if fast else ["f is MISSING: %s.%s = %s" % (msg, field, missing)]
+            if isArray and baseType in _EXACT_TYPES and baseType not in ("uint8", "char"):
+                # Arrays of items of the exact type are copied as they are
+                namespace["t" + name] = frozenset((_EXACT_TYPES[baseType],))
+                size = " and len(f) == %s" % length if length else ""
+                branches.append("type(f) is list%s and t%s.issuperset(map(type, f)): %s.%s = list(f)" % (size, name, msg, field))
+            elif exact is not None:
+                namespace["t" + name] = exact
+                branches.append("type(f) is t%s: %s.%s = f" % (name, msg, field))
+            for i, branch in enumerate(branches):
+                lines.append(indent + ("elif " if i else "if ") + branch)
+            lines.append(indent + ("else: " if branches else "") + "%s.%s = c%s(f)" % (msg, field, name))
+        return following
+
+    @classmethod
+    def _toDictExpression(cls, fieldType, access, lines, namespace, typed, definition=None):
+        ''' Returns the expression converting the field 'access' into plain (or NGSI-typed)
+            values. Nested messages are inlined and bound to local variables first. The items
+            of arrays of messages are converted by the (generated) converter of their type.
+        '''
+        baseType, isArray, _ = cls._parseType(fieldType)
+        if isArray and baseType in ("uint8", "char"):
+            expression = "list(bytearray(%s))" % access
+            if typed:
+                expression = "[{'type': 'number', 'value': i} for i in %s]" % expression
+        elif baseType in ("time", "duration"):
+            if typed:
+                item = _typed(_NGSI_TYPES[baseType], "{'secs': {'type': 'number', 'value': %s.secs}, 'nsecs': {'type': 'number', 'value': %s.nsecs}}")
+            else:
+                item = "{'secs': %s.secs, 'nsecs': %s.nsecs}"
+            expression = ("[%s for i in %s]" % (item % ("i", "i"), access)) if isArray else item % (access, access)
+        elif baseType in _PRIMITIVES:
+            if isArray:
+                expression = "plain(%s)" % access
+                if typed:
+                    expression = "[%s for i in %s]" % (_typed(_NGSI_TYPES[baseType], "i"), expression)
+            else:
+                expression = _typed(_NGSI_TYPES[baseType], access) if typed else access
+        else:
+            codec = cls.forType(baseType)
+            if isArray:
+                function = "e%d" % len(namespace)
+                namespace[function] = codec._toTyped if typed else codec.toDict
+                if typed:
+                    return _typed("array", "[%s for i in %s]" % (_typed(baseType, function + "(i)"), access))
+                return "[%s(i) for i in %s]" % (function, access)
+            variable = "v%d" % len(lines)
+            lines.append("    %s = %s" % (variable, access))
+            expression = cls._messageExpression(codec.msgClass, variable, lines, namespace, typed, definition)
+            return _typed(baseType, expression) if typed else expression
+
+        if typed and isArray:
+            return _typed("array", expression)
+        return expression
+
+    @classmethod
+    def _messageExpression(cls, msgClass, access, lines, namespace, typed, definition=None):
+        ''' Returns the expression of the dictionary of all fields of the message 'access'.
+            With the definition, the (NGSI-typed) fields of the message itself and the arrays
+            of its nested messages get their definition as metadata "dataType" (as the
+            ObjectFiwareConverter did)
+        '''
+        items = []
+        for field, fieldType in zip(msgClass.__slots__, msgClass._slot_types):
+            nested = definition[field] if definition is not None else None
+            expression = cls._toDictExpression(fieldType, "%s.%s" % (access, field), lines, namespace, typed,
+                                               nested if isinstance(nested, dict) else None)
+            if definition is not None and (access == "msg" or "[" in fieldType):
+                name = "D%d" % len(namespace)
+                namespace[name] = {"dataType": {"type": "dataType", "value": definition[field]}}
+                expression = "%s, 'metadata': %s}" % (expression[:-1], name)
+            items.append("%r: %s" % (field, expression))
+        return "{%s}" % ", ".join(items)
+
+    @classmethod
+    def _generateToDict(cls, msgClass, typed, definition=None):
+        ''' Generates the source of the converter and compiles it. All nested messages
+            are inlined, e.g. for geometry_msgs/Pose:
+
+            def toDict(msg):
+                v1 = msg.position
+                v2 = msg.orientation
+                return {'position': {'x': v1.x, ...}, 'orientation': {'x': v2.x, ...}}
+
+            If typed, every value is NGSI-typed ('toNgsi') and the fields of the message
+            get their definition as metadata.
+        '''
+        lines = ["def toDict(msg):"]
+        namespace = {"plain": _plainList}
+        expression = cls._messageExpression(msgClass, "msg", lines, namespace, typed, definition)
+        lines.append("    return " + expression)
+        exec(compile("\n".join(lines), "<MsgCodec.{} {}>".format("toNgsi" if typed else "toDict", msgClass._type), "exec"), namespace)
+        return namespace["toDict"]
+
+    @classmethod
+    def _definition(cls, msgClass):
+        ''' Returns the structure of the message with the types of its fields
+            (arrays are given by their type, e.g. "geometry_msgs/Pose[]")
+        '''
+        definition = {}
+        for field, fieldType in zip(msgClass.__slots__, msgClass._slot_types):
+            baseType, isArray, _ = cls._parseType(fieldType)
+            if isArray or (baseType in _PRIMITIVES and baseType not in ("time", "duration")):
+                definition[field] = fieldType
+            elif baseType in ("time", "duration"):
+                definition[field] = {"secs": "int32", "nsecs": "int32"}
+            else:
+                definition[field] = cls.forType(baseType).definition
+        return definition
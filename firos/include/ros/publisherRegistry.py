@@ -0,0 +1,152 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+from collections import OrderedDict
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+from include.logger import Log
+
+
+class PublisherRegistry(object):
+    ''' Keeps the rospy.Publishers of FIROS alive, instead of creating (and registering
+        at the ROS-Master) a new one for each message.
+
+        Publishers are created lazily on the first 'get' of a topic and message type.
+        Publishers which were not used for 'idleTtl' seconds are unregistered, as well
+        as the least recently used ones, if more than 'maxSize' are kept.
+        Pinned publishers (e.g. the ones configured in the topics.json) are never evicted.
+    '''
+
+    def __init__(self, maxSize=100, idleTtl=300, queueSize=10, factory=None):
+        ''' maxSize:   The number of (not pinned) publishers kept at most
+            idleTtl:   Seconds an unused publisher is kept (0 keeps them forever)
+            queueSize: The queue_size of the created publishers
+            factory:   Creates the publishers. Default is rospy.Publisher
+        '''
+        self.maxSize = maxSize
+        self.idleTtl = idleTtl
+        self.queueSize = queueSize
+        self._factory = factory if factory is not None else _rosPublisher
+        self._lock = threading.Lock()
+        # _entries[(topic, msgType)] = [publisher, lastUsed, pinned], least recently used first
+        self._entries = OrderedDict()
+        self._lastEviction = monotonic()
+
+        # Counters
+        self.created = 0
+        self.hits = 0
+        self.evicted = 0
+
+    def get(self, topic, msgClass, latch=False, pinned=False):
+        ''' Returns the publisher of topic and msgClass, creating it if needed.
+
+            latch:  Only used, if the publisher is created
+            pinned: The publisher is never evicted
+        '''
+        key = (topic, msgClass._type)
+        with self._lock:
+            entry = self._touch(key, pinned)
+            evicted = self._evict() if monotonic() - self._lastEviction > 1 else []
+        self._unregister(evicted)
+        if entry is not None:
+            return entry[0]
+
+        # Registering at the ROS-Master takes a while, so it is not done within the lock
+        publisher = self._factory(topic, msgClass, queue_size=self.queueSize, latch=latch)
+        with self._lock:
+            entry = self._touch(key, pinned)
+            if entry is None:
+                self._entries[key] = [publisher, monotonic(), pinned]
+                self.created += 1
+                evicted = self._evict()
+            else:
+                # Another thread was faster
+                evicted = [publisher]
+        self._unregister(evicted)
+        return publisher if entry is None else entry[0]
+
+    def _touch(self, key, pinned):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[1] = monotonic()
+            entry[2] = entry[2] or pinned
+            self._entries[key] = entry
+            self.hits += 1
+        return entry
+
+    def _evict(self):
+        ''' Removes the idle and least recently used publishers (needs the lock).
+            Returns the removed publishers
+        '''
+        now = monotonic()
+        self._lastEviction = now
+        unpinned = [key for key, entry in self._entries.items() if not entry[2]]
+        evicted = []
+        for key in unpinned:
+            entry = self._entries[key]
+            if len(unpinned) - len(evicted) > self.maxSize or (self.idleTtl > 0 and now - entry[1] > self.idleTtl):
+                evicted.append(self._entries.pop(key)[0])
+        self.evicted += len(evicted)
+        return evicted
+
+    def unregister(self, topic):
+        ''' Unregisters all publishers of topic
+        '''
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == topic]
+            publishers = [self._entries.pop(key)[0] for key in keys]
+        self._unregister(publishers)
+
+    def clear(self):
+        ''' Unregisters all publishers
+        '''
+        with self._lock:
+            publishers = [entry[0] for entry in self._entries.values()]
+            self._entries.clear()
+        self._unregister(publishers)
+
+    def _unregister(self, publishers):
+        for publisher in publishers:
+            try:
+                publisher.unregister()
+            except Exception as e:
+                Log("WARNING", "Could not unregister publisher: {}".format(e))
+
+    def stats(self):
+        with self._lock:
+            return dict(size=len(self._entries), pinned=sum(1 for entry in self._entries.values() if entry[2]),
+                        created=self.created, hits=self.hits, evicted=self.evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _rosPublisher(*args, **kwargs):
+    ''' The default factory. rospy is imported here, so the registry can be used without ROS (e.g. in the tests)
+    '''
+    import rospy
+    return rospy.Publisher(*args, **kwargs)
@@ -17,8 +17,6 @@
 import os
 import re
 import json
-import rostopic
-import rospy
 
 from include.logger import Log
 from include.constants import Constants as C
@@ -43,6 +41,8 @@ class RosConfigurator:
         '''
         global entries
         if refresh or len(entries) == 0:
+            # Imported here, so the configuration can be loaded without ROS (e.g. in the tests)
+            import rospy
             listOfData = rospy.get_published_topics()
             entries = [item for sublist in listOfData for item in sublist if item.startswith("/")]
             
@@ -111,6 +111,7 @@ class RosConfigurator:
             entries:The String Entries. Each element is in the following structure "/ROBOT_ID/TOPIC_NAME"
             pubsub: A String. Either "publisher" or "subscriber"
         '''
+        import rostopic
         for entry in entries:
             matches = re.search(regex, entry)
             if matches is not None:
@@ -122,6 +123,36 @@ class RosConfigurator:
                     robots[entry] = [topic_type ,pubsub]
 
 
+    @staticmethod
+    def matchTopics(entries):
+        '''
+            This returns the robots-Structure of the given entries, like 'systemTopics'.
+            The types are already known (as given by rospy.get_published_topics),
+            so no request to the ROS-Master is necessary
+
+            entries: A list of (topic, type)
+        '''
+        whitelist = RosConfigurator.getWhiteList()
+        matched = {}
+        for pubsub in ["publisher", "subscriber"]:
+            for regex in whitelist.get(pubsub, []):
+                for topic, topic_type in entries:
+                    if topic not in matched and re.search(regex, topic) is not None:
+                        matched[topic] = [topic_type, pubsub]
+        return matched
+
+
+    @staticmethod
+    def addTopics(topics):
+        '''
+            This adds the topics (robots["topics"] = [MessageType, pubSub])
+        '''
+        global robots
+        _robots = dict(robots)
+        _robots.update(topics)
+        robots = _robots
+
+
     @staticmethod
     def removeTopic(topic):
         '''
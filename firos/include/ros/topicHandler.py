@@ -21,52 +21,58 @@ __version__ = "0.0.1a"
 __status__ = "Developement"
 
 import os
-import rospy
 import importlib
+import threading
 import time
 
 from include.logger import Log
 from include.constants import Constants as C 
-from include.libLoader import LibLoader
 from include import confManager
+from include.stats import registerStats
+from include.shutdown import ShutdownOrchestrator
+from include.ros.publisherRegistry import PublisherRegistry
+from include.ros.msgCodec import MsgCodec, ConversionError
+from include.ros.lazyMsg import LazyMsg
+from include.ros.topicRegistry import TopicRecord, TopicRegistry
+from include.ros.graphWatcher import GraphWatcher
+from include.ros.rosConfigurator import RosConfigurator
 
 # PubSub Handlers
 from include.pubsub.genericPubSub import PubSub
+from include.pubsub.publishPipeline import PublishPipeline
+from include.pubsub.rateLimiter import TopicRateLimiter
 
-# this Message is needed, for the Listeners on connect on disconnect
-import std_msgs.msg
+# All topics of the topics.json. TOPICS.get(topic) returns the TopicRecord (rospy
+# Publisher/Subscriber, message-type, -class and -definition, rate limiter and last message)
+TOPICS = TopicRegistry()
+# All rospy Publishers of FIROS (including the ones of TOPICS), which are reused by topic and type
+PUBLISHER_REGISTRY = PublisherRegistry(C.ROS_PUBLISHER_CACHE_SIZE, C.ROS_PUBLISHER_IDLE_TTL, C.ROS_SUB_QUEUE_SIZE)
 
-# Structs with topic: 
-# ROS_PUBSUB[topic] --> returns  rospy Publisher/Subsriber
-ROS_PUBLISHER = {}
-ROS_SUBSCRIBER_LAST_MESSAGE = {}
-ROS_SUBSCRIBER = {}
-
-# A Struct which is used to minimize the Number of publishes. Here we only
-# save time stamps of ids. LAST_PUBLISH_TIME[topic] would return a time 
-LAST_PUBLISH_TIME = dict()
-
-# Topics in ROS do only have one data-type! 
-# (There might be an Exception to this if the topic gets deregistered, this is currently ignored)
-# We use this here to load the type of an topic and the dictionary rep. only once!
-ROS_TOPIC_TYPE = {}  
-ROS_TOPIC_AS_DICT ={}
+# Serializes connecting and disconnecting topics (the reads of TOPICS do not lock)
+_topicsLock = threading.Lock()
 
 # ROS-Node Subscribers  (connect/disconnect)
 subscribers = []
 
-# Actual ROS-Classes are used in instantiateROSMessage and loadMsgHandlers. 
-# An entry is the ._type-Attribute of the ROS-Messages ('/' is replaced by '.')
-ROS_MESSAGE_CLASSES = {}
-
 # If shutdown is signaled, do stop posting ROS-Messages to the ContextBroker
 SHUTDOWN_SIGNAL = False
 
 CloudPubSub = None
 
+# Decouples the ROS-Callbacks from publishing via CloudPubSub
+PUBLISH_PIPELINE = None
+
+# Connects the topics (of the whitelist) which appear in the ROS-World and disconnects vanished ones
+GRAPH_WATCHER = None
+
 def initPubAndSub():
-    global CloudPubSub
+    global CloudPubSub, PUBLISH_PIPELINE
     CloudPubSub = PubSub()
+    PUBLISH_PIPELINE = PublishPipeline(CloudPubSub.publish, C.PUBLISH_WORKERS)
+    registerStats("publish", PUBLISH_PIPELINE.stats)
+    registerStats("rateLimit", _rateLimitStats)
+    registerStats("rosPublishers", PUBLISHER_REGISTRY.stats)
+    registerStats("lazy", LazyMsg.stats)
 
 def loadMsgHandlers(topics_data):
     ''' This method initializes The Publisher and Subscriber for ROS and 
@@ -83,6 +89,23 @@ def loadMsgHandlers(topics_data):
 
     Log("INFO", "Getting configuration data")
     Log("INFO", "Generating topic handlers:")
+    with _topicsLock:
+        _registerTopics(topics_data)
+
+        # After initializing ROS-PUB/SUBs, intitialize ContextBroker-Subscriber based on ROS-Publishers for each robot
+        _subscribeCloud()
+
+
+def _registerTopics(topics_data):
+    ''' Creates the TopicRecords (and rospy Publishers/Subscribers) of topics_data.
+        Topics which are already connected (e.g. on a reconnect) are kept.
+
+        Returns the new TopicRecords
+    '''
+    # Imported here, so the topic handling can be loaded without ROS (e.g. in the tests)
+    import rospy
+    from include.libLoader import LibLoader
+    registered = []
 
     # Generate 
     for topic in topics_data.keys():
@@ -90,56 +113,125 @@ def loadMsgHandlers(topics_data):
 
         # Load specific message from robot_data
         msg = str(topics_data[topic][0])
+        kind = topics_data[topic][1].lower()
         theclass = LibLoader.loadFromSystem(msg, topic) 
-        
-        # Add specific message in struct to not load it again later.
-        if theclass._type not in ROS_MESSAGE_CLASSES:
-            ROS_MESSAGE_CLASSES[theclass._type] = theclass  # setting Class
-
-        # Create, if not already, a dictionary from the corresponding message-type
-        if topic not in ROS_TOPIC_AS_DICT:
-            ROS_TOPIC_AS_DICT[topic] = rosMsg2Dict(theclass())
-        
-        # Set the topic class-type, which is for each topic always the same
-        ROS_TOPIC_TYPE[topic] = theclass._type
+
+        # Keep the topics which are already connected (e.g. on a reconnect)
+        current = TOPICS.get(topic)
+        if current is not None:
+            if current.kind == kind and current.msgType == theclass._type:
+                continue
+            _disconnectTopic(topic)
+
+        # Generate the converters of this message type now, so it fails early.
+        # The codec also provides the dictionary of the message-type
+        try:
+            definition = MsgCodec.forClass(theclass).definition
+        except (ConversionError, ImportError) as e:
+            Log("ERROR", "Cannot convert the messages {} of topic {}: {}".format(theclass._type, topic, e))
+            definition = {}
+        record = TopicRecord(topic, kind, theclass, definition)
 
         # Create Publisher or Subscriber
-        if topics_data[topic][1].lower() == "subscriber":
-            # Case it is a subscriber, add it in subscribers
-            additionalArgsCallback = {"topic": topic} # Add addtional Infos about topic
-            ROS_SUBSCRIBER[topic] = rospy.Subscriber(topic, theclass, _publishToCBRoutine, additionalArgsCallback)
-            ROS_SUBSCRIBER_LAST_MESSAGE[topic] = None # No message currently published
+        if kind == "subscriber":
+            # Case it is a subscriber, the record is passed to the callbacks
+            CloudPubSub.registerTopic(topic, theclass._type)
+            record.rateLimiter = _createRateLimiter(record)
+            options = confManager.getTopicOptions(topic)
+            if options.get("numpy", False):
+                # Deserialize the arrays of the messages directly into numpy-arrays
+                from rospy.numpy_msg import numpy_msg
+                record.subscribedClass = numpy_msg(theclass)
+            if options.get("lazy", False):
+                # Keep the messages serialized, until they are published
+                record.subscriber = rospy.Subscriber(topic, rospy.AnyMsg, _publishLazyToCBRoutine, record)
+            else:
+                record.subscriber = rospy.Subscriber(topic, record.subscribedClass, _publishToCBRoutine, record)
         else:
-            # Case it is a publisher, add it in publishers
-            ROS_PUBLISHER[topic] = rospy.Publisher(topic, theclass, queue_size=C.ROS_SUB_QUEUE_SIZE, latch=True)
+            # Case it is a publisher
+            record.publisher = PUBLISHER_REGISTRY.get(topic, theclass, latch=True, pinned=True)
+        TOPICS.put(record)
+        registered.append(record)
+    return registered
+
 
-    # After initializing ROS-PUB/SUBs, intitialize ContextBroker-Subscriber based on ROS-Publishers for each robot
-    CloudPubSub.subscribe(ROS_PUBLISHER.keys(), ROS_TOPIC_TYPE, ROS_TOPIC_AS_DICT)  
+def _subscribeCloud():
+    ''' (Re-)Subscribes the CloudPubSub to the topics FIROS publishes into ROS
+    '''
+    snapshot = TOPICS.snapshot()
+    publishers = [topic for topic, record in snapshot.records.items() if record.kind == "publisher"]
+    CloudPubSub.subscribe(publishers, snapshot.types, snapshot.definitions)
     Log("INFO", "\n")
-    Log("INFO", "Subscribed to " + str(list(ROS_PUBLISHER.keys())) + "\n")
+    Log("INFO", "Subscribed to " + str(publishers) + "\n")
+
+
+def getTopicClass(topic):
+    ''' Returns the ROS-Message-Class of a topic in the topics.json (or None)
+    '''
+    record = TOPICS.get(topic)
+    return record.msgClass if record is not None else None
 
 
-def _publishToCBRoutine(data, args):
+def _createRateLimiter(record):
+    ''' Creates the TopicRateLimiter of a topic, as configured via the option "rate" in
+        the 'topics.json' like:  "rate": {"hz": 5, "burst": 1, "policy": "coalesce-latest"}
+
+        Without this option, the global PUB_FREQUENCY is used (if set).
+        Returns None if the topic is unlimited.
+    '''
+    rate = confManager.getTopicOptions(record.topic).get("rate")
+    if rate is not None:
+        return TopicRateLimiter(float(rate["hz"]), rate.get("burst", 1), rate.get("policy", "drop"),
+                                lambda data: _releaseToCB(record, data))
+    if C.PUB_FREQUENCY > 0:
+        return TopicRateLimiter(1000.0 / C.PUB_FREQUENCY, 1, "drop")
+    return None
+
+
+def _rateLimitStats():
+    ''' Sums up the counters of all TopicRateLimiters
+    '''
+    stats = dict(dropped=0, coalesced=0, delayed=0, held=0)
+    for record in TOPICS.records():
+        if record.rateLimiter is not None:
+            for key, value in record.rateLimiter.stats().items():
+                stats[key] += value
+    return stats
+
+
+def _publishToCBRoutine(data, record):
     ''' This routine is executed on every received (subscribed) message on ROS.
-        It just wraps it content and publishes the data via the cbPublisher.publishToCB
+        It just hands the data over to the PUBLISH_PIPELINE, which publishes it via
+        the CloudPubSub in another thread. So this callback never blocks on the Publishers.
         Here we explicitly check at the SHUTDOWN_SIGNAL. if it is set, we stop publishing
 
-        Here we also use the PUB_FREQUENCY-variable, to limit the number of publishes, if needed
+        Here we also use the rate limiter of the topic, to limit the number of publishes, if needed
 
-        data: data received from ROS
-        args: additional arguments we set prior
+        data:   data received from ROS
+        record: the TopicRecord of the topic, which we set prior
     '''
-    if not SHUTDOWN_SIGNAL:
-        topic = args['topic'] # Retreiving additional Infos, which were set on initialization 
-    
-        t = time.time() * 1000 # Get Millis
-        if topic in LAST_PUBLISH_TIME and LAST_PUBLISH_TIME[topic] >= t:
-            # Case: We want it to publish again, but we did not wait PUB_FREQUENCY milliseconds
-            return 
+    if not SHUTDOWN_SIGNAL and record.active:
+        limiter = record.rateLimiter
+        if limiter is not None and not limiter.offer(data):
+            # Case: The message exceeds the rate. It is dropped or released later
+            return
 
-        CloudPubSub.publish(topic, data, ROS_TOPIC_AS_DICT) 
-        ROS_SUBSCRIBER_LAST_MESSAGE[topic] = data
-        LAST_PUBLISH_TIME[topic] = t + C.PUB_FREQUENCY
+        _releaseToCB(record, data)
+
+
+def _publishLazyToCBRoutine(data, record):
+    ''' The routine of topics with the option "lazy". data is a rospy.AnyMsg, which
+        is handed over as LazyMsg. It is only deserialized, if it is really published.
+    '''
+    _publishToCBRoutine(LazyMsg(record.subscribedClass, data._buff), record)
+
+
+def _releaseToCB(record, data):
+    ''' Hands the data of a topic over to the PUBLISH_PIPELINE
+    '''
+    if not SHUTDOWN_SIGNAL and record.active:
+        PUBLISH_PIPELINE.put(record.topic, data, TOPICS.definitions)
+        record.lastMessage = data
 
 
 
@@ -157,103 +249,60 @@ class RosTopicHandler:
             ContextBroker to ROS
 
             topic: The topic to be published
-            convertedData: the converted data from the Subscriber
+            convertedData: the converted data from the Subscriber (a JSON-Object, see MsgCodec)
             dataStruct: The struct of convertedData, specified by their types
         '''
-        if topic in ROS_PUBLISHER:
-            if topic in ROS_TOPIC_TYPE and ROS_TOPIC_TYPE[topic] == dataStruct['type']: 
-                # check if a publisher to this topic is set 
-                # then check the received and expected type to be equal
-                # Iff, then publish received message to ROS
-                newMsg = instantiateROSMessage(convertedData, dataStruct)
-                ROS_PUBLISHER[topic].publish(newMsg)
+        record = TOPICS.get(topic)
+        if record is not None and record.publisher is not None and record.msgType == dataStruct['type']:
+            # check if a publisher to this topic is set 
+            # then check the received and expected type to be equal
+            # Iff, then publish received message to ROS
+            newMsg = MsgCodec.forClass(record.msgClass).fromDict(convertedData)
+            record.publisher.publish(newMsg)
 
 
     @staticmethod
     def unregisterAll():
         global SHUTDOWN_SIGNAL
         ''' First set the SHUTDOWN_SIGNAL, then
+            send the pending updates,
             unregister all subscriptions on ContextBroker,
             delete all created Entities on Context Broker and
             unregister subscriptions from ROS
+
+            Everything happens within SHUTDOWN_TIMEOUT seconds. The cleanup on the
+            ContextBroker is done concurrently. Steps which take too long are skipped.
         '''
         SHUTDOWN_SIGNAL = True
-
-        CloudPubSub.unsubscribe()
-        CloudPubSub.unpublish()
+        if GRAPH_WATCHER is not None:
+            GRAPH_WATCHER.stop()
+        orchestrator = ShutdownOrchestrator(C.SHUTDOWN_TIMEOUT, C.SHUTDOWN_WORKERS)
+
+        # Send out pending updates first
+        records = TOPICS.records()
+        for record in records:
+            if record.rateLimiter is not None:
+                # The latest held back message is still sent (the mailbox keeps only the latest anyway)
+                held = record.rateLimiter.drain()
+                if held:
+                    PUBLISH_PIPELINE.put(record.topic, held[-1], TOPICS.definitions)
+        orchestrator.run([("PublishPipeline.flush", lambda: PUBLISH_PIPELINE.flush(orchestrator.remaining()))])
+        PUBLISH_PIPELINE.stop()
+        orchestrator.run([("CloudPubSub.flush", CloudPubSub.flush)])
+
+        # Cleanup on the ContextBroker
+        orchestrator.run(CloudPubSub.shutdownTasks())
 
         Log("INFO", "Unsubscribing topics...")
         for subscriber in subscribers:
             subscriber.unregister()
-        for topic in ROS_SUBSCRIBER:
-            ROS_SUBSCRIBER[topic].unregister()
+        for record in records:
+            if record.subscriber is not None:
+                record.subscriber.unregister()
+        PUBLISHER_REGISTRY.clear()
         Log("INFO", "Unsubscribed topics\n")
-
-
-
-def instantiateROSMessage(obj, dataStruct):
-    ''' This method instantiates via obj and dataStruct the actual ROS-Message like
-        "geometry_msgs.Twist". Explicitly it loads the ROS-Message-class (if not already done)
-        with the dataStruct["type"] if given and recursively sets all attributes of the Message. 
-
-        obj: The Object to instantiate
-        dataStruct: The corresponding dataStruct, which helps by setting the explicit ROS-Message
-    '''
-    # Check if type and value in datastruct, if not we default to a primitive value
-    if 'type' in dataStruct and 'value' in dataStruct:
-        
-        # Load Message-Class only if not already loaded!
-        if dataStruct['type'] not in ROS_MESSAGE_CLASSES:
-            msgClass = LibLoader.loadFromSystem(dataStruct['type'], None)
-            ROS_MESSAGE_CLASSES[dataStruct['type']] = msgClass
-        #instantiate Message
-        instance = ROS_MESSAGE_CLASSES[dataStruct['type']]()
-
-        for attr in ROS_MESSAGE_CLASSES[dataStruct['type']].__slots__:
-            # For each attribute in Message
-            if attr in obj and attr in dataStruct['value']:
-                # Check iff obj AND dataStruct contains attr
-                if type(dataStruct['value'][attr]) is list:
-                    l =[]
-                    for it in range(len(dataStruct['value'][attr])):
-                        l.append(instantiateROSMessage(obj[attr][it], dataStruct['value'][attr][it]))
-                    setattr(instance, attr, l)
-                else:
-                    setattr(instance, attr, instantiateROSMessage(obj[attr], dataStruct['value'][attr]))
-        return instance
-    else:
-        # Struct is {}:
-        if type(obj) is dict:
-            # if it is still a dict, convert into an Object with attributes
-            t = Temp()
-            for k in obj:
-                setattr(t, k, obj[k])
-            return t
-        else:
-            # something more simple (int, long, float), return it
-            return obj
-
-            
-class Temp(object):
-    ''' A Temp-object, to convert from a Dictionary into an object with attributes.
-    '''
-    pass
-
-
-def rosMsg2Dict(rosClassInstance):
-    ''' Generating a dictionary out of the instance of a
-        ROS-Message
-
-        rosClassInstance: an actual instance of the ROS-Message (values will be omitted)
-    '''
-    obj = {}
-    for key, t in zip(rosClassInstance.__slots__, rosClassInstance._slot_types):
-        attr = getattr(rosClassInstance, key)
-        if hasattr(attr, '__slots__'):
-            obj[key] = rosMsg2Dict(attr)
-        else:
-            obj[key] = t
-    return obj
+        if orchestrator.skipped:
+            Log("WARNING", "Skipped on shutdown: " + str(orchestrator.skipped))
 
 
 
@@ -268,6 +317,9 @@ def createConnectionListeners():
         /ROS_NODE_NAME/connect    --> std_msgs/String
         /ROS_NODE_NAME/disconnect --> std_msgs/String
     '''
+    import rospy
+    # this Message is needed, for the Listeners on connect on disconnect
+    import std_msgs.msg
     subscribers.append(rospy.Subscriber(C.ROS_NODE_NAME + "/disconnect", std_msgs.msg.String, _robotDisconnection))
     subscribers.append(rospy.Subscriber(C.ROS_NODE_NAME +"/connect", std_msgs.msg.String, _robotConnection))
 
@@ -277,20 +329,82 @@ def _robotDisconnection(data):
 
         data: The String which was sent to firos
     '''
-    topic = str(data.data)
+    disconnectTopic(str(data.data))
 
-    
-    if topic in ROS_PUBLISHER:
-        for topic in ROS_PUBLISHER[topic]:
-            ROS_PUBLISHER[topic][topic].unregister()
-        Log("INFO", "Disconnected publisher for: " + topic)
-        del ROS_PUBLISHER[topic]
 
-    if topic in ROS_SUBSCRIBER:
-        for topic in ROS_SUBSCRIBER[topic]:
-            ROS_SUBSCRIBER[topic][topic].unregister()
+def updateTopics(added, removed):
+    ''' Connects the topics added ({topic: [type, pubsub]}) and disconnects the
+        topics removed, without touching the other topics. The CloudPubSub is only
+        subscribed again, if a topic FIROS publishes into ROS changed.
+    '''
+    if SHUTDOWN_SIGNAL:
+        return
+    with _topicsLock:
+        changed = [record for record in (_disconnectTopic(topic) for topic in removed) if record is not None]
+        for topic in removed:
+            RosConfigurator.removeTopic(topic)
+        changed += _registerTopics(added)
+        RosConfigurator.addTopics(added)
+        if any(record.kind == "publisher" for record in changed):
+            _subscribeCloud()
+
+
+def startGraphWatcher():
+    ''' Starts the GRAPH_WATCHER, which polls the ROS-Master every GRAPH_WATCH_INTERVAL
+        seconds. The topics of the 'topics.json' are connected once and never touched.
+    '''
+    global GRAPH_WATCHER
+    import rospy
+    GRAPH_WATCHER = GraphWatcher(C.GRAPH_WATCH_INTERVAL, rospy.get_published_topics, RosConfigurator.matchTopics,
+                                 updateTopics, confManager.getStaticTopics().keys())
+    registerStats("graphWatcher", GRAPH_WATCHER.stats)
+    GRAPH_WATCHER.start()
+
+
+def resyncTopics():
+    ''' Lets the GRAPH_WATCHER look for new and vanished topics now. It does not
+        wait for it, so it can be called from the ROS-callbacks and the REST-API.
+    '''
+    if GRAPH_WATCHER is None:
+        loadMsgHandlers(confManager.getRobots(True))
+        return
+    # Topics connected from now on use the current options of the 'topics.json'
+    confManager.invalidateTopicOptions()
+    GRAPH_WATCHER.resync()
+
+    # The topics of the 'topics.json' are not watched, only connected again
+    missing = dict((topic, config) for topic, config in confManager.getStaticTopics().items() if topic not in TOPICS)
+    if missing:
+        updateTopics(missing, [])
+
+
+def disconnectTopic(topic):
+    ''' Removes topic from TOPICS and unregisters its rospy Publisher/Subscriber.
+        The messages of this topic, which are still processed, are ignored from now on.
+        The topic is connected again on the next resync.
+
+        Returns the removed TopicRecord (or None if the topic was not connected)
+    '''
+    if GRAPH_WATCHER is not None:
+        GRAPH_WATCHER.forget(topic)
+    with _topicsLock:
+        return _disconnectTopic(topic)
+
+
+def _disconnectTopic(topic):
+    record = TOPICS.remove(topic)
+    if record is None:
+        return None
+
+    if record.rateLimiter is not None:
+        record.rateLimiter.cancel()
+    if record.publisher is not None:
+        PUBLISHER_REGISTRY.unregister(topic)
+        Log("INFO", "Disconnected publisher for: " + topic)
+    if record.subscriber is not None:
+        record.subscriber.unregister()
         Log("INFO", "Disconnected subscriber for: " + topic)
-        del ROS_SUBSCRIBER[topic]
+    return record
 
 
 def _robotConnection(data):
@@ -301,4 +415,4 @@ def _robotConnection(data):
     '''
     robot_name = data.data
     Log("INFO", "Connected robot: " + robot_name)
-    loadMsgHandlers(confManager.getRobots(True))
+    resyncTopics()
@@ -0,0 +1,160 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+
+
+class TopicRecord(object):
+    ''' Everything FIROS keeps about one topic of the topics.json:
+
+        topic:           The ROS-topic
+        kind:            "publisher" (FIROS publishes into ROS) or "subscriber"
+        msgType:         The type of the messages (e.g. 'geometry_msgs/Pose')
+        msgClass:        The ROS-Message-Class
+        subscribedClass: The class the messages are deserialized into (e.g. a numpy_msg)
+        definition:      The dictionary of the message-type (see MsgCodec.definition)
+        publisher:       The rospy.Publisher (kind "publisher")
+        subscriber:      The rospy.Subscriber (kind "subscriber")
+        rateLimiter:     The TopicRateLimiter (or None if unlimited)
+        lastMessage:     The last message received from ROS
+        active:          False, as soon as the topic is disconnected
+
+        The record is handed to the rospy-callbacks, so a message does not need to
+        look up anything. Only 'lastMessage' and 'active' change after the record is
+        registered, both are assigned atomically.
+    '''
+    __slots__ = ("topic", "kind", "msgType", "msgClass", "subscribedClass", "definition",
+                 "publisher", "subscriber", "rateLimiter", "lastMessage", "active")
+
+    def __init__(self, topic, kind, msgClass=None, definition=None):
+        self.topic = topic
+        self.kind = kind
+        self.msgType = getattr(msgClass, "_type", None)
+        self.msgClass = msgClass
+        self.subscribedClass = msgClass
+        self.definition = definition if definition is not None else {}
+        self.publisher = None
+        self.subscriber = None
+        self.rateLimiter = None
+        self.lastMessage = None
+        self.active = True
+
+
+class TopicSnapshot(object):
+    ''' One consistent state of the TopicRegistry: The TopicRecords, their message-types
+        and -definitions by topic ('records', 'types' and 'definitions'). A snapshot is
+        never modified after it is created.
+    '''
+    __slots__ = ("records", "types", "definitions")
+
+    def __init__(self, records):
+        self.records = records
+        self.types = dict((topic, record.msgType) for topic, record in records.items())
+        self.definitions = dict((topic, record.definition) for topic, record in records.items())
+
+
+class TopicRegistry(object):
+    ''' Keeps the TopicRecords by topic.
+
+        Reads do not lock: The current TopicSnapshot is never modified, but replaced
+        by a modified copy on 'put' and 'remove' (copy-on-write) in one assignment.
+        So readers always see a consistent state, while a writer holds the lock.
+        Readers which need more than one part of the state (e.g. the types and the
+        definitions) take one 'snapshot' and read everything from it.
+
+        'types' and 'definitions' are the message-types and -definitions by topic of
+        the current snapshot, as passed to the PubSub.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = TopicSnapshot({})
+
+    def snapshot(self):
+        ''' Returns the current TopicSnapshot
+        '''
+        return self._snapshot
+
+    @property
+    def types(self):
+        return self._snapshot.types
+
+    @property
+    def definitions(self):
+        return self._snapshot.definitions
+
+    def get(self, topic):
+        ''' Returns the TopicRecord of topic (or None)
+        '''
+        return self._snapshot.records.get(topic)
+
+    def records(self):
+        return list(self._snapshot.records.values())
+
+    def topics(self, kind=None):
+        ''' Returns the topics (of kind "publisher" or "subscriber" if given)
+        '''
+        return [record.topic for record in self._snapshot.records.values() if kind is None or record.kind == kind]
+
+    def put(self, record):
+        ''' Registers record. Returns the record it replaced (or None), which is
+            deactivated.
+        '''
+        with self._lock:
+            records = dict(self._snapshot.records)
+            previous = records.get(record.topic)
+            records[record.topic] = record
+            self._snapshot = TopicSnapshot(records)
+        if previous is not None and previous is not record:
+            previous.active = False
+        return previous
+
+    def remove(self, topic):
+        ''' Unregisters topic. The record is deactivated first, so the callbacks
+            still running with it ignore their messages. Returns the record (or None)
+        '''
+        record = self._snapshot.records.get(topic)
+        if record is None:
+            return None
+        record.active = False
+        with self._lock:
+            records = dict(self._snapshot.records)
+            if records.get(topic) is not record:
+                # Already removed or replaced by another thread
+                return None
+            del records[topic]
+            self._snapshot = TopicSnapshot(records)
+        return record
+
+    def clear(self):
+        with self._lock:
+            records = list(self._snapshot.records.values())
+            self._snapshot = TopicSnapshot({})
+        for record in records:
+            record.active = False
+        return records
+
+    def __contains__(self, topic):
+        return topic in self._snapshot.records
+
+    def __len__(self):
+        return len(self._snapshot.records)
@@ -0,0 +1,140 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import heapq
+import random
+import threading
+import traceback
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+from include.logger import Log
+
+
+class ScheduledTask(object):
+    ''' The handle of a task in the Scheduler. 'cancel' removes it (also if it is repeating)
+    '''
+    __slots__ = ("func", "interval", "jitter", "cancelled")
+
+    def __init__(self, func, interval, jitter):
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def nextDelay(self):
+        ''' The delay until the next run, shortened by up to 'jitter' (fraction of the interval)
+        '''
+        return self.interval * (1.0 - self.jitter * random.random())
+
+
+class Scheduler(object):
+    ''' Runs the (periodic) work of FIROS, like renewing subscriptions or sending the
+        heartbeat, in one thread. The tasks are kept in a heap ordered by their due time.
+
+        The tasks are executed in the scheduler thread one after another, so they should
+        not block for long (HTTP-Requests are bounded by their timeout).
+    '''
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._heap = []         # Entries (due, seq, task)
+        self._seq = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="firos-scheduler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def schedule(self, delay, func):
+        ''' Runs func once after delay seconds. Returns its ScheduledTask
+        '''
+        task = ScheduledTask(func, None, 0)
+        self._push(delay, task)
+        return task
+
+    def scheduleRepeating(self, interval, func, jitter=0.0, delay=None):
+        ''' Runs func every interval seconds (first after delay, default: interval).
+            With jitter (0..1) each interval is shortened by a random fraction of up to
+            jitter, so tasks started together are spread over time.
+        '''
+        task = ScheduledTask(func, interval, jitter)
+        self._push(task.nextDelay() if delay is None else delay, task)
+        return task
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def __len__(self):
+        with self._cond:
+            return sum(1 for entry in self._heap if not entry[2].cancelled)
+
+    def _push(self, delay, task):
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (monotonic() + max(0, delay), self._seq, task))
+            # Wake up the scheduler thread, since the new task might be due earlier
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    if self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+                    wait = self._heap[0][0] - monotonic() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                task = heapq.heappop(self._heap)[2]
+
+            try:
+                task.func()
+            except Exception:
+                Log("ERROR", "Scheduled task failed:\n" + traceback.format_exc())
+
+            if task.interval is not None and not task.cancelled:
+                self._push(task.nextDelay(), task)
+
+
+_scheduler = None
+_schedulerLock = threading.Lock()
+
+
+def getScheduler():
+    ''' Returns the Scheduler shared by all components (started on first use)
+    '''
+    global _scheduler
+    with _schedulerLock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
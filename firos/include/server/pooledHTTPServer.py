@@ -0,0 +1,285 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import select
+import socket
+import threading
+import traceback
+try:
+    # Python 3
+    from http.server import HTTPServer
+    from queue import Queue
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import HTTPServer
+    from Queue import Queue
+    from time import time as monotonic
+try:
+    # Python 3
+    import selectors
+except ImportError:
+    # Python 2
+    selectors = None
+
+from include.logger import Log
+
+
+class _Connection(object):
+    ''' An accepted connection and the request handler serving it
+    '''
+    __slots__ = ("request", "client_address", "handler", "idleSince")
+
+    def __init__(self, request, client_address):
+        self.request = request
+        self.client_address = client_address
+        self.handler = None
+        self.idleSince = None
+
+
+class _IdleSelector(object):
+    ''' Watches the idle keep-alive connections in one thread. As soon as a connection
+        is readable (the next request arrives), it is handed to the workers again.
+        Connections idle for more than 'timeout' seconds are closed.
+    '''
+
+    def __init__(self, server, timeout):
+        self.server = server
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._added = []
+        self._idle = {}         # The idle connections by their file descriptor
+        self._stopped = False
+        self._wakeup, self._wakeupWriter = socket.socketpair()
+        self._wakeup.setblocking(False)
+        if selectors is not None:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, name="firos-http-idle")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._idle) + len(self._added)
+
+    def add(self, connection):
+        connection.idleSince = monotonic()
+        with self._lock:
+            stopped = self._stopped
+            if not stopped:
+                self._added.append(connection)
+        if stopped:
+            self.server._close(connection)
+        else:
+            self._wake()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeupWriter.send(b"x")
+        except socket.error:
+            # The buffer is full, so the thread wakes up anyway
+            pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                stopped = self._stopped
+                added, self._added = self._added, []
+            if stopped:
+                break
+            for connection in added:
+                fd = connection.request.fileno()
+                self._idle[fd] = connection
+                if selectors is not None:
+                    self._selector.register(fd, selectors.EVENT_READ)
+
+            now = monotonic()
+            timeout = None
+            if self._idle and self.timeout is not None:
+                timeout = max(0, min(c.idleSince for c in self._idle.values()) + self.timeout - now)
+
+            for fd in self._select(timeout):
+                if fd == self._wakeup.fileno():
+                    try:
+                        while self._wakeup.recv(4096):
+                            pass
+                    except socket.error:
+                        pass
+                else:
+                    self.server._dispatch(self._remove(fd))
+
+            if self.timeout is not None:
+                now = monotonic()
+                for fd in [fd for fd, c in self._idle.items() if now - c.idleSince >= self.timeout]:
+                    self.server._close(self._remove(fd))
+
+        for fd in list(self._idle):
+            self.server._close(self._remove(fd))
+        self._wakeup.close()
+        self._wakeupWriter.close()
+
+    def _select(self, timeout):
+        ''' Returns the readable file descriptors
+        '''
+        if selectors is not None:
+            return [key.fd for key, _ in self._selector.select(timeout)]
+        readable, _, _ = select.select([self._wakeup.fileno()] + list(self._idle), [], [], timeout)
+        return readable
+
+    def _remove(self, fd):
+        if selectors is not None:
+            self._selector.unregister(fd)
+        return self._idle.pop(fd)
+
+
+class PooledHTTPServer(HTTPServer):
+    ''' A HTTPServer which handles the accepted connections concurrently in a fixed
+        pool of worker threads. A slow request therefore does not block the others.
+
+        Together with a request handler using 'HTTP/1.1' the connections are kept
+        alive, so a client (e.g. the Context-Broker) can send several requests over
+        one connection. A worker only handles one request of a connection at a time:
+        In between, the idle connection waits in a selector until its next request
+        arrives, so idle connections do not take up the workers. Connections idle for
+        'keepAliveTimeout' seconds are closed. Requests must not be pipelined (HTTP
+        clients send the next request after the response).
+
+        At most 'backlog' connections with a request wait for a free worker. If they
+        are all taken, the server stops accepting and further connections wait in the
+        (also bounded) listen backlog of the socket.
+    '''
+
+    def __init__(self, server_address, RequestHandlerClass, workers=8, backlog=64, keepAliveTimeout=30):
+        ''' server_address:      (address, port) to listen on
+            RequestHandlerClass: The BaseHTTPRequestHandler handling the requests
+            workers:             The number of worker threads
+            backlog:             The number of connections waiting for a worker
+            keepAliveTimeout:    Seconds an idle connection is kept open
+        '''
+        # Used by 'server_activate' as backlog of 'listen'
+        self.request_queue_size = max(1, int(backlog))
+        self.keepAliveTimeout = keepAliveTimeout
+        self._connections = Queue(maxsize=self.request_queue_size)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.accepted = 0
+        self.active = 0
+
+        HTTPServer.__init__(self, server_address, _oneRequestHandler(RequestHandlerClass))
+
+        self._idle = _IdleSelector(self, keepAliveTimeout)
+        self._workers = []
+        for i in range(max(1, int(workers))):
+            t = threading.Thread(target=self._work, name="firos-http-{}".format(i))
+            t.daemon = True
+            t.start()
+            self._workers.append(t)
+
+    def process_request(self, request, client_address):
+        ''' Called by the accepting thread. Hands the connection over to the workers
+            (blocks while 'backlog' connections are already waiting)
+        '''
+        # Bounds the time a worker waits for a (partial) request
+        if self.keepAliveTimeout is not None:
+            request.settimeout(self.keepAliveTimeout)
+        with self._lock:
+            self.accepted += 1
+        self._dispatch(_Connection(request, client_address))
+
+    def _dispatch(self, connection):
+        self._connections.put(connection)
+
+    def _work(self):
+        while True:
+            connection = self._connections.get()
+            if connection is None:
+                return
+            with self._lock:
+                self.active += 1
+            keepAlive = False
+            try:
+                if connection.handler is None:
+                    # Sets up the handler (rfile, wfile) without handling a request
+                    connection.handler = self.RequestHandlerClass(connection.request, connection.client_address, self)
+                handler = connection.handler
+                handler.close_connection = True
+                handler.handle_one_request()
+                keepAlive = not handler.close_connection
+            except Exception:
+                self.handle_error(connection.request, connection.client_address)
+            finally:
+                with self._lock:
+                    self.active -= 1
+            if keepAlive:
+                self._idle.add(connection)
+            else:
+                self._close(connection)
+
+    def _close(self, connection):
+        try:
+            if connection.handler is not None:
+                connection.handler.finishConnection()
+        except Exception:
+            pass
+        self.shutdown_request(connection.request)
+
+    def handle_error(self, request, client_address):
+        Log("ERROR", "Error while handling a request from {}:\n{}".format(client_address, traceback.format_exc()))
+
+    def server_close(self):
+        ''' Closes the listening socket and the idle connections and stops the
+            workers, after they handled the already received requests
+        '''
+        HTTPServer.server_close(self)
+        self._idle.stop()
+        for _ in self._workers:
+            self._connections.put(None)
+
+    def stats(self):
+        with self._lock:
+            return dict(accepted=self.accepted, active=self.active, waiting=self._connections.qsize(),
+                        idle=len(self._idle), workers=len(self._workers))
+
+
+def _oneRequestHandler(RequestHandlerClass):
+    ''' Returns a subclass of RequestHandlerClass, which only sets up the connection
+        when created. The PooledHTTPServer then calls 'handle_one_request' per request
+        and 'finishConnection' when the connection is closed.
+    '''
+    class OneRequestHandler(RequestHandlerClass):
+        def handle(self):
+            pass
+
+        def finish(self):
+            pass
+
+        def finishConnection(self):
+            RequestHandlerClass.finish(self)
+
+    return OneRequestHandler
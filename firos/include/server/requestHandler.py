@@ -39,9 +39,11 @@ except ImportError:
 from include.logger import Log
 from include.confManager import getRobots
 from include.ros.rosConfigurator import RosConfigurator
-from include.ros.topicHandler import RosTopicHandler, loadMsgHandlers, ROS_PUBLISHER, ROS_SUBSCRIBER, ROS_TOPIC_AS_DICT, ROS_SUBSCRIBER_LAST_MESSAGE
+from include.ros.topicHandler import RosTopicHandler, resyncTopics, disconnectTopic, TOPICS
+from include.ros.lazyMsg import resolveMsg
+from include.ros.msgCodec import MsgCodec
 from include.constants import Constants as C 
-from include.FiwareObjectConverter.objectFiwareConverter import ObjectFiwareConverter
+from include.stats import collectStats
 
 
 class RequestHandler(BaseHTTPRequestHandler):
@@ -115,13 +117,21 @@ def listTopics(request, action):
         robot_data = {"topic": topic, 
                     "pubSub": robots[topic][1], 
                     "messageType": robots[topic][0] }
-        robot_data["structure"] = ROS_TOPIC_AS_DICT[topic]
+        record = TOPICS.get(topic)
+        robot_data["structure"] = record.definition if record is not None else {}
         data.append(robot_data)
 
     # Return data and success
     end_request(request, ('Content-Type', 'application/json'), 200, json.dumps(data))
 
 
+def listStats(request, action):
+    ''' Returns the counters of the FIROS-components (e.g. the publish-pipeline)
+        as json
+    '''
+    end_request(request, ('Content-Type', 'application/json'), 200, json.dumps(collectStats()))
+
+
 def onRobotData(request, action):
     ''' Returns the actual Content of the last sent Data  of this robot onto
         the page. No Manipulation is done here. NOTE: only the data the robot published is shown here!
@@ -130,22 +140,19 @@ def onRobotData(request, action):
     '''
 
     name = request.path[6:]
-    if name in ROS_SUBSCRIBER_LAST_MESSAGE:
-        lastPubData = ROS_SUBSCRIBER_LAST_MESSAGE[name]
+    record = TOPICS.get(name)
+    content = ""
+    if record is not None:
+        lastPubData = resolveMsg(record.lastMessage)
         if lastPubData is not None:
-            obj = {s: getattr(lastPubData, s, None) for s in lastPubData.__slots__}
+            # NGSI-typed via the generated converter of the message type
+            obj = MsgCodec.forClass(type(lastPubData)).toNgsi(lastPubData)
             obj["id"] = name
             obj["type"] = lastPubData._type
-            json = ObjectFiwareConverter.obj2Fiware(obj, dataTypeDict=ROS_TOPIC_AS_DICT[name], ignorePythonMetaData=True, ind=None)
-        else:
-            json = ""
-    else:
-        json = ""
-
-    
+            content = json.dumps(obj)
 
     # Return the Information provided by the Context-Broker
-    end_request(request, ('Content-Type', 'application/json'), 200, json)
+    end_request(request, ('Content-Type', 'application/json'), 200, content)
 
 
 def onConnect(request, action):
@@ -155,7 +162,7 @@ def onConnect(request, action):
         TODO DL Add real connect for only one Robot?
     '''
     Log("INFO", "Connecting topics")
-    loadMsgHandlers(RosConfigurator.systemTopics(True))
+    resyncTopics()
 
     # Return Success
     end_request(request, None, 200, "")
@@ -179,17 +186,10 @@ def onDisConnect(request, action):
 
 
     
-    # Iterate through every topic and unregister, then delete it
-    if topic in ROS_PUBLISHER:
-        ROS_PUBLISHER[topic].unregister()
-        del ROS_PUBLISHER[topic]
-        Log("INFO", "Disconnecting publisher on '{}'".format(topic))
-        RosConfigurator.removeTopic(topic)
-    
-    if topic in ROS_SUBSCRIBER:
-        ROS_SUBSCRIBER[topic].unregister()
-        del ROS_SUBSCRIBER[topic]
-        Log("INFO", "Disconnecting subscriber on '{}'".format(topic))
+    # Unregister the topic, then delete it
+    record = disconnectTopic(topic)
+    if record is not None:
+        Log("INFO", "Disconnecting {} on '{}'".format(record.kind, topic))
         RosConfigurator.removeTopic(topic)
     
     # Return success
@@ -201,7 +201,8 @@ def onDisConnect(request, action):
 MAPPER = {
     "GET": [
         {"regexp": "^/topics/*$", "action": listTopics},
-        {"regexp": "^/topic/.*$", "action": onRobotData}],
+        {"regexp": "^/topic/.*$", "action": onRobotData},
+        {"regexp": "^/stats/*$", "action": listStats}],
     "POST": [
         {"regexp": "^/connect/*$", "action": onConnect},
         {"regexp": "^/disconnect/.*$", "action": onDisConnect}
@@ -0,0 +1,96 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import threading
+from collections import deque
+
+from include.logger import Log
+
+
+class ShutdownOrchestrator(object):
+    ''' The ShutdownOrchestrator runs the steps of the shutdown within a total deadline.
+
+        Each call of 'run' executes its tasks concurrently with a bounded number of
+        worker threads and returns as soon as all tasks finished or the deadline passed.
+        Tasks which could not be started or finished in time are skipped (the worker
+        threads are daemons, so they do not block the exit) and reported in the log.
+    '''
+
+    def __init__(self, timeout, workers):
+        ''' timeout: The total number of seconds the shutdown may take
+            workers: The maximum number of concurrent tasks
+        '''
+        self.deadline = time.time() + float(timeout)
+        self.workers = max(1, int(workers))
+        self.skipped = []
+
+    def remaining(self):
+        ''' Returns the number of seconds left until the deadline
+        '''
+        return max(0.0, self.deadline - time.time())
+
+    def run(self, tasks):
+        ''' Runs the tasks concurrently until they are done or the deadline passed.
+
+            tasks: A list of (name, function)
+            Returns True, if all tasks finished in time
+        '''
+        # Tasks and running tasks by their index, since names may repeat
+        pending = deque(enumerate(tasks))
+        running = {}
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                with lock:
+                    if not pending or self.remaining() <= 0:
+                        return
+                    index, (name, func) = pending.popleft()
+                    running[index] = name
+                try:
+                    func()
+                except Exception as e:
+                    Log("WARNING", "Shutdown task '{}' failed: {}".format(name, e))
+                finally:
+                    with lock:
+                        del running[index]
+
+        threads = []
+        for i in range(min(self.workers, len(pending))):
+            t = threading.Thread(target=work, name="firos-shutdown-{}".format(i))
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join(self.remaining())
+
+        with lock:
+            notStarted = [name for _, (name, _) in pending]
+            pending.clear()
+            unfinished = [running[index] for index in sorted(running)]
+
+        if notStarted or unfinished:
+            Log("WARNING", "Shutdown deadline reached. Skipped: {}, unfinished: {}".format(notStarted, unfinished))
+            self.skipped.extend(notStarted + unfinished)
+            return False
+        return True
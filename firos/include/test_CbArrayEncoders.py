@@ -0,0 +1,122 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import math
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from include.logger import initLog
+from include.pubsub.contextbroker.cbEncoders import CbEncoders
+from include.pubsub.contextbroker import cbArrayEncoders
+
+
+class _Object(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def _pose(x, y, yaw):
+    return _Object(position=_Object(x=x, y=y, z=0.0),
+                   orientation=_Object(x=0.0, y=0.0, z=math.sin(yaw / 2), w=math.cos(yaw / 2)))
+
+
+def _scan(ranges):
+    return _Object(angle_min=-1.0, angle_max=1.0, angle_increment=0.01, range_min=0.1, range_max=30.0, ranges=ranges)
+
+
+@unittest.skipIf(numpy is None, "numpy is not available")
+class Test_CbArrayEncoders(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def _encoder(self, msgType, reduce):
+        return CbEncoders.forTopic("attribute", msgType, {"reduce": reduce})
+
+    def test_Scan_Decimate(self):
+        value = self._encoder("sensor_msgs/LaserScan", {"decimate": 2})("scan", _scan([1.0, 2.0, 3.0, float("nan"), 5.0]), None)["value"]
+        self.assertEqual(value["ranges"], [1.0, 3.0, 5.0])
+        self.assertAlmostEqual(value["angle_increment"], 0.02)
+
+    def test_Scan_Min_Pool(self):
+        value = self._encoder("sensor_msgs/LaserScan", {"min_pool": 2})("scan", _scan([1.0, 2.0, 4.0, float("nan"), 5.0]), None)["value"]
+        self.assertEqual(value["ranges"], [1.0, 4.0, 5.0])
+        # Readings which are not finite are not valid JSON
+        value = self._encoder("sensor_msgs/LaserScan", {})("scan", _scan([1.23456, float("inf")]), None)["value"]
+        self.assertEqual(value["ranges"], [1.235, None])
+
+    def test_Max_Size(self):
+        encoder = self._encoder("sensor_msgs/LaserScan", {"max_size": 2000})
+        attribute = encoder("scan", _scan(numpy.linspace(0.1, 30.0, 4000)), None)
+        self.assertLessEqual(len(json.dumps(attribute["value"])), 2000)
+        self.assertGreater(encoder.lastFactor, 1)
+        # Smaller messages are reduced less again, down to the configured reduction
+        for _ in range(8):
+            value = encoder("scan", _scan([1.0, 2.0, 3.0]), None)["value"]
+        self.assertEqual(value["ranges"], [1.0, 2.0, 3.0])
+        self.assertEqual(encoder.lastFactor, 1)
+
+    def test_Grid(self):
+        info = _Object(width=4, height=2, resolution=0.05, origin=_pose(1.0, 2.0, 0.0))
+        grid = _Object(info=info, data=[0, 0, 100, -1,
+                                        0, -1, -1, -1])
+        value = self._encoder("nav_msgs/OccupancyGrid", {})("map", grid, None)["value"]
+        self.assertEqual(value["data"], [0, 2, 100, 1, -1, 1, 0, 1, -1, 3])
+
+        value = self._encoder("nav_msgs/OccupancyGrid", {"tile": 2, "encoding": "raw"})("map", grid, None)["value"]
+        self.assertEqual((value["width"], value["height"], value["data"]), (2, 1, [0, 100]))
+        self.assertAlmostEqual(value["resolution"], 0.1)
+        self.assertEqual(value["origin"], {"x": 1.0, "y": 2.0, "yaw": 0.0})
+
+    def test_Path(self):
+        poses = [_Object(pose=_pose(i, -i, 0.5)) for i in range(5)]
+        path = _Object(header=_Object(frame_id="map"), poses=poses)
+        value = self._encoder("nav_msgs/Path", {"decimate": 3})("path", path, None)["value"]
+        self.assertEqual(value["frame_id"], "map")
+        # The goal is always kept
+        self.assertEqual(value["poses"], [[0.0, 0.0, 0.5], [3.0, -3.0, 0.5], [4.0, -4.0, 0.5]])
+
+    def test_Covariance(self):
+        stamped = _Object(pose=_Object(pose=_pose(1.0, 2.0, 0.0), covariance=[float(i) for i in range(36)]))
+        value = self._encoder("geometry_msgs/PoseWithCovarianceStamped", {"covariance": "xy_yaw"})("pose", stamped, None)["value"]
+        self.assertEqual(value["covariance"], [0.0, 7.0, 35.0])
+        value = self._encoder("geometry_msgs/PoseWithCovarianceStamped", {})("pose", stamped, None)["value"]
+        self.assertEqual(value["covariance"], [0.0, 7.0, 14.0, 21.0, 28.0, 35.0])
+
+    def test_Encode_Is_Abstract(self):
+        class Incomplete(cbArrayEncoders.CbArrayEncoder):
+            pass
+        self.assertRaises(TypeError, Incomplete, {})
+
+    def test_Attribute_Encoder_First(self):
+        self.assertIs(CbEncoders.forTopic("battery", "sensor_msgs/LaserScan", {}), CbEncoders.get("battery"))
+        self.assertIsNone(CbEncoders.forTopic("unknown", "std_msgs/Int32", {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import threading
+import unittest
+
+from include.logger import initLog
+from include.pubsub.contextbroker.cbBatcher import CbBatcher
+
+
+class _Response(object):
+    def __init__(self, status, body=None):
+        self.status_code = status
+        self.ok = status < 400
+        self.content = json.dumps(body) if body is not None else ""
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _Http(object):
+    ''' Records the requests and answers with the given responses (or raises them)
+    '''
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.sent = threading.Event()
+
+    def post(self, url, data=None, headers=None):
+        self.requests.append((url, json.loads(data)))
+        self.sent.set()
+        response = self.responses.pop(0) if self.responses else _Response(204)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class Test_CbBatcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def _batcher(self, http, **conf):
+        self.failures = []
+        conf.setdefault("window_ms", 60000)
+        batcher = CbBatcher(http, "http://orion:1026", conf, lambda *args: self.failures.append(args))
+        self.addCleanup(batcher.stop)
+        return batcher
+
+    def _entities(self, http):
+        return dict((entity["id"], entity) for entity in http.requests[-1][1]["entities"])
+
+    def test_Success(self):
+        http = _Http()
+        batcher = self._batcher(http, entity_type="AMR")
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 2}})
+        batcher.add("/r2/battery", "urn:r2", {"battery": {"value": 3}})
+        batcher.flush()
+
+        self.assertEqual(len(http.requests), 1)
+        self.assertEqual(http.requests[0][0], "http://orion:1026/v2/op/update")
+        self.assertEqual(http.requests[0][1]["actionType"], "append")
+        entities = self._entities(http)
+        # The newer value replaces the pending one
+        self.assertEqual(entities["urn:r1"], {"id": "urn:r1", "type": "AMR", "battery": {"value": 2}})
+        self.assertEqual(entities["urn:r2"]["battery"], {"value": 3})
+        self.assertEqual(self.failures, [])
+
+    def test_Max_Updates(self):
+        http = _Http()
+        batcher = self._batcher(http, max_updates=2)
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        batcher.add("/r1/location", "urn:r1", {"location": {"value": 2}})
+        # The batch is sent, without waiting for the window
+        self.assertTrue(http.sent.wait(2))
+
+    def test_Partial_Failure(self):
+        description = "do not exist: urn:r2 - [ location ]"
+        http = _Http(_Response(422, {"error": "Unprocessable", "description": description}))
+        batcher = self._batcher(http)
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        batcher.add("/r2/battery", "urn:r2", {"battery": {"value": 2}})
+        batcher.add("/r2/location", "urn:r2", {"location": {"value": 3}})
+        batcher.flush()
+
+        self.assertEqual(self.failures, [(["/r2/location"], "urn:r2", {"location": {"value": 3}}, False)])
+
+    def test_Partial_Failure_Prefix_Sharing_Ids(self):
+        description = "do not exist: robot:10 - [ location ], myrobot:1 - [ battery ]"
+        http = _Http(_Response(422, {"error": "Unprocessable", "description": description}))
+        batcher = self._batcher(http)
+        batcher.add("/robot1/battery", "robot:1", {"battery": {"value": 1}})
+        batcher.add("/robot1/location", "robot:1", {"location": {"value": 2}})
+        batcher.add("/robot10/location", "robot:10", {"location": {"value": 3}})
+        batcher.add("/myrobot1/battery", "myrobot:1", {"battery": {"value": 4}})
+        batcher.flush()
+
+        self.assertEqual(sorted(failure[1] for failure in self.failures), ["myrobot:1", "robot:10"])
+
+    def test_Unknown_Failure(self):
+        http = _Http(_Response(400, {"error": "BadRequest", "description": "something else"}))
+        batcher = self._batcher(http)
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        batcher.add("/r2/battery", "urn:r2", {"battery": {"value": 2}})
+        batcher.flush()
+
+        self.assertEqual(sorted(failure[1] for failure in self.failures), ["urn:r1", "urn:r2"])
+        self.assertFalse(any(failure[3] for failure in self.failures))
+
+    def test_Server_Error_Retried(self):
+        http = _Http(_Response(503, {"error": "ServiceUnavailable", "description": ""}))
+        batcher = self._batcher(http)
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        batcher.flush()
+
+        self.assertEqual(self.failures, [(["/r1/battery"], "urn:r1", {"battery": {"value": 1}}, True)])
+
+    def test_Connection_Error(self):
+        http = _Http(IOError("Connection refused"))
+        batcher = self._batcher(http)
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        batcher.add("/r1/location", "urn:r1", {"location": {"value": 2}})
+        batcher.flush()
+
+        self.assertEqual(len(self.failures), 1)
+        topics, entityId, attrs, retry = self.failures[0]
+        self.assertEqual((topics, entityId, sorted(attrs.keys()), retry),
+                         (["/r1/battery", "/r1/location"], "urn:r1", ["battery", "location"], True))
+
+    def test_Flush_On_Stop(self):
+        http = _Http()
+        batcher = self._batcher(http)
+        batcher.add("/r1/battery", "urn:r1", {"battery": {"value": 1}})
+        self.assertEqual(http.requests, [])
+        batcher.stop()
+
+        self.assertEqual(len(http.requests), 1)
+        self.assertEqual(self._entities(http)["urn:r1"]["battery"], {"value": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from include.pubsub.contextbroker.cbChangeFilter import CbChangeFilter
+
+
+class _Object(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.__dict__ == self.__dict__
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class _Stamped(object):
+    ''' As generated by genpy: Equal, if all fields (including the header) are equal
+    '''
+    __slots__ = ("header", "data")
+    _slot_types = ("std_msgs/Header", "int32")
+
+    def __init__(self, seq, frame, data):
+        self.header = _Object(seq=seq, stamp=seq, frame_id=frame)
+        self.data = data
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _pose(x, y, yaw):
+    return _Object(position=_Object(x=x, y=y, z=0.0),
+                   orientation=_Object(x=0.0, y=0.0, z=math.sin(yaw / 2), w=math.cos(yaw / 2)))
+
+
+class Test_CbChangeFilter(unittest.TestCase):
+
+    def test_Publish_All_By_Default(self):
+        changeFilter = CbChangeFilter({})
+        self.assertTrue(changeFilter.shouldPublish(_Object(data=1), 0, _Object(data=1), 1))
+
+    def test_Suppress_Unchanged(self):
+        changeFilter = CbChangeFilter({"suppress_unchanged": True})
+        self.assertTrue(changeFilter.shouldPublish(None, None, _Object(data="idle"), 0))
+        self.assertFalse(changeFilter.shouldPublish(_Object(data="idle"), 0, _Object(data="idle"), 1))
+        self.assertTrue(changeFilter.shouldPublish(_Object(data="idle"), 0, _Object(data="busy"), 1))
+
+    def test_Refresh_Interval(self):
+        changeFilter = CbChangeFilter({"suppress_unchanged": True, "refresh_interval": 30})
+        self.assertFalse(changeFilter.shouldPublish(_Object(data=1), 100, _Object(data=1), 129.9))
+        self.assertTrue(changeFilter.shouldPublish(_Object(data=1), 100, _Object(data=1), 130))
+
+    def test_Value_Deadband(self):
+        changeFilter = CbChangeFilter({"suppress_unchanged": True, "deadband": {"value": 2}})
+        self.assertFalse(changeFilter.isChanged(_Object(data=80), _Object(data=81)))
+        # Changes up to the threshold are ignored
+        self.assertFalse(changeFilter.isChanged(_Object(data=80), _Object(data=78)))
+        self.assertTrue(changeFilter.isChanged(_Object(data=80), _Object(data=77)))
+        # Without a deadband, every change counts
+        self.assertTrue(CbChangeFilter({}).isChanged(_Object(data=80), _Object(data=81)))
+        self.assertFalse(CbChangeFilter({}).isChanged(_Object(data=80), _Object(data=80)))
+
+    def test_Stamped(self):
+        # As the content of a LazyMsg: seq and stamp are ignored, the frame_id is not
+        changeFilter = CbChangeFilter({"suppress_unchanged": True})
+        self.assertFalse(changeFilter.isChanged(_Stamped(1, "map", 7), _Stamped(2, "map", 7)))
+        self.assertTrue(changeFilter.isChanged(_Stamped(1, "map", 7), _Stamped(2, "map", 8)))
+        self.assertTrue(changeFilter.isChanged(_Stamped(1, "map", 7), _Stamped(2, "odom", 7)))
+
+    @unittest.skipIf(numpy is None, "numpy is not available")
+    def test_Numpy_Arrays(self):
+        # Topics with the option "numpy" have numpy-arrays as fields
+        changeFilter = CbChangeFilter({"suppress_unchanged": True})
+        self.assertFalse(changeFilter.isChanged(_Stamped(1, "map", numpy.array([1.0, 2.0])), _Stamped(2, "map", numpy.array([1.0, 2.0]))))
+        self.assertTrue(changeFilter.isChanged(_Stamped(1, "map", numpy.array([1.0, 2.0])), _Stamped(2, "map", numpy.array([1.0, 3.0]))))
+        self.assertTrue(changeFilter.isChanged(_Stamped(1, "map", numpy.array([1.0, 2.0])), _Stamped(2, "map", numpy.array([1.0]))))
+
+    def test_Position_Deadband(self):
+        changeFilter = CbChangeFilter({"deadband": {"position": 0.5}})
+        self.assertFalse(changeFilter.isChanged(_pose(1.0, 1.0, 0.0), _pose(1.3, 1.4, 0.0)))
+        self.assertFalse(changeFilter.isChanged(_pose(1.0, 1.0, 0.0), _pose(1.5, 1.0, 0.0)))
+        self.assertTrue(changeFilter.isChanged(_pose(1.0, 1.0, 0.0), _pose(1.5, 1.1, 0.0)))
+
+    def test_Angle_Deadband(self):
+        changeFilter = CbChangeFilter({"deadband": {"angle": 0.25}})
+        self.assertFalse(changeFilter.isChanged(_pose(0.0, 0.0, 0.0), _pose(0.0, 0.0, 0.25)))
+        self.assertTrue(changeFilter.isChanged(_pose(0.0, 0.0, 0.0), _pose(0.0, 0.0, 0.3)))
+        # The difference is normalized: pi - 0.1 and -pi + 0.1 are close
+        self.assertFalse(changeFilter.isChanged(_pose(0.0, 0.0, math.pi - 0.1), _pose(0.0, 0.0, -math.pi + 0.1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+
+from include.pubsub.contextbroker.cbDedup import CbDedup
+
+
+class Test_CbDedup(unittest.TestCase):
+
+    def test_Date_Modified(self):
+        dedup = CbDedup()
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "2019-01-01T00:00:00.00Z", now=0))
+        self.assertTrue(dedup.isDuplicate("/bot1/action", "go", "2019-01-01T00:00:00.00Z", now=1))
+        # The same value modified again is a new command
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "2019-01-01T00:00:01.00Z", now=2))
+        # Other topics are independent
+        self.assertFalse(dedup.isDuplicate("/bot2/action", "go", "2019-01-01T00:00:00.00Z", now=3))
+        self.assertEqual(dedup.stats()["hits"], 1)
+        self.assertEqual(dedup.stats()["misses"], 3)
+
+    def test_Value_Hash(self):
+        dedup = CbDedup()
+        self.assertFalse(dedup.isDuplicate("/bot1/refDestination", {"b": 1, "a": [1, 2]}, "t0", now=0))
+        self.assertTrue(dedup.isDuplicate("/bot1/refDestination", {"a": [1, 2], "b": 1}, "t0", now=1))
+        self.assertFalse(dedup.isDuplicate("/bot1/refDestination", {"a": [1, 3], "b": 1}, "t0", now=2))
+
+    def test_Same_Date_Modified_Other_Value(self):
+        # Two updates within the resolution of dateModified
+        dedup = CbDedup()
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "2019-01-01T00:00:00.00Z", now=0))
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "stop", "2019-01-01T00:00:00.00Z", now=0.5))
+        self.assertTrue(dedup.isDuplicate("/bot1/action", "stop", "2019-01-01T00:00:00.00Z", now=1))
+
+    def test_Identical_Command_Resent(self):
+        # Without dateModified a repeated value is sent on purpose
+        dedup = CbDedup()
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", now=0))
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", now=1))
+        self.assertFalse(dedup.isDuplicate("/bot1/refDestination", {"x": 1}, now=1))
+        self.assertFalse(dedup.isDuplicate("/bot1/refDestination", {"x": 1}, now=2))
+        self.assertEqual(len(dedup), 0)
+
+    def test_Window(self):
+        dedup = CbDedup(window=10)
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t0", now=0))
+        self.assertTrue(dedup.isDuplicate("/bot1/action", "go", "t0", now=10))
+        # The window starts with the first delivery
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t0", now=10.5))
+
+    def test_Disabled(self):
+        dedup = CbDedup(window=0)
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t0"))
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t0"))
+        self.assertEqual(len(dedup), 0)
+
+    def test_Forget(self):
+        dedup = CbDedup()
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t0", now=0))
+        self.assertFalse(dedup.isDuplicate("/bot1/refDestination", {"a": 1}, "t0", now=0))
+        dedup.forget("/bot1/action", "go", "t0")
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t0", now=1))
+        self.assertTrue(dedup.isDuplicate("/bot1/refDestination", {"a": 1}, "t0", now=1))
+        # Unknown attributes are ignored
+        dedup.forget("/bot2/action", "go", "t0")
+
+    def test_Bounded(self):
+        dedup = CbDedup(maxSize=2)
+        dedup.isDuplicate("/bot1/action", "go", "t0", now=0)
+        dedup.isDuplicate("/bot1/action", "go", "t1", now=0)
+        # Seen again, so t1 is the least recently seen one
+        dedup.isDuplicate("/bot1/action", "go", "t0", now=0)
+        dedup.isDuplicate("/bot1/action", "go", "t2", now=0)
+        self.assertEqual(len(dedup), 2)
+        self.assertTrue(dedup.isDuplicate("/bot1/action", "go", "t0", now=0))
+        self.assertFalse(dedup.isDuplicate("/bot1/action", "go", "t1", now=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import time
+import unittest
+
+from include.constants import Constants as C
+from include.pubsub.contextbroker.cbEncoders import CbEncoders, encodeStructured, isoTimestamp
+from include.pubsub.contextbroker.cbPublishPlan import CbPublishPlan
+from include.ros.msgCodec import MsgCodec
+
+TIMESTAMP = "2019-01-01T12:00:00.00Z"
+
+
+class _Object(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _Vector3(object):
+    __slots__ = ['x', 'y', 'z']
+    _slot_types = ['float64', 'float64', 'float64']
+    _type = 'geometry_msgs/Vector3'
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+
+class _Twist(object):
+    __slots__ = ['linear', 'angular']
+    _slot_types = ['geometry_msgs/Vector3', 'geometry_msgs/Vector3']
+    _type = 'geometry_msgs/Twist'
+
+    def __init__(self, linear=None, angular=None):
+        self.linear = linear or _Vector3()
+        self.angular = angular or _Vector3()
+
+
+MESSAGES = {"geometry_msgs/Vector3": _Vector3, "geometry_msgs/Twist": _Twist}
+
+
+class Test_CbEncoders(unittest.TestCase):
+
+    def setUp(self):
+        self.contextId = getattr(C, "CONTEXT_ID", None)
+        C.CONTEXT_ID = "context"
+        self.resolver = MsgCodec.resolver
+        MsgCodec.resolver = staticmethod(lambda msgType: MESSAGES[msgType])
+        MsgCodec._codecs.clear()
+
+    def tearDown(self):
+        C.CONTEXT_ID = self.contextId
+        MsgCodec.resolver = self.resolver
+        MsgCodec._codecs.clear()
+
+    def test_Status(self):
+        encoder = CbEncoders.get("status")
+        self.assertEqual(encoder("status", _Object(data="idle"), TIMESTAMP), {
+            "type": "Text",
+            "value": "idle",
+            "metadata": {
+                "context": {"type": "Text", "value": "context"},
+                "dateModified": {"type": "DateTime", "value": TIMESTAMP}
+            }
+        })
+
+    def test_Battery(self):
+        encoder = CbEncoders.get("battery")
+        self.assertEqual(encoder("battery", _Object(data=80), TIMESTAMP), {"type": "Number", "value": 80})
+
+    def test_Location(self):
+        yaw = math.pi / 2
+        pose = _Object(position=_Object(x=1.5, y=-2.0, z=0.0),
+                       orientation=_Object(x=0.0, y=0.0, z=math.sin(yaw / 2), w=math.cos(yaw / 2)))
+        attribute = CbEncoders.get("location")("location", pose, TIMESTAMP)
+
+        self.assertEqual(attribute["type"], "geo:json")
+        self.assertEqual(attribute["value"], {"type": "Point", "coordinates": [1.5, -2.0]})
+        self.assertEqual(attribute["metadata"]["angle"]["type"], "Double")
+        self.assertAlmostEqual(attribute["metadata"]["angle"]["value"], yaw)
+
+    def test_Heartbeat(self):
+        encoder = CbEncoders.get("heartbeat")
+        self.assertEqual(encoder("heartbeat", _Object(), TIMESTAMP), {"type": "DateTime", "value": TIMESTAMP, "metadata": {}})
+
+    def test_Unknown_Attribute(self):
+        self.assertIsNone(CbEncoders.get("unknown"))
+        self.assertIsNone(CbEncoders.forTopic("unknown", "std_msgs/String", {}))
+
+    def test_Structured(self):
+        self.assertIsNone(CbEncoders.forTopic("velocity", "geometry_msgs/Twist", {"structured": False}))
+        encoder = CbEncoders.forTopic("velocity", "geometry_msgs/Twist", {"structured": True})
+        self.assertIs(encoder, encodeStructured)
+        self.assertIs(CbEncoders.forTopic("battery", "std_msgs/Int32", {"structured": True}), CbEncoders.get("battery"))
+
+        twist = _Twist(_Vector3(x=1.0), _Vector3(z=0.5))
+        self.assertEqual(encoder("velocity", twist, TIMESTAMP), {
+            "type": "StructuredValue",
+            "value": {"linear": {"x": 1.0, "y": 0.0, "z": 0.0}, "angular": {"x": 0.0, "y": 0.0, "z": 0.5}}
+        })
+
+    def test_Timestamp(self):
+        self.assertEqual(isoTimestamp(), time.strftime("%Y-%m-%dT%H:%M:%S.00Z", time.gmtime(int(time.time()))))
+
+
+class Test_CbPublishPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.idPrefix = getattr(C, "ID_PREFIX", None)
+        C.ID_PREFIX = "urn:"
+
+    def tearDown(self):
+        C.ID_PREFIX = self.idPrefix
+
+    def test_Entity_And_Url(self):
+        plan = CbPublishPlan("/robot_1/battery", "http://broker:1026/v2/entities/", None)
+
+        self.assertEqual(plan.entityId, "urn:robot:1")
+        self.assertEqual(plan.attribute, "battery")
+        self.assertEqual(plan.url, "http://broker:1026/v2/entities/urn:robot:1/attrs")
+        self.assertIs(plan.encoder, CbEncoders.get("battery"))
+
+    def test_Topic_Without_Attribute(self):
+        plan = CbPublishPlan("/robot", "http://broker:1026/v2/entities/", None)
+
+        self.assertEqual(plan.entityId, "urn:robot")
+        self.assertIsNone(plan.attribute)
+        self.assertIsNone(plan.encoder)
+
+    def test_Encode(self):
+        plan = CbPublishPlan("/robot/battery", "http://broker:1026/v2/entities/", None)
+        update = plan.encode(_Object(data=42))
+
+        self.assertEqual(update["battery"], {"type": "Number", "value": 42})
+        self.assertEqual(update["dateModified"]["type"], "DateTime")
+        self.assertEqual(update["dateModified"]["value"], isoTimestamp())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+import unittest
+
+from include.logger import initLog
+from include.pubsub.contextbroker.cbIngress import CbIngressQueue
+
+
+class Test_CbIngress(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.dispatched = []
+        self.done = threading.Event()
+        self.blocked = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def _dispatch(self, topic, value, context):
+        if not self.release.is_set():
+            self.blocked.set()
+            self.release.wait(5)
+        self.dispatched.append((topic, value, context))
+        if len(self.dispatched) == self.expected:
+            self.done.set()
+
+    def _blockWorker(self, queue):
+        ''' Lets the only worker wait in the dispatch of the topic "/block" '''
+        self.release.clear()
+        queue.put([("/block", 0, None)])
+        self.assertTrue(self.blocked.wait(5))
+
+    def test_Dispatch_In_Order(self):
+        self.expected = 100
+        queue = CbIngressQueue(self._dispatch, workers=4)
+        queue.put([("/bot{}/action".format(i % 3), i, "ctx") for i in range(100)])
+        self.assertTrue(self.done.wait(5))
+        queue.stop()
+        for topic in ("/bot0/action", "/bot1/action", "/bot2/action"):
+            values = [value for t, value, _ in self.dispatched if t == topic]
+            self.assertEqual(values, sorted(values))
+        self.assertEqual(queue.stats()["dispatched"], 100)
+
+    def test_Drop_Oldest(self):
+        self.expected = 3
+        queue = CbIngressQueue(self._dispatch, maxSize=2, workers=1)
+        self._blockWorker(queue)
+        self.assertTrue(queue.put([("/a", 1, None), ("/b", 1, None)]))
+        # Drops the oldest value of "/a"
+        self.assertTrue(queue.put([("/a", 2, None)]))
+        self.assertEqual(len(queue), 2)
+        self.release.set()
+        self.assertTrue(self.done.wait(5))
+        queue.stop()
+        self.assertEqual(sorted(self.dispatched[1:]), [("/a", 2, None), ("/b", 1, None)])
+        self.assertEqual(queue.stats()["dropped"], 1)
+
+    def test_Drop_Oldest_Other_Topic(self):
+        self.expected = 3
+        queue = CbIngressQueue(self._dispatch, maxSize=2, workers=1)
+        self._blockWorker(queue)
+        queue.put([("/a", 1, None), ("/a", 2, None)])
+        queue.put([("/b", 1, None)])
+        self.release.set()
+        self.assertTrue(self.done.wait(5))
+        queue.stop()
+        self.assertEqual(sorted(self.dispatched[1:]), [("/a", 2, None), ("/b", 1, None)])
+
+    def test_Reject(self):
+        self.expected = 3
+        queue = CbIngressQueue(self._dispatch, maxSize=2, workers=1, overflow="reject")
+        self._blockWorker(queue)
+        self.assertFalse(queue.put([("/a", 1, None), ("/a", 2, None), ("/a", 3, None)]))
+        self.assertTrue(queue.put([("/a", 1, None), ("/a", 2, None)]))
+        self.assertFalse(queue.put([("/a", 3, None)]))
+        self.release.set()
+        self.assertTrue(self.done.wait(5))
+        queue.stop()
+        self.assertEqual(self.dispatched[1:], [("/a", 1, None), ("/a", 2, None)])
+        self.assertEqual(queue.stats()["rejected"], 4)
+
+    def test_Failing_Dispatch(self):
+        self.expected = 1
+        def dispatch(topic, value, context):
+            if value == "bad":
+                raise ValueError(value)
+            self._dispatch(topic, value, context)
+        queue = CbIngressQueue(dispatch, workers=1)
+        queue.put([("/a", "bad", None), ("/a", "good", None)])
+        self.assertTrue(self.done.wait(5))
+        queue.stop()
+        self.assertEqual(queue.stats()["failed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
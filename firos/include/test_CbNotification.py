@@ -0,0 +1,99 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+import json
+import unittest
+
+from include.pubsub.contextbroker.cbNotification import CbNotificationDecoder, NotificationError
+
+
+def _entity(robot, attr, value, context="ctx"):
+    return {
+        "id": "urn:ngsi-ld:AMR:" + robot,
+        "type": "AMR",
+        attr: {"type": "Text", "value": value, "metadata": {"context": {"type": "Text", "value": context}}}
+    }
+
+
+class Test_CbNotification(unittest.TestCase):
+
+    def setUp(self):
+        self.routes = {
+            ("urn:ngsi-ld:AMR:bot1", "action"): "/bot1/action",
+            ("urn:ngsi-ld:AMR:bot1", "refDestination"): "/bot1/refDestination",
+            ("urn:ngsi-ld:AMR:bot2", "action"): "/bot2/action"
+        }
+        self.decoder = CbNotificationDecoder(self.routes, maxSize=1000)
+
+    def _decode(self, notification):
+        body = json.dumps(notification).encode("utf-8")
+        return self.decoder.decode(self.decoder.read(str(len(body)), io.BytesIO(body)))
+
+    def test_Extracts_All_Entities(self):
+        self.decoder.registerSubscription("/v2/subscriptions/abc", ["action"])
+        subscriptionId, entities, extractor = self._decode({
+            "subscriptionId": "abc",
+            "data": [_entity("bot1", "action", "go"), _entity("bot2", "action", "stop", "other"), _entity("bot3", "action", "x")]
+        })
+        self.assertEqual(subscriptionId, "abc")
+        self.assertEqual([extractor.extract(entity) for entity in entities],
+                         [[("/bot1/action", "go", "ctx", None)], [("/bot2/action", "stop", "other", None)], []])
+
+    def test_Unknown_Subscription_Uses_All_Routes(self):
+        entity = _entity("bot1", "refDestination", "A")
+        entity["action"] = {"value": "go"}
+        _, entities, extractor = self._decode({"subscriptionId": "unknown", "data": [entity]})
+        self.assertEqual(extractor.extract(entities[0]),
+                         [("/bot1/action", "go", None, None), ("/bot1/refDestination", "A", "ctx", None)])
+
+    def test_Date_Modified(self):
+        entity = _entity("bot1", "action", "go")
+        entity["action"]["metadata"]["dateModified"] = {"type": "DateTime", "value": "2019-01-01T00:00:00.00Z"}
+        _, entities, extractor = self._decode({"data": [entity]})
+        self.assertEqual(extractor.extract(entities[0]), [("/bot1/action", "go", "ctx", "2019-01-01T00:00:00.00Z")])
+
+    def test_Malformed_Entity(self):
+        _, entities, extractor = self._decode({"data": [{"type": "AMR"}]})
+        self.assertRaises(Exception, extractor.extract, entities[0])
+
+    def test_Rejects_Malformed(self):
+        for body in [b"no json", b"[1, 2]", b'{"data": 1}', b'{"subscriptionId": "abc"}']:
+            with self.assertRaises(NotificationError) as context:
+                self.decoder.decode(body)
+            self.assertEqual(context.exception.status, 400)
+
+        with self.assertRaises(NotificationError) as context:
+            self.decoder.read(None, io.BytesIO(b""))
+        self.assertEqual(context.exception.status, 400)
+
+    def test_Rejects_Too_Large(self):
+        rfile = io.BytesIO(b"x" * 2000)
+        with self.assertRaises(NotificationError) as context:
+            self.decoder.read("2000", rfile)
+        self.assertEqual(context.exception.status, 413)
+        # The body was not read
+        self.assertEqual(rfile.tell(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
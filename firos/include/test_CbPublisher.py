@@ -0,0 +1,158 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from include.logger import initLog
+from include.constants import Constants as C
+from include import confManager
+from include.pubsub.contextbroker.cbPublisher import CbPublisher
+
+
+class _Response(object):
+    def __init__(self, status):
+        self.status_code = status
+        self.ok = 200 <= status < 300
+        self.content = ""
+
+
+class _Int32(object):
+    _type = "std_msgs/Int32"
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _Http(object):
+    def __init__(self, status):
+        self.status = status
+        self.requests = []
+
+    def post(self, url, data=None, headers=None):
+        return self._request("POST", url, data)
+
+    def patch(self, url, data=None, headers=None):
+        return self._request("PATCH", url, data)
+
+    def _request(self, method, url, data):
+        self.requests.append((url, json.loads(data)) if method == "POST" else (method, url, json.loads(data)))
+        if self.status is None:
+            raise IOError("Connection refused")
+        return _Response(self.status)
+
+
+class Test_CbPublisher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.spoolPath = os.path.join(self.folder, "spool.sqlite")
+        self.idPrefix = getattr(C, "ID_PREFIX", None)
+        C.ID_PREFIX = "urn:"
+        CbPublisher.posted_history.clear()
+        CbPublisher.posted_time.clear()
+        CbPublisher.plans.clear()
+        CbPublisher.configData = {"address": "127.0.0.1", "port": 1026, "spool": {"path": self.spoolPath}}
+        self.publisher = CbPublisher()
+
+    def tearDown(self):
+        if self.publisher.spool is not None:
+            self.publisher.spool.stop()
+        CbPublisher.configData = None
+        C.ID_PREFIX = self.idPrefix
+        shutil.rmtree(self.folder)
+
+    def _replay(self, status):
+        self.publisher.http = _Http(status)
+        return self.publisher._sendSpooled("urn:robot", {"battery": {"value": 80}})
+
+    def test_Replayed(self):
+        self.assertTrue(self._replay(204))
+        self.assertEqual(self.publisher.http.requests, [("http://127.0.0.1:1026/v2/entities/urn:robot/attrs", {"battery": {"value": 80}})])
+
+    def test_Retried(self):
+        # Not reachable, failed or overloaded: The update is kept in the spool
+        for status in (None, 500, 503, 408, 429):
+            self.assertFalse(self._replay(status), status)
+
+    def test_Rejected_Dropped(self):
+        for status in (400, 404, 422):
+            self.assertTrue(self._replay(status), status)
+
+    def test_Publish(self):
+        self.publisher.http = _Http(201)
+        self.publisher.publish("/robot_1/battery", _Int32(80), None)
+        self.publisher.publish("/robot_1/battery", _Int32(79), None)
+
+        url = "http://127.0.0.1:1026/v2/entities/urn:robot:1/attrs"
+        (firstUrl, first), (method, secondUrl, second) = self.publisher.http.requests
+        # The first update creates the attribute, the others update it
+        self.assertEqual((firstUrl, first["battery"]), (url, {"type": "Number", "value": 80}))
+        self.assertEqual((method, secondUrl, second["battery"]), ("PATCH", url, {"type": "Number", "value": 79}))
+        self.assertIn("dateModified", second)
+        # Without a failed update, no spool is created
+        self.assertIsNone(self.publisher.spool)
+        self.assertFalse(os.path.exists(self.spoolPath))
+
+    def test_Publish_Spooled(self):
+        self.publisher.http = _Http(None)
+        self.publisher.publish("/robot_1/battery", _Int32(80), None)
+        self.assertTrue(os.path.exists(self.spoolPath))
+        # The attribute and its dateModified
+        self.assertEqual(len(self.publisher.spool), 2)
+
+        # While updates are spooled, newer ones are spooled, too
+        self.publisher.spool.stop()
+        self.publisher.http = _Http(201)
+        self.publisher.publish("/robot_2/battery", _Int32(50), None)
+        self.assertEqual(self.publisher.http.requests, [])
+        self.assertEqual(len(self.publisher.spool), 4)
+
+    def test_Existing_Spool_Opened(self):
+        self.publisher.http = _Http(None)
+        self.publisher.publish("/robot_1/battery", _Int32(80), None)
+        self.publisher.spool.stop()
+
+        # Updates of the last run are replayed
+        restarted = CbPublisher()
+        self.addCleanup(restarted.spool.stop)
+        self.assertEqual(len(restarted.spool), 2)
+
+    def test_Spool_Path(self):
+        path = C.PATH
+        self.addCleanup(setattr, C, "PATH", path)
+        C.PATH = self.folder
+        self.assertEqual(confManager.getSpoolPath({}), os.path.join(self.folder, "spool.sqlite"))
+        self.assertEqual(confManager.getSpoolPath({"path": "data/spool.db"}), os.path.join(self.folder, "data", "spool.db"))
+        self.assertEqual(confManager.getSpoolPath({"path": "/var/firos/spool.db"}), "/var/firos/spool.db")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from include.logger import initLog
+from include.pubsub.contextbroker.cbSpool import CbSpool
+
+
+class Test_CbSpool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "spool", "spool.sqlite")
+        self.sent = []
+        self.online = threading.Event()
+        self.drained = threading.Event()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _send(self, entityId, attrs):
+        if not self.online.is_set():
+            return False
+        self.sent.append((entityId, attrs))
+        self.drained.set()
+        return True
+
+    def test_Compacts_Superseded_Updates(self):
+        spool = CbSpool(self.path, self._send, rate=100)
+        spool.put("urn:robot", {"location": {"value": 1}})
+        spool.put("urn:robot", {"location": {"value": 2}, "battery": {"value": 80}})
+        spool.put("urn:robot", {"location": {"value": 3}})
+
+        self.assertEqual(len(spool), 2)
+        self.online.set()
+        spool.resume()
+        self.assertTrue(self.drained.wait(2))
+        # The replayed updates are removed after they were sent
+        deadline = time.time() + 2
+        while len(spool) > 0 and time.time() < deadline:
+            time.sleep(0.01)
+        spool.stop()
+
+        self.assertEqual(self.sent, [("urn:robot", {"location": {"value": 3}, "battery": {"value": 80}})])
+        self.assertEqual(len(spool), 0)
+
+    def test_New_Updates_Shorten_Backoff(self):
+        spool = CbSpool(self.path, self._send, rate=100)
+        spool.RETRY_ON_PUT = 0.1
+        spool.put("urn:robot", {"battery": {"value": 80}})
+        # The first replay failed, the drainer backs off for a second
+        time.sleep(0.05)
+        self.online.set()
+        start = time.time()
+        spool.put("urn:robot", {"battery": {"value": 79}})
+        self.assertTrue(self.drained.wait(2))
+        spool.stop()
+
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(self.sent, [("urn:robot", {"battery": {"value": 79}})])
+
+    def test_Survives_Restart(self):
+        spool = CbSpool(self.path, self._send, rate=100)
+        spool.put("urn:robot", {"status": {"value": "idle"}})
+        spool.stop()
+
+        self.online.set()
+        spool = CbSpool(self.path, self._send, rate=100)
+        self.assertTrue(self.drained.wait(2))
+        spool.stop()
+
+        self.assertEqual(self.sent, [("urn:robot", {"status": {"value": "idle"}})])
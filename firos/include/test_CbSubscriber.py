@@ -0,0 +1,280 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+import json
+import time
+import unittest
+
+from include.constants import Constants as C
+from include.logger import initLog
+from include.pubsub.contextbroker import cbSubscriber
+from include.pubsub.contextbroker.cbDedup import CbDedup
+from include.pubsub.contextbroker.cbSubscriber import CbSubscriber, CBServer
+
+
+class _Response(object):
+    def __init__(self, status=200, body=None, headers=None):
+        self.status_code = status
+        self.ok = status < 300
+        self.content = json.dumps(body)
+        self.headers = headers or {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Broker(object):
+    ''' Answers the requests of the CbSubscriber like the Context-Broker would '''
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.requests = []
+        self.nextId = 0
+
+    def get(self, url, **kwargs):
+        self.requests.append(("GET", url))
+        query = dict(part.split("=") for part in url.split("?")[1].split("&"))
+        subscriptions = [self.subscriptions[key] for key in sorted(self.subscriptions)]
+        offset, limit = int(query["offset"]), int(query["limit"])
+        return _Response(200, subscriptions[offset:offset + limit], {"Fiware-Total-Count": str(len(subscriptions))})
+
+    def post(self, url, data=None, **kwargs):
+        self.requests.append(("POST", url))
+        self.nextId += 1
+        subID = "{:024x}".format(self.nextId)
+        self.subscriptions[subID] = dict(json.loads(data), id=subID)
+        return _Response(201, headers={"Location": "/v2/subscriptions/" + subID})
+
+    def patch(self, url, data=None, **kwargs):
+        self.requests.append(("PATCH", url))
+        subID = url.split("/")[-1]
+        if subID not in self.subscriptions:
+            return _Response(404)
+        self.subscriptions[subID].update(json.loads(data))
+        return _Response(204)
+
+    def delete(self, url, **kwargs):
+        self.requests.append(("DELETE", url))
+        self.subscriptions.pop(url.split("/")[-1], None)
+        return _Response(204)
+
+    def methods(self):
+        methods = [method for method, _ in self.requests]
+        del self.requests[:]
+        return methods
+
+
+class _Server(object):
+    port = 1234
+
+
+class Test_CbSubscriber(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        C.EP_SERVER_ADRESS = "127.0.0.1"
+        C.ID_PREFIX = ""
+        CbSubscriber.configData = dict(address="localhost", port=1026, subscription=dict(consolidate="entity"))
+        self.subscriber = CbSubscriber()
+        self.subscriber.subscriptionIds = {}
+        self.subscriber.groups = {"bot1": set(["/bot1/action"]), "bot2": set(["/bot2/action"])}
+        self.subscriber.server = _Server()
+        self.subscriber.http = self.broker = _Broker()
+
+    def tearDown(self):
+        if self.subscriber._reconciliation is not None:
+            self.subscriber._reconciliation.cancel()
+
+    def _subscribe(self, consolidate, topics):
+        ''' Subscribes the topics from scratch and reconciles them right away '''
+        CBServer.CBHandler.routes.clear()
+        self.subscriber.data["subscription"]["consolidate"] = consolidate
+        self.subscriber.groups = {}
+        self.subscriber.serverIsRunning = True
+        scheduled = []
+        self.subscriber._scheduleReconciliation = scheduled.append
+        self.subscriber.subscribe(topics, {}, {})
+        # The first subscriptions are jittered
+        self.assertEqual(len(scheduled), 1)
+        self.assertTrue(0 <= scheduled[0] <= self.subscriber.START_JITTER)
+        self.subscriber._reconcile()
+        return CBServer.CBHandler.routes
+
+    def _subscriptions(self):
+        ''' Returns the subjects of the subscriptions on the broker via (entities, attrs) '''
+        return sorted(((subscription["subject"]["entities"], subscription["subject"]["condition"]["attrs"])
+                       for subscription in self.broker.subscriptions.values()), key=json.dumps)
+
+    def test_Create_Once(self):
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET", "POST", "POST"])
+        self.assertEqual(len(self.broker.subscriptions), 2)
+        # Nothing differs and nothing expires before the next reconciliation
+        self.subscriber.data["subscription"]["subscription_refresh_delay"] = 0.1
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET"])
+
+    def test_Renew_Expiring(self):
+        self.subscriber._reconcile()
+        self.broker.methods()
+        # Expires before the next reconciliation
+        subID = self.subscriber.subscriptionIds["bot1"].split("/")[-1]
+        self.broker.subscriptions[subID]["expires"] = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(time.time() + 30))
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET", "PATCH"])
+        self.assertGreater(self.subscriber._expiresAt(self.broker.subscriptions[subID]), time.time() + 290)
+
+    def test_Broker_Restart(self):
+        self.subscriber._reconcile()
+        self.broker.subscriptions.clear()
+        self.broker.methods()
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET", "POST", "POST"])
+        self.assertEqual(sorted(self.subscriber.subscriptionIds.values()),
+                         sorted("/v2/subscriptions/" + subID for subID in self.broker.subscriptions))
+
+    def test_Unknown_And_Foreign(self):
+        self.broker.subscriptions["a"] = dict(id="a", notification=dict(http=dict(url="http://127.0.0.1:1234")))
+        self.broker.subscriptions["b"] = dict(id="b", notification=dict(http=dict(url="http://other:1234")))
+        self.subscriber.LIST_LIMIT = 1
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET", "GET", "DELETE", "POST", "POST"])
+        self.assertNotIn("a", self.broker.subscriptions)
+        self.assertIn("b", self.broker.subscriptions)
+
+    def test_Changed(self):
+        self.subscriber._reconcile()
+        subID = self.subscriber.subscriptionIds["bot1"].split("/")[-1]
+        self.broker.subscriptions[subID]["notification"]["attrs"] = ["other"]
+        self.subscriber.data["subscription"]["subscription_refresh_delay"] = 0.1
+        self.broker.methods()
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET", "PATCH"])
+        self.assertEqual(self.broker.subscriptions[subID]["notification"]["attrs"], ["action"])
+
+    def test_Consolidate_None(self):
+        self._subscribe("none", ["/bot1/action", "/bot1/goal", "/bot2/action"])
+        self.assertEqual(sorted(self.subscriber.groups), ["/bot1/action", "/bot1/goal", "/bot2/action"])
+        self.assertEqual(self._subscriptions(), [
+            ([{"id": "bot1", "type": "AMR"}], ["action"]),
+            ([{"id": "bot1", "type": "AMR"}], ["goal"]),
+            ([{"id": "bot2", "type": "AMR"}], ["action"])])
+
+    def test_Consolidate_Entity(self):
+        self._subscribe("entity", ["/bot1/action", "/bot1/goal", "/bot2/action"])
+        self.assertEqual(sorted(self.subscriber.groups), ["bot1", "bot2"])
+        self.assertEqual(self._subscriptions(), [
+            ([{"id": "bot1", "type": "AMR"}], ["action", "goal"]),
+            ([{"id": "bot2", "type": "AMR"}], ["action"])])
+
+    def test_Consolidate_Fleet(self):
+        C.ID_PREFIX = "urn:"
+        self._subscribe("fleet", ["/bot1/action", "/bot1/goal", "/bot2/action"])
+        self.assertEqual(sorted(self.subscriber.groups), ["fleet"])
+        self.assertEqual(self._subscriptions(), [([{"idPattern": "^urn:.*", "type": "AMR"}], ["action", "goal"])])
+
+    def test_Routes(self):
+        C.ID_PREFIX = "urn:"
+        routes = self._subscribe("fleet", ["/bot_1/action", "/bot2/goal"])
+        self.assertEqual(routes, {("urn:bot:1", "action"): "/bot_1/action", ("urn:bot2", "goal"): "/bot2/goal"})
+
+    def test_Failed_Update(self):
+        logged = []
+        log, cbSubscriber.Log = cbSubscriber.Log, lambda level, *args: logged.append((level, args[0]))
+        try:
+            self.subscriber._checkResponse(_Response(500), robTop="bot1", updated=True)
+        finally:
+            cbSubscriber.Log = log
+        self.assertEqual(logged[0], ("ERROR", "Could not update subscription for topic bot1 in Context-Broker :"))
+
+    def test_Added_Topic_Updates_Group(self):
+        self._subscribe("entity", ["/bot1/action"])
+        self.broker.methods()
+        scheduled = []
+        self.subscriber._scheduleReconciliation = scheduled.append
+        self.subscriber.subscribe(["/bot1/goal"], {}, {})
+        self.assertEqual(scheduled, [0])
+        self.assertEqual(self.subscriber._changed, set(["bot1"]))
+
+        self.subscriber._reconcile()
+        self.assertEqual(self.broker.methods(), ["GET", "PATCH"])
+        self.assertEqual(self._subscriptions(), [([{"id": "bot1", "type": "AMR"}], ["action", "goal"])])
+        self.assertEqual(self.subscriber._changed, set())
+
+
+class _Ingress(object):
+    def __init__(self, accept):
+        self.accept = accept
+        self.queued = []
+
+    def put(self, entries):
+        if self.accept:
+            self.queued.extend(entries)
+        return self.accept
+
+
+class Test_CBHandler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.handlerClass = CBServer.CBHandler
+        self.saved = self.handlerClass.dedup, self.handlerClass.ingress
+        self.handlerClass.dedup = CbDedup()
+        self.handlerClass.routes[("bot1", "action")] = "/bot1/action"
+
+    def tearDown(self):
+        self.handlerClass.dedup, self.handlerClass.ingress = self.saved
+        del self.handlerClass.routes[("bot1", "action")]
+
+    def _notify(self, ingress):
+        ''' Posts a notification to a CBHandler and returns the status of the response '''
+        self.handlerClass.ingress = ingress
+        body = json.dumps({"subscriptionId": "abc", "data": [{"id": "bot1", "type": "AMR", "action": {
+            "type": "Text", "value": "go", "metadata": {"dateModified": {"type": "DateTime", "value": "t0"}}}}]}).encode("utf-8")
+        handler = self.handlerClass.__new__(self.handlerClass)
+        handler.rfile, handler.wfile = io.BytesIO(body), io.BytesIO()
+        handler.headers = {"Content-Length": str(len(body))}
+        handler.client_address = ("127.0.0.1", 0)
+        handler.request_version, handler.requestline, handler.command = "HTTP/1.1", "POST / HTTP/1.1", "POST"
+        handler.do_POST()
+        return int(handler.wfile.getvalue().split()[1])
+
+    def test_Rejected_Not_Duplicate(self):
+        # The ingress queue is full: The notification is rejected and not remembered
+        self.assertEqual(self._notify(_Ingress(False)), 503)
+        # So its delivery again is queued (and then recognized as duplicate)
+        ingress = _Ingress(True)
+        self.assertEqual(self._notify(ingress), 204)
+        self.assertEqual(self._notify(ingress), 204)
+        self.assertEqual(ingress.queued, [("/bot1/action", "go", None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
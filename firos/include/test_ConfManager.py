@@ -0,0 +1,78 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from include import confManager
+from include.constants import Constants as C
+from include.logger import initLog
+from include.ros.rosConfigurator import RosConfigurator
+
+
+class Test_ConfManager(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path, self.robotId = C.PATH, getattr(C, "ROBOT_ID", None)
+        self.systemTopics = RosConfigurator.systemTopics
+        C.PATH, C.ROBOT_ID = self.folder, "robot"
+        RosConfigurator.systemTopics = staticmethod(lambda refresh=False: {})
+        confManager.invalidateTopicOptions()
+
+    def tearDown(self):
+        C.PATH, C.ROBOT_ID = self.path, self.robotId
+        RosConfigurator.systemTopics = self.systemTopics
+        confManager.invalidateTopicOptions()
+        shutil.rmtree(self.folder)
+
+    def _writeTopics(self, options):
+        with open(os.path.join(self.folder, "topics.json"), "w") as topicsFile:
+            json.dump({"/robot_id/battery": ["std_msgs/Int32", "subscriber", options]}, topicsFile)
+
+    def test_Topic_Options_Are_Cached(self):
+        self._writeTopics({"suppress_unchanged": True})
+        self.assertEqual(confManager.getTopicOptions("/robot/battery"), {"suppress_unchanged": True})
+        self.assertEqual(confManager.getTopicOptions("/robot/unknown"), {})
+
+        self._writeTopics({"suppress_unchanged": False})
+        self.assertEqual(confManager.getTopicOptions("/robot/battery"), {"suppress_unchanged": True})
+
+    def test_Refresh_Reloads_Topic_Options(self):
+        self._writeTopics({"suppress_unchanged": True})
+        self.assertEqual(confManager.getTopicOptions("/robot/battery"), {"suppress_unchanged": True})
+
+        self._writeTopics({"suppress_unchanged": False, "refresh_interval": 10})
+        self.assertIn("/robot/battery", confManager.getRobots(refresh=True))
+        self.assertEqual(confManager.getTopicOptions("/robot/battery"),
+                         {"suppress_unchanged": False, "refresh_interval": 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import unittest
+
+from include import geometry
+
+try:
+    import tf
+except ImportError:
+    tf = None
+
+
+def _quaternionFromEuler(roll, pitch, yaw):
+    ''' Reference implementation of tf.transformations.quaternion_from_euler (axes 'sxyz')
+    '''
+    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+    cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+    return (sr * cp * cy - cr * sp * sy,
+            cr * sp * cy + sr * cp * sy,
+            cr * cp * sy - sr * sp * cy,
+            cr * cp * cy + sr * sp * sy)
+
+
+# (roll, pitch, yaw) triples, including angles at the wrap-around
+EULERS = [(0, 0, 0), (0, 0, 1.2), (0, 0, -2.5), (0, 0, math.pi - 1e-9), (0, 0, -math.pi + 1e-9),
+          (0.3, -0.2, 0.7), (-1.0, 0.5, 3.0), (0.1, 0.1, -1.5)]
+
+
+class Test_Geometry(unittest.TestCase):
+
+    def test_YawFromQuaternion(self):
+        for roll, pitch, yaw in EULERS:
+            self.assertAlmostEqual(geometry.yawFromQuaternion(*_quaternionFromEuler(roll, pitch, yaw)), yaw)
+
+    def test_YawFromUnnormalizedQuaternion(self):
+        q = [2 * v for v in _quaternionFromEuler(0, 0, 0.8)]
+        self.assertAlmostEqual(geometry.yawFromQuaternion(*q), 0.8)
+        self.assertEqual(geometry.yawFromQuaternion(0, 0, 0, 0), 0.0)
+
+    def test_QuaternionFromYaw(self):
+        for _, _, yaw in EULERS:
+            for a, b in zip(geometry.quaternionFromYaw(yaw), _quaternionFromEuler(0, 0, yaw)):
+                self.assertAlmostEqual(a, b)
+            self.assertAlmostEqual(geometry.yawFromQuaternion(*geometry.quaternionFromYaw(yaw)), yaw)
+
+    def test_Batched(self):
+        quaternions = [_quaternionFromEuler(*e) for e in EULERS]
+        yaws = geometry.yawsFromQuaternions(quaternions)
+        self.assertEqual(len(yaws), len(EULERS))
+        for yaw, e in zip(yaws, EULERS):
+            self.assertAlmostEqual(yaw, e[2])
+
+        result = geometry.quaternionsFromYaws([e[2] for e in EULERS])
+        for q, e in zip(result, EULERS):
+            for a, b in zip(q, geometry.quaternionFromYaw(e[2])):
+                self.assertAlmostEqual(a, b)
+
+    @unittest.skipIf(tf is None, "tf is not available")
+    def test_SameAsTf(self):
+        for roll, pitch, yaw in EULERS:
+            q = tf.transformations.quaternion_from_euler(roll, pitch, yaw)
+            self.assertAlmostEqual(geometry.yawFromQuaternion(*q), tf.transformations.euler_from_quaternion(q)[2])
+            for a, b in zip(geometry.quaternionFromYaw(yaw), tf.transformations.quaternion_from_euler(0, 0, yaw)):
+                self.assertAlmostEqual(a, b)
+
+        quaternions = [tf.transformations.quaternion_from_euler(*e) for e in EULERS]
+        for yaw, q in zip(geometry.yawsFromQuaternions(quaternions), quaternions):
+            self.assertAlmostEqual(yaw, tf.transformations.euler_from_quaternion(q)[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
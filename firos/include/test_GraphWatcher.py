@@ -0,0 +1,140 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+import time
+import unittest
+
+from include.logger import initLog
+from include.ros.graphWatcher import GraphWatcher
+
+
+class _Graph(object):
+    ''' The ROS-Master, the whitelist and FIROS as seen by the GraphWatcher
+    '''
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.matched = []
+        self.applied = []
+        self.fail = False
+
+    def fetch(self):
+        if self.fail:
+            raise IOError("ROS-Master not reachable")
+        return [[topic, topicType] for topic, topicType in self.topics.items()]
+
+    def match(self, entries):
+        self.matched.append(sorted(topic for topic, _ in entries))
+        return dict((topic, [topicType, "subscriber"]) for topic, topicType in entries if re.search("/battery$", topic))
+
+    def apply(self, added, removed):
+        self.applied.append((added, sorted(removed)))
+
+
+class Test_GraphWatcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def _watcher(self, topics, static=None):
+        graph = _Graph(topics)
+        return graph, GraphWatcher(0, graph.fetch, graph.match, graph.apply, static)
+
+    def test_Incremental(self):
+        graph, watcher = self._watcher({"/r1/battery": "std_msgs/Int32", "/r1/scan": "sensor_msgs/LaserScan"})
+        self.assertTrue(watcher.poll())
+        self.assertEqual(graph.applied, [({"/r1/battery": ["std_msgs/Int32", "subscriber"]}, [])])
+
+        # Nothing changed: Nothing is matched or applied
+        self.assertFalse(watcher.poll())
+        self.assertEqual(len(graph.matched), 1)
+
+        # Only the new topics are matched
+        graph.topics["/r2/battery"] = "std_msgs/Int32"
+        del graph.topics["/r1/battery"]
+        self.assertTrue(watcher.poll())
+        self.assertEqual(graph.matched[-1], ["/r2/battery"])
+        self.assertEqual(graph.applied[-1], ({"/r2/battery": ["std_msgs/Int32", "subscriber"]}, ["/r1/battery"]))
+        self.assertEqual(watcher.topics(), {"/r2/battery": ["std_msgs/Int32", "subscriber"]})
+        self.assertEqual(watcher.stats()["added"], 2)
+        self.assertEqual(watcher.stats()["removed"], 1)
+
+    def test_Type_Changed(self):
+        graph, watcher = self._watcher({"/r1/battery": "std_msgs/Int32"})
+        watcher.poll()
+        graph.topics["/r1/battery"] = "std_msgs/Float32"
+        watcher.poll()
+        # Replaced, not disconnected
+        self.assertEqual(graph.applied[-1], ({"/r1/battery": ["std_msgs/Float32", "subscriber"]}, []))
+
+    def test_Static(self):
+        graph, watcher = self._watcher({"/r1/battery": "std_msgs/Int32", "/firos/battery": "std_msgs/Int32"}, ["/firos/battery"])
+        watcher.poll()
+        del graph.topics["/firos/battery"]
+        watcher.poll()
+        self.assertEqual(graph.applied, [({"/r1/battery": ["std_msgs/Int32", "subscriber"]}, [])])
+
+    def test_Forget_Resync(self):
+        graph, watcher = self._watcher({"/r1/battery": "std_msgs/Int32"})
+        watcher.poll()
+        watcher.forget("/r1/battery")
+        # Stays disconnected, until the resync
+        self.assertFalse(watcher.poll())
+        self.assertEqual(watcher.topics(), {})
+        self.assertTrue(watcher.poll(reconnect=True))
+        self.assertEqual(graph.applied[-1], ({"/r1/battery": ["std_msgs/Int32", "subscriber"]}, []))
+        self.assertFalse(watcher.poll(reconnect=True))
+
+    def test_Failures(self):
+        graph, watcher = self._watcher({"/r1/battery": "std_msgs/Int32"})
+        graph.fail = True
+        self.assertFalse(watcher.poll())
+        graph.fail = False
+
+        def fail(added, removed):
+            raise ValueError("Cannot connect")
+        watcher._apply = fail
+        self.assertFalse(watcher.poll())
+        self.assertEqual(watcher.topics(), {})
+        watcher._apply = graph.apply
+        # Everything is compared again
+        self.assertTrue(watcher.poll())
+        self.assertEqual(watcher.stats()["failed"], 2)
+
+    def test_Resync_Thread(self):
+        graph, watcher = self._watcher({"/r1/battery": "std_msgs/Int32"})
+        watcher.start()
+        try:
+            graph.topics["/r2/battery"] = "std_msgs/Int32"
+            watcher.resync()
+            deadline = time.time() + 2
+            while len(watcher.topics()) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(sorted(watcher.topics().keys()), ["/r1/battery", "/r2/battery"])
+        finally:
+            watcher.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import socket
+import threading
+import unittest
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    # Newer requests releases depend on urllib3 directly
+    from urllib3.util import connection as urllib3_connection
+except ImportError:
+    # Older requests releases vendor urllib3
+    from requests.packages.urllib3.util import connection as urllib3_connection
+
+from include.logger import initLog
+from include.httpClient import HttpClient, DnsCache
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = []
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.connections.append(self.client_address)
+
+    def do_GET(self):
+        body = self.headers["Host"].encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Resolver(object):
+    ''' Resolves every host to 127.0.0.1 and counts the lookups
+    '''
+
+    def __init__(self):
+        self.lookups = 0
+
+    def __call__(self, host, port, family=0, type=0):
+        self.lookups += 1
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+
+class Test_DnsCache(unittest.TestCase):
+
+    def test_Resolve_Once(self):
+        resolver = _Resolver()
+        cache = DnsCache(300, resolver)
+        self.assertEqual(cache.resolve("broker", 1026), "127.0.0.1")
+        self.assertEqual(cache.resolve("broker", 1026), "127.0.0.1")
+        self.assertEqual(resolver.lookups, 1)
+        cache.invalidate("broker", 1026)
+        cache.resolve("broker", 1026)
+        self.assertEqual(resolver.lookups, 2)
+
+    def test_Ttl(self):
+        resolver = _Resolver()
+        cache = DnsCache(0, resolver)
+        cache.resolve("broker", 1026)
+        cache.resolve("broker", 1026)
+        self.assertEqual(resolver.lookups, 2)
+
+
+class Test_HttpClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        _Handler.connections[:] = []
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        self.port = self.server.socket.getsockname()[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_Keep_Alive(self):
+        client = HttpClient(poolSize=2, timeout=5, dnsCacheTtl=0)
+        try:
+            for _ in range(3):
+                response = client.get("http://127.0.0.1:{}/".format(self.port))
+                self.assertEqual(response.status_code, 200)
+        finally:
+            client.close()
+        self.assertEqual(len(_Handler.connections), 1)
+
+    def test_Dns_Cache(self):
+        createConnection = urllib3_connection.create_connection
+        client = HttpClient(poolSize=2, timeout=5)
+        resolver = _Resolver()
+        client.dnsCache.resolver = resolver
+        try:
+            response = client.get("http://broker.invalid:{}/".format(self.port))
+            self.assertEqual(response.text, "broker.invalid:{}".format(self.port))
+            # A new connection uses the cached address
+            client.close()
+            client.get("http://broker.invalid:{}/".format(self.port))
+        finally:
+            client.close()
+        self.assertEqual(resolver.lookups, 1)
+        self.assertEqual(len(_Handler.connections), 2)
+        # Other urllib3 users are not affected
+        self.assertIs(urllib3_connection.create_connection, createConnection)
+
+    def test_For_Context_Broker(self):
+        configData = {"address": "127.0.0.1", "port": self.port, "http": {"pool_size": 3, "dns_cache_ttl": 0}}
+        client = HttpClient.forContextBroker(configData)
+        try:
+            self.assertIs(HttpClient.forContextBroker(configData), client)
+            self.assertEqual(client.poolSize, 3)
+            self.assertIsNone(client.dnsCache)
+        finally:
+            client.close()
+            HttpClient._clients.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
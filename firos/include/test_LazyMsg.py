@@ -0,0 +1,102 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import struct
+import unittest
+import threading
+
+from include.ros.lazyMsg import LazyMsg, resolveMsg
+from include.pubsub.contextbroker.cbChangeFilter import CbChangeFilter
+
+
+class _Int32(object):
+    _type = "std_msgs/Int32"
+    __slots__ = ("data",)
+    _slot_types = ("int32",)
+
+    def deserialize(self, buff):
+        self.data = struct.unpack("<i", buff)[0]
+        return self
+
+
+class _Stamped(object):
+    _type = "example_msgs/StampedInt32"
+    __slots__ = ("header", "data")
+    _slot_types = ("std_msgs/Header", "int32")
+
+
+def _stamped(seq, frame, data):
+    return struct.pack("<III", seq, seq, 0) + struct.pack("<I", len(frame)) + frame + struct.pack("<i", data)
+
+
+class Test_LazyMsg(unittest.TestCase):
+
+    def test_Deserialize_Once(self):
+        msg = LazyMsg(_Int32, struct.pack("<i", 42))
+        deserialized = LazyMsg.deserialized
+        self.assertEqual(resolveMsg(msg).data, 42)
+        self.assertIs(resolveMsg(msg), msg.deserialize())
+        self.assertEqual(LazyMsg.deserialized, deserialized + 1)
+        self.assertEqual(msg._type, "std_msgs/Int32")
+
+    def test_Resolve_Plain_Message(self):
+        plain = _Int32()
+        self.assertIs(resolveMsg(plain), plain)
+
+    def test_Content_Without_Seq_And_Stamp(self):
+        first = LazyMsg(_Stamped, _stamped(1, b"map", 7))
+        second = LazyMsg(_Stamped, _stamped(2, b"map", 7))
+        third = LazyMsg(_Stamped, _stamped(3, b"map", 8))
+        otherFrame = LazyMsg(_Stamped, _stamped(4, b"odom", 7))
+        self.assertEqual(first.content(), struct.pack("<I", 3) + b"map" + struct.pack("<i", 7))
+        self.assertTrue(first.sameContent(second))
+        self.assertFalse(first.sameContent(third))
+        self.assertFalse(first.sameContent(otherFrame))
+
+    def test_Counters_Of_Threads(self):
+        created = LazyMsg.created
+
+        def create():
+            for _ in range(2000):
+                LazyMsg(_Int32, b"")
+        threads = [threading.Thread(target=create) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(LazyMsg.stats()["received"], created + 8000)
+
+    def test_Change_Filter(self):
+        changeFilter = CbChangeFilter({"suppress_unchanged": True})
+        previous = LazyMsg(_Int32, struct.pack("<i", 1))
+        deserialized = LazyMsg.deserialized
+        # Unchanged messages are suppressed without deserializing them
+        self.assertFalse(changeFilter.shouldPublish(previous, 0, LazyMsg(_Int32, struct.pack("<i", 1)), 1))
+        self.assertEqual(LazyMsg.deserialized, deserialized)
+        self.assertTrue(changeFilter.shouldPublish(previous, 0, LazyMsg(_Int32, struct.pack("<i", 2)), 1))
+
+        withDeadband = CbChangeFilter({"suppress_unchanged": True, "deadband": {"value": 5}})
+        self.assertFalse(withDeadband.shouldPublish(previous, 0, LazyMsg(_Int32, struct.pack("<i", 3)), 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
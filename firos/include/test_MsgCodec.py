@@ -0,0 +1,183 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+
+from include.ros.msgCodec import MsgCodec, ConversionError
+
+
+# Minimal classes shaped like the ones generated by genpy
+class _Message(object):
+    __slots__ = ()
+    _slot_types = ()
+
+    def __init__(self):
+        for field, fieldType in zip(self.__slots__, self._slot_types):
+            if fieldType in MESSAGES:
+                setattr(self, field, MESSAGES[fieldType]())
+            elif "[" in fieldType:
+                setattr(self, field, [])
+            elif fieldType == "string":
+                setattr(self, field, "")
+            else:
+                setattr(self, field, 0)
+
+
+class Vector3(_Message):
+    _type = "geometry_msgs/Vector3"
+    __slots__ = ("x", "y", "z")
+    _slot_types = ("float64", "float64", "float64")
+
+
+class Twist(_Message):
+    _type = "geometry_msgs/Twist"
+    __slots__ = ("linear", "angular")
+    _slot_types = ("geometry_msgs/Vector3", "geometry_msgs/Vector3")
+
+
+class Path(_Message):
+    _type = "nav_msgs/Path"
+    __slots__ = ("frame", "poses", "covariance", "data")
+    _slot_types = ("string", "geometry_msgs/Vector3[]", "float64[3]", "uint8[]")
+
+
+class Plan(_Message):
+    _type = "nav_msgs/Plan"
+    __slots__ = ("path",)
+    _slot_types = ("nav_msgs/Path",)
+
+
+class String(_Message):
+    _type = "std_msgs/String"
+    __slots__ = ("data",)
+    _slot_types = ("string",)
+
+
+MESSAGES = {clazz._type: clazz for clazz in (Vector3, Twist, Path, Plan, String)}
+
+
+class Test_MsgCodec(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.resolver = MsgCodec.resolver
+        MsgCodec.resolver = staticmethod(lambda msgType: MESSAGES[msgType])
+        MsgCodec._codecs.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        MsgCodec.resolver = cls.resolver
+        MsgCodec._codecs.clear()
+
+    def test_Nested(self):
+        msg = MsgCodec.forClass(Twist).fromDict({"linear": {"x": 1, "y": 2.5}, "angular": {"z": -1}})
+        self.assertIsInstance(msg, Twist)
+        self.assertEqual((msg.linear.x, msg.linear.y, msg.linear.z), (1.0, 2.5, 0))
+        self.assertEqual(msg.angular.z, -1.0)
+        self.assertIsInstance(msg.linear.x, float)
+
+    def test_Arrays(self):
+        msg = MsgCodec.forClass(Path).fromDict({
+            "frame": "map", "poses": [{"x": 1}, {"x": 2}], "covariance": [1, 2, 3], "data": [104, 105]})
+        self.assertEqual([pose.x for pose in msg.poses], [1.0, 2.0])
+        self.assertEqual(msg.covariance, [1.0, 2.0, 3.0])
+        self.assertEqual(msg.data, b"hi")
+
+    def test_Single_Field_Shorthand(self):
+        self.assertEqual(MsgCodec.forClass(String).fromDict("go").data, "go")
+        self.assertEqual(MsgCodec.forClass(String).fromDict({"data": "go"}).data, "go")
+
+    def test_NGSI_Typed(self):
+        msg = MsgCodec.forClass(Path).fromDict({"type": "nav_msgs.Path", "value": {
+            "frame": {"type": "string", "value": "map"},
+            "poses": {"type": "array", "value": [{"type": "geometry_msgs.Vector3", "value": {"x": {"type": "number", "value": 3}}}]}}})
+        self.assertEqual(msg.frame, "map")
+        self.assertEqual(msg.poses[0].x, 3.0)
+
+    def test_To_Dict(self):
+        data = {"frame": "map", "poses": [{"x": 1.0, "y": 2.0, "z": 3.0}], "covariance": [1.0, 2.0, 3.0], "data": [104, 105]}
+        codec = MsgCodec.forClass(Path)
+        self.assertEqual(codec.toDict(codec.fromDict(data)), data)
+        twist = MsgCodec.forClass(Twist)
+        self.assertEqual(twist.toDict(twist.fromDict({"linear": {"x": 1}})),
+                         {"linear": {"x": 1.0, "y": 0, "z": 0}, "angular": {"x": 0, "y": 0, "z": 0}})
+        # Deserialized fixed-size arrays are tuples
+        msg = codec.fromDict(data)
+        msg.covariance = (1.0, 2.0, 3.0)
+        self.assertEqual(codec.toDict(msg)["covariance"], [1.0, 2.0, 3.0])
+
+    def test_To_Ngsi(self):
+        codec = MsgCodec.forClass(Path)
+        msg = codec.fromDict({"frame": "map", "poses": [{"x": 1.0}], "covariance": [1.0, 2.0, 3.0], "data": [104]})
+        number = lambda value: {"type": "number", "value": value}
+        dataType = lambda value: {"dataType": {"type": "dataType", "value": value}}
+        self.assertEqual(codec.toNgsi(msg), {
+            "frame": {"type": "string", "value": "map", "metadata": dataType("string")},
+            "poses": {"type": "array", "value": [{"type": "geometry_msgs/Vector3", "value": {"x": number(1.0), "y": number(0), "z": number(0)}}],
+                      "metadata": dataType("geometry_msgs/Vector3[]")},
+            "covariance": {"type": "array", "value": [number(1.0), number(2.0), number(3.0)], "metadata": dataType("float64[3]")},
+            "data": {"type": "array", "value": [number(104)], "metadata": dataType("uint8[]")}})
+        # The NGSI-typed values can be converted back
+        self.assertEqual(codec.toDict(codec.fromDict(codec.toNgsi(msg))), codec.toDict(msg))
+        twist = MsgCodec.forClass(Twist)
+        linear = twist.toNgsi(twist.fromDict({}))["linear"]
+        self.assertEqual(linear["type"], "geometry_msgs/Vector3")
+        self.assertEqual(linear["metadata"], dataType({"x": "float64", "y": "float64", "z": "float64"}))
+        # Nested messages only have the metadata of their arrays
+        path = MsgCodec.forClass(Plan).toNgsi(Plan())["path"]["value"]
+        self.assertNotIn("metadata", path["frame"])
+        self.assertEqual(path["covariance"]["metadata"], dataType("float64[3]"))
+
+    def test_Unknown_Instead_Of_Known_Field(self):
+        # As many fields as geometry_msgs/Twist has, but one is unknown
+        with self.assertRaises(ConversionError):
+            MsgCodec.forClass(Twist).fromDict({"linear": {"x": 1}, "unknown": {"x": 1}})
+        with self.assertRaises(ConversionError):
+            MsgCodec.forClass(Twist).fromDict({"linear": {"x": 1, "y": 2, "unknown": 3}})
+
+    def test_Arrays_Are_Copied(self):
+        covariance = [1.0, 2.0, 3.0]
+        msg = MsgCodec.forClass(Path).fromDict({"covariance": covariance})
+        self.assertEqual(msg.covariance, covariance)
+        self.assertIsNot(msg.covariance, covariance)
+        self.assertEqual(MsgCodec.forClass(Path).fromDict({"covariance": [1, 2.0, 3]}).covariance, [1.0, 2.0, 3.0])
+
+    def test_Definition(self):
+        self.assertEqual(MsgCodec.forClass(Twist).definition,
+                         {"linear": {"x": "float64", "y": "float64", "z": "float64"},
+                          "angular": {"x": "float64", "y": "float64", "z": "float64"}})
+        self.assertEqual(MsgCodec.forClass(Path).definition,
+                         {"frame": "string", "poses": "geometry_msgs/Vector3[]", "covariance": "float64[3]", "data": "uint8[]"})
+
+    def test_Cached_By_Type(self):
+        self.assertIs(MsgCodec.forClass(Twist), MsgCodec.forType("geometry_msgs/Twist"))
+
+    def test_Shape_Mismatch(self):
+        codec = MsgCodec.forClass(Path)
+        for value in [[1, 2], {"unknown": 1}, {"frame": 1}, {"covariance": [1, 2]}, {"poses": {"x": 1}},
+                      {"poses": [{"x": "one"}]}]:
+            self.assertRaises(ConversionError, codec.fromDict, value)
+        self.assertRaises(ConversionError, MsgCodec.forClass(Vector3).fromDict, {"x": True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import threading
+import unittest
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler
+    from http.client import HTTPConnection
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from httplib import HTTPConnection
+
+from include.logger import initLog
+from include.server.pooledHTTPServer import PooledHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    release = threading.Event()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        if self.path == "/slow":
+            self.release.wait(5)
+        body = self.path.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+
+class Test_PooledHTTPServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        _Handler.release.clear()
+        self.server = self._start(keepAliveTimeout=5)
+        self.port = self.server.socket.getsockname()[1]
+        self.connections = []
+
+    def tearDown(self):
+        _Handler.release.set()
+        for conn in self.connections:
+            conn.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _start(self, keepAliveTimeout):
+        server = PooledHTTPServer(("127.0.0.1", 0), _Handler, workers=2, backlog=4, keepAliveTimeout=keepAliveTimeout)
+        t = threading.Thread(target=server.serve_forever)
+        t.daemon = True
+        t.start()
+        return server
+
+    def _connect(self, port=None):
+        conn = HTTPConnection("127.0.0.1", port or self.port, timeout=5)
+        self.connections.append(conn)
+        return conn
+
+    def _post(self, conn, path):
+        conn.request("POST", path, body="{}", headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, response.read().decode("utf-8")
+
+    def _waitFor(self, condition):
+        deadline = time.time() + 2
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_Keep_Alive(self):
+        conn = self._connect()
+        self.assertEqual(self._post(conn, "/a"), (200, "/a"))
+        sock = conn.sock
+        self.assertEqual(self._post(conn, "/b"), (200, "/b"))
+        # The second request used the same connection
+        self.assertIs(conn.sock, sock)
+        self.assertEqual(self.server.stats()["accepted"], 1)
+
+    def test_Slow_Request_Does_Not_Block(self):
+        result = []
+        slow = threading.Thread(target=lambda: result.append(self._post(self._connect(), "/slow")))
+        slow.start()
+        time.sleep(0.1)
+
+        start = time.time()
+        self.assertEqual(self._post(self._connect(), "/fast"), (200, "/fast"))
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(result, [])
+
+        _Handler.release.set()
+        slow.join(5)
+        self.assertEqual(result, [(200, "/slow")])
+
+    def test_Idle_Connections_Do_Not_Take_Workers(self):
+        # More idle keep-alive connections than workers
+        idle = [self._connect() for _ in range(4)]
+        for i, conn in enumerate(idle):
+            self.assertEqual(self._post(conn, "/{}".format(i)), (200, "/{}".format(i)))
+        self.assertTrue(self._waitFor(lambda: self.server.stats()["idle"] == 4))
+
+        start = time.time()
+        self.assertEqual(self._post(self._connect(), "/new"), (200, "/new"))
+        self.assertEqual(self._post(idle[0], "/again"), (200, "/again"))
+        self.assertLess(time.time() - start, 1)
+
+    def test_Idle_Timeout(self):
+        server = self._start(keepAliveTimeout=0.2)
+        try:
+            conn = self._connect(server.socket.getsockname()[1])
+            self.assertEqual(self._post(conn, "/a"), (200, "/a"))
+            self.assertTrue(self._waitFor(lambda: server.stats()["idle"] == 1))
+            # The server closed the connection
+            self.assertTrue(self._waitFor(lambda: server.stats()["idle"] == 0))
+            self.assertEqual(conn.sock.recv(1), b"")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import threading
+import unittest
+
+from include.logger import initLog
+from include.pubsub.publishPipeline import PublishPipeline
+
+
+class Test_PublishPipeline(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.published = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def _publish(self, topic, rawMsg, msgDefinitions):
+        self.release.wait()
+        self.published.append((topic, rawMsg))
+
+    def test_Publishes_In_Order(self):
+        pipeline = PublishPipeline(self._publish, workers=1)
+        pipeline.put("/a", 1, None)
+        self.assertTrue(pipeline.flush(2))
+        pipeline.put("/a", 2, None)
+        self.assertTrue(pipeline.flush(2))
+        pipeline.stop()
+
+        self.assertEqual(self.published, [("/a", 1), ("/a", 2)])
+        self.assertEqual(pipeline.stats()["published"], 2)
+
+    def test_Coalesces_While_Busy(self):
+        self.release.clear()
+        pipeline = PublishPipeline(self._publish, workers=2)
+        pipeline.put("/a", 1, None)
+        time.sleep(0.05)  # Worker is now blocked on message 1
+        pipeline.put("/a", 2, None)
+        pipeline.put("/a", 3, None)
+        self.release.set()
+        self.assertTrue(pipeline.flush(2))
+        pipeline.stop()
+
+        self.assertEqual(self.published, [("/a", 1), ("/a", 3)])
+        stats = pipeline.stats()
+        self.assertEqual(stats["received"], 3)
+        self.assertEqual(stats["coalesced"], 1)
+
+    def test_Drops_On_Stop(self):
+        self.release.clear()
+        pipeline = PublishPipeline(self._publish, workers=1)
+        pipeline.put("/a", 1, None)
+        time.sleep(0.05)
+        pipeline.put("/b", 1, None)
+        pipeline.stop()
+        pipeline.put("/c", 1, None)
+        self.release.set()
+
+        self.assertEqual(pipeline.stats()["dropped"], 2)
+
+    def test_Failing_Publish_Is_Counted(self):
+        def fail(topic, rawMsg, msgDefinitions):
+            raise ValueError("broker down")
+        pipeline = PublishPipeline(fail, workers=1)
+        pipeline.put("/a", 1, None)
+        self.assertTrue(pipeline.flush(2))
+        pipeline.stop()
+
+        self.assertEqual(pipeline.stats()["dropped"], 1)
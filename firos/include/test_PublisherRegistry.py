@@ -0,0 +1,98 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import unittest
+
+from include.logger import initLog
+from include.ros.publisherRegistry import PublisherRegistry
+
+
+class _Publisher(object):
+    def __init__(self, topic, msgClass, queue_size, latch):
+        self.topic = topic
+        self.latch = latch
+        self.unregistered = False
+
+    def unregister(self):
+        self.unregistered = True
+
+
+class _String(object):
+    _type = "std_msgs/String"
+
+
+class _Int32(object):
+    _type = "std_msgs/Int32"
+
+
+class Test_PublisherRegistry(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def _registry(self, maxSize=100, idleTtl=300):
+        return PublisherRegistry(maxSize, idleTtl, factory=_Publisher)
+
+    def test_Reuses_Publishers(self):
+        registry = self._registry()
+        publisher = registry.get("/a", _String)
+        self.assertIs(registry.get("/a", _String), publisher)
+        self.assertIsNot(registry.get("/a", _Int32), publisher)
+        self.assertEqual(registry.stats()["created"], 2)
+        self.assertEqual(registry.stats()["hits"], 1)
+
+    def test_Evicts_Least_Recently_Used(self):
+        registry = self._registry(maxSize=2)
+        a = registry.get("/a", _String)
+        b = registry.get("/b", _String)
+        registry.get("/a", _String)
+        registry.get("/c", _String)
+        self.assertTrue(b.unregistered)
+        self.assertFalse(a.unregistered)
+        self.assertEqual(len(registry), 2)
+
+    def test_Evicts_Idle_But_Not_Pinned(self):
+        registry = self._registry(idleTtl=0.05)
+        pinned = registry.get("/pinned", _String, latch=True, pinned=True)
+        idle = registry.get("/idle", _String)
+        time.sleep(0.1)
+        registry.get("/new", _String)
+        self.assertTrue(idle.unregistered)
+        self.assertFalse(pinned.unregistered)
+        self.assertTrue(pinned.latch)
+
+    def test_Unregister(self):
+        registry = self._registry()
+        a = registry.get("/a", _String)
+        b = registry.get("/b", _String)
+        registry.unregister("/a")
+        self.assertTrue(a.unregistered)
+        self.assertFalse(b.unregistered)
+        registry.clear()
+        self.assertTrue(b.unregistered)
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
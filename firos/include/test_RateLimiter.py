@@ -0,0 +1,92 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import threading
+import unittest
+
+from include.pubsub.rateLimiter import TokenBucket, TopicRateLimiter
+
+
+class Test_RateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.released = []
+        self.event = threading.Event()
+
+    def _release(self, msg):
+        self.released.append(msg)
+        self.event.set()
+
+    def test_Drop(self):
+        limiter = TopicRateLimiter(1, burst=2, policy="drop", release=self._release)
+        results = [limiter.offer(i) for i in range(5)]
+
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(limiter.stats()["dropped"], 3)
+        self.assertEqual(self.released, [])
+
+    def test_Coalesce_Latest_Releases_Last_Message(self):
+        limiter = TopicRateLimiter(20, burst=1, policy="coalesce-latest", release=self._release)
+        results = [limiter.offer(i) for i in range(4)]
+
+        self.assertEqual(results, [True, False, False, False])
+        self.assertTrue(self.event.wait(1))
+        self.assertEqual(self.released, [3])
+        self.assertEqual(limiter.stats()["coalesced"], 2)
+
+    def test_Delay_Keeps_Order(self):
+        limiter = TopicRateLimiter(50, burst=1, policy="delay", release=self._release)
+        results = [limiter.offer(i) for i in range(3)]
+
+        self.assertEqual(results, [True, False, False])
+        deadline = time.time() + 1
+        while len(self.released) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.released, [1, 2])
+
+    def test_Cancel_Discards_Held_Messages(self):
+        limiter = TopicRateLimiter(5, burst=1, policy="coalesce-latest", release=self._release)
+        limiter.offer(1)
+        limiter.offer(2)
+        limiter.cancel()
+
+        self.assertFalse(self.event.wait(0.4))
+        self.assertEqual(limiter.stats()["held"], 0)
+
+    def test_Drain_Returns_Held_Messages(self):
+        limiter = TopicRateLimiter(5, burst=1, policy="delay", release=self._release)
+        for i in range(3):
+            limiter.offer(i)
+
+        self.assertEqual(limiter.drain(), [1, 2])
+        self.assertFalse(self.event.wait(0.4))
+        self.assertEqual(limiter.drain(), [])
+
+    def test_Clock_Set_Back(self):
+        bucket = TokenBucket(1, burst=1)
+        # The (wall) clock was set back by an hour: no tokens are taken away
+        bucket.last += 3600
+        self.assertTrue(bucket.consume())
+
+    def test_Unknown_Policy(self):
+        self.assertRaises(ValueError, TopicRateLimiter, 1, 1, "unknown")
@@ -0,0 +1,82 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import threading
+import unittest
+
+from include.logger import initLog
+from include.scheduler import Scheduler, ScheduledTask
+
+
+class Test_Scheduler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.calls = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_Runs_In_Order_Of_Due_Time(self):
+        self.scheduler.schedule(0.1, lambda: (self.calls.append("late"), self.done.set()))
+        self.scheduler.schedule(0.02, lambda: self.calls.append("early"))
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.calls, ["early", "late"])
+
+    def test_Cancel(self):
+        task = self.scheduler.schedule(0.05, lambda: self.calls.append("cancelled"))
+        self.scheduler.schedule(0.1, self.done.set)
+        task.cancel()
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.calls, [])
+
+    def test_Repeating(self):
+        def run():
+            self.calls.append(time.time())
+            if len(self.calls) == 3:
+                task.cancel()
+                self.done.set()
+        task = self.scheduler.scheduleRepeating(0.02, run, delay=0)
+        self.assertTrue(self.done.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_Failing_Task_Does_Not_Stop_Scheduler(self):
+        self.scheduler.schedule(0, lambda: 1 / 0)
+        self.scheduler.schedule(0.02, self.done.set)
+        self.assertTrue(self.done.wait(2))
+
+    def test_Jitter(self):
+        task = ScheduledTask(None, 10.0, 0.2)
+        for _ in range(100):
+            self.assertTrue(8.0 <= task.nextDelay() <= 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+import time
+import unittest
+
+from include.logger import initLog
+from include.shutdown import ShutdownOrchestrator
+
+
+class Test_ShutdownOrchestrator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initLog()
+
+    def setUp(self):
+        self.done = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        # Let the blocked tasks end
+        self.release.set()
+
+    def _task(self, name):
+        return (name, lambda: self.done.append(name))
+
+    def _blocking(self, name):
+        return (name, self.release.wait)
+
+    def test_All_Finished(self):
+        orchestrator = ShutdownOrchestrator(2, 2)
+
+        self.assertTrue(orchestrator.run([self._task("a"), self._task("b"), self._task("c")]))
+        self.assertEqual(sorted(self.done), ["a", "b", "c"])
+        self.assertEqual(orchestrator.skipped, [])
+
+    def test_Failed_Task_Does_Not_Stop_Others(self):
+        def fail():
+            raise IOError("Connection refused")
+        orchestrator = ShutdownOrchestrator(2, 1)
+
+        self.assertTrue(orchestrator.run([("fail", fail), self._task("a")]))
+        self.assertEqual(self.done, ["a"])
+
+    def test_Deadline_Skips_Tasks(self):
+        orchestrator = ShutdownOrchestrator(0.3, 1)
+        start = time.time()
+
+        self.assertFalse(orchestrator.run([self._blocking("slow"), self._task("a")]))
+        self.assertLess(time.time() - start, 1.0)
+        # "slow" did not finish, "a" was never started
+        self.assertEqual(orchestrator.skipped, ["a", "slow"])
+        self.assertEqual(self.done, [])
+
+    def test_Later_Steps_Skipped_After_Deadline(self):
+        orchestrator = ShutdownOrchestrator(0.2, 2)
+        orchestrator.run([self._blocking("slow")])
+
+        self.assertEqual(orchestrator.remaining(), 0.0)
+        self.assertFalse(orchestrator.run([self._task("a")]))
+        self.assertEqual(self.done, [])
+        self.assertEqual(orchestrator.skipped, ["slow", "a"])
+
+    def test_Tasks_With_Same_Name(self):
+        orchestrator = ShutdownOrchestrator(0.3, 2)
+
+        # One of two tasks with the same name finishes: the other is still reported
+        self.assertFalse(orchestrator.run([self._task("delete"), self._blocking("delete")]))
+        self.assertEqual(self.done, ["delete"])
+        self.assertEqual(orchestrator.skipped, ["delete"])
+
+
+if __name__ == '__main__':
+    unittest.main()
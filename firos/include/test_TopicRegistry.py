@@ -0,0 +1,108 @@
+# MIT License
+# 
+# Copyright (c) 2019 Fraunhofer IML
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+import unittest
+
+from include.ros.topicRegistry import TopicRecord, TopicRegistry
+
+
+class _Pose(object):
+    _type = "geometry_msgs/Pose"
+
+
+class Test_TopicRegistry(unittest.TestCase):
+
+    def test_Put_Get(self):
+        registry = TopicRegistry()
+        record = TopicRecord("/robot/pose", "subscriber", _Pose, {"position": {}})
+        self.assertIsNone(registry.put(record))
+        self.assertIs(registry.get("/robot/pose"), record)
+        self.assertIsNone(registry.get("/robot/cmd"))
+        self.assertEqual(registry.types, {"/robot/pose": "geometry_msgs/Pose"})
+        self.assertEqual(registry.definitions, {"/robot/pose": {"position": {}}})
+        self.assertEqual(registry.topics("subscriber"), ["/robot/pose"])
+        self.assertEqual(registry.topics("publisher"), [])
+        with self.assertRaises(AttributeError):
+            record.unknown = 1
+
+    def test_Replace(self):
+        registry = TopicRegistry()
+        first = TopicRecord("/robot/pose", "subscriber", _Pose)
+        second = TopicRecord("/robot/pose", "publisher", _Pose)
+        registry.put(first)
+        self.assertIs(registry.put(second), first)
+        self.assertFalse(first.active)
+        self.assertTrue(second.active)
+        self.assertEqual(len(registry), 1)
+
+    def test_Remove(self):
+        registry = TopicRegistry()
+        record = TopicRecord("/robot/pose", "subscriber", _Pose)
+        registry.put(record)
+        definitions = registry.definitions
+        self.assertIs(registry.remove("/robot/pose"), record)
+        self.assertFalse(record.active)
+        self.assertNotIn("/robot/pose", registry)
+        self.assertIsNone(registry.remove("/robot/pose"))
+        # Readers keep a consistent (old) state
+        self.assertIn("/robot/pose", definitions)
+        self.assertEqual(registry.definitions, {})
+
+    def test_Snapshot(self):
+        registry = TopicRegistry()
+        registry.put(TopicRecord("/robot/pose", "subscriber", _Pose))
+        snapshot = registry.snapshot()
+        registry.put(TopicRecord("/robot/cmd", "publisher", _Pose))
+        # A snapshot keeps its state, the registry has a new one
+        self.assertEqual(sorted(snapshot.records), ["/robot/pose"])
+        self.assertEqual(sorted(snapshot.types), ["/robot/pose"])
+        self.assertEqual(sorted(registry.snapshot().records), ["/robot/cmd", "/robot/pose"])
+        self.assertIsNot(registry.snapshot(), snapshot)
+
+    def test_Concurrent(self):
+        registry = TopicRegistry()
+        errors = []
+
+        def read():
+            for _ in range(2000):
+                snapshot = registry.snapshot()
+                if set(snapshot.records) != set(snapshot.types) or set(snapshot.types) != set(snapshot.definitions):
+                    errors.append(snapshot)
+
+        def write(index):
+            for i in range(200):
+                topic = "/robot_{}/{}".format(index, i % 10)
+                registry.put(TopicRecord(topic, "subscriber", _Pose))
+                registry.remove(topic)
+
+        threads = [threading.Thread(target=read)] + [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()